@@ -1,5 +1,4 @@
 from calculation_engine.api import build_api
-from waitress import serve 
 from flask_cors import CORS
 import argparse
 import os
@@ -11,6 +10,8 @@ app = build_api()
 CORS(app)
 
 if __name__ == "__main__":
+    from waitress import serve  # only needed when serving directly, not when imported by a WSGI server
+
     default_port = int(os.environ.get("PORT", 8080))  # Use env PORT, fallback to 8080
     arg_parser.add_argument("--port", type=int, default=5000, help="The port to run the web application on.")
     arg_parser.add_argument("--host", type=str, default="0.0.0.0", help="The host to run the web application on.")
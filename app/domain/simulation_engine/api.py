@@ -36,4 +36,74 @@ def build_api():
         result = command.handle()
         return jsonify(result.model_dump()), 200
 
+    @app.route("/api/simulation/batch", methods=["POST"])
+    def simulation_batch():
+        """
+        Endpoint to run several variants of a plan on common random numbers.
+        Returns
+        -------
+        Response
+            JSON response containing the simulation results, in plan order.
+        """
+        from .commands import RunSimulationBatchCommand
+
+        command = RunSimulationBatchCommand.model_validate(convert_json_to_snake(request.json))
+        results = command.handle()
+        return jsonify([result.model_dump() for result in results]), 200
+
+    @app.route("/api/simulation/sweep", methods=["POST"])
+    def simulation_sweep():
+        """
+        Endpoint to evaluate a plan over a grid of parameter values.
+        Returns
+        -------
+        Response
+            JSON response containing the metrics of every grid cell.
+        """
+        from .commands import RunSimulationSweepCommand
+
+        command = RunSimulationSweepCommand.model_validate(convert_json_to_snake(request.json))
+        return jsonify(command.handle().model_dump()), 200
+
+    @app.route("/api/simulation/goal-seek", methods=["POST"])
+    def simulation_goal_seek():
+        """
+        Endpoint to solve for the plan parameter value that reaches a target success probability.
+        Returns
+        -------
+        Response
+            JSON response containing the solution and its metrics.
+        """
+        from .commands import RunGoalSeekCommand
+
+        command = RunGoalSeekCommand.model_validate(convert_json_to_snake(request.json))
+        return jsonify(command.handle().model_dump()), 200
+
+    @app.route("/api/simulation/glide-path", methods=["POST"])
+    def simulation_glide_path():
+        """
+        Endpoint to find the stocks weight schedule that maximizes an objective.
+        Returns
+        -------
+        Response
+            JSON response containing the best glide path and its metrics.
+        """
+        from .commands import RunGlidePathOptimizationCommand
+
+        command = RunGlidePathOptimizationCommand.model_validate(convert_json_to_snake(request.json))
+        return jsonify(command.handle().model_dump()), 200
+
+    @app.route("/api/simulation/cache", methods=["GET"])
+    def simulation_cache():
+        """
+        Endpoint to inspect the simulation result cache.
+        Returns
+        -------
+        Response
+            JSON response containing the cache hit/miss/eviction counters.
+        """
+        from .result_cache import get_result_cache
+
+        return jsonify(get_result_cache().stats()), 200
+
     return app
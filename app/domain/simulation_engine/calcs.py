@@ -1,20 +1,48 @@
+from typing import Callable, Optional
 import numpy as np
-import pandas as pd
 
+# returns_fn(n, start, stop, out=None) -> n x (stop - start) x n_assets tensor of returns for steps [start, stop)
+ReturnsFunction = Callable[..., np.ndarray]
+# kernel(wealth, simulated_returns, weights, flows, time_delta, scratch, floor) -> wealth, see `advance_wealth`
+WealthKernel = Callable[..., np.ndarray]
 
-def cholesky_bootstrap_returns(n: int, s: int, cov: pd.DataFrame, exp_ret: pd.DataFrame) -> np.ndarray:
+CHOLESKY_BLOCK_SIZE = 4096
+
+
+def cholesky_bootstrap_returns(
+    n: int,
+    s: int,
+    cov: np.ndarray,
+    exp_ret: np.ndarray,
+    rng: Optional[np.random.Generator] = None,
+    cholesky_factor: Optional[np.ndarray] = None,
+    out: Optional[np.ndarray] = None,
+    dtype: np.dtype = np.float64,
+    antithetic: bool = False,
+) -> np.ndarray:
     """
     Simulate returns using the Cholesky decomposition of the covariance matrix.
+    Standard normals are drawn straight into the output buffer and the factor is applied in place.
     Parameters
     ----------
     n : int
         Number of simulations.
     s : int
         Length of the simulation.
-    cov : pandas.DataFrame
+    cov : np.array
         Covariance matrix.
-    exp_ret : pandas.DataFrame
+    exp_ret : np.array
         Expected returns.
+    rng : np.random.Generator, optional
+        Random generator to draw from. If None, a fresh unseeded generator is used.
+    cholesky_factor : np.array, optional
+        Lower triangular Cholesky factor of `cov`. If None, it is computed from `cov`.
+    out : np.array, optional
+        C-contiguous n x s x num_assets buffer to write the returns into. If None, a new tensor is allocated.
+    dtype : np.dtype, optional
+        Floating point type of the returns when `out` is not given (float64 or float32). Default is float64.
+    antithetic : bool, optional
+        Draw antithetic pairs: path j + ceil(n / 2) uses the negated normals of path j. Default is False.
 
     Returns
     -------
@@ -22,9 +50,115 @@ def cholesky_bootstrap_returns(n: int, s: int, cov: pd.DataFrame, exp_ret: pd.Da
         n x s x num_assets tensor
 
     """
-    rng = np.random.default_rng()
-    y = rng.multivariate_normal(exp_ret.values.flatten(), cov.values, size=(n, s))
-    return y
+    if rng is None:
+        rng = np.random.default_rng()
+    if cholesky_factor is None:
+        cholesky_factor = np.linalg.cholesky(np.asarray(cov, dtype=np.float64))
+    mean = np.asarray(exp_ret, dtype=np.float64).reshape(-1)
+    k = len(mean)
+    if out is None:
+        out = np.empty((n, s, k), dtype=dtype)
+    assert out.shape == (n, s, k) and out.flags.c_contiguous, "Output must be a C-contiguous n x s x num_assets buffer"
+
+    draw_standard_normals(rng, out, antithetic)
+    apply_cholesky_factor(out.reshape(-1, k), cholesky_factor, mean)
+    return out
+
+
+def draw_standard_normals(rng: np.random.Generator, out: np.ndarray, antithetic: bool = False) -> np.ndarray:
+    """
+    Fill `out` with standard normals along its first (path) axis.
+    With `antithetic`, only the first ceil(n / 2) paths are drawn and the rest are their negation,
+    so path j and path j + ceil(n / 2) form an antithetic pair. For odd n the middle path is unpaired.
+    """
+    if not antithetic:
+        return rng.standard_normal(out=out, dtype=out.dtype)
+    half = -(-out.shape[0] // 2)
+    rng.standard_normal(out=out[:half], dtype=out.dtype)
+    np.negative(out[: out.shape[0] - half], out=out[half:])
+    return out
+
+
+def apply_cholesky_factor(normals: np.ndarray, cholesky_factor: np.ndarray, mean: np.ndarray) -> np.ndarray:
+    """
+    Turn rows of independent standard normals into correlated returns, in place.
+    Rows are transformed in small blocks through a scratch buffer that stays in cache.
+    Parameters
+    ----------
+    normals : np.array
+        m x num_assets matrix of standard normal draws, overwritten with mean + cholesky_factor @ z.
+    cholesky_factor : np.array
+        Lower triangular Cholesky factor of the covariance matrix.
+    mean : np.array
+        Expected returns.
+    Returns
+    -------
+    np.array
+        The transformed matrix.
+    """
+    scratch = np.empty((min(CHOLESKY_BLOCK_SIZE, normals.shape[0]), normals.shape[1]), dtype=normals.dtype)
+    factor_t = np.ascontiguousarray(cholesky_factor.T, dtype=normals.dtype)
+    mean = mean.astype(normals.dtype, copy=False)
+    for start in range(0, normals.shape[0], CHOLESKY_BLOCK_SIZE):
+        block = normals[start : start + CHOLESKY_BLOCK_SIZE]
+        transformed = scratch[: block.shape[0]]
+        np.matmul(block, factor_t, out=transformed)
+        np.add(transformed, mean, out=block)
+    return normals
+
+
+def gaussian_portfolio_returns(
+    rng: np.random.Generator,
+    means: np.ndarray,
+    stds: np.ndarray,
+    n: int,
+    start: int,
+    stop: int,
+    out: Optional[np.ndarray] = None,
+    dtype: np.dtype = np.float64,
+    antithetic: bool = False,
+) -> np.ndarray:
+    """
+    Simulate portfolio-level returns when asset returns are jointly normal.
+    For weights w_i the portfolio return w_i . r is normal with mean w_i . mu and variance w_i' Sigma w_i,
+    so a single draw per path and step replaces the num_assets correlated draws.
+    Parameters
+    ----------
+    rng : np.random.Generator
+        Random generator to draw from.
+    means : np.array
+        s x 1 vector of portfolio expected returns.
+    stds : np.array
+        s x 1 vector of portfolio return volatilities.
+    n : int
+        Number of simulations.
+    start, stop : int
+        Time steps [start, stop) to simulate.
+    out : np.array, optional
+        C-contiguous n x (stop - start) x 1 buffer to write the returns into. If None, a new tensor is allocated.
+    dtype : np.dtype, optional
+        Floating point type of the returns when `out` is not given. Default is float64.
+    antithetic : bool, optional
+        Draw antithetic pairs, see `draw_standard_normals`. Default is False.
+    Returns
+    -------
+    np.array
+        n x (stop - start) x 1 tensor of portfolio returns, to be used with unit weights.
+    """
+    if out is None:
+        out = np.empty((n, stop - start, 1), dtype=dtype)
+    draw_standard_normals(rng, out, antithetic)
+    return scale_portfolio_normals(out, means[start:stop], stds[start:stop])
+
+
+def scale_portfolio_normals(normals: np.ndarray, means: np.ndarray, stds: np.ndarray) -> np.ndarray:
+    """
+    Turn an n x L x 1 tensor of standard normals into portfolio returns with the given per-step moments, in place.
+    """
+    returns = normals[:, :, 0]
+    np.multiply(returns, stds.astype(normals.dtype), out=returns)
+    np.add(returns, means.astype(normals.dtype), out=returns)
+    return normals
 
 
 def simulate_wealth(
@@ -70,6 +204,27 @@ def simulate_wealth(
         time_steps = np.arange(0, s + 1)  # time steps
     time_delta = np.diff(time_steps)  # time delta
 
+    validate_simulation_inputs(s, k, weights, initial_wealth, cashflows, transactions, time_steps)
+    assert np.all(np.isfinite(simulated_returns)), "Simulated returns must be finite"
+
+    flows = nominal_cashflows(cashflows, transactions, inflation, time_delta)
+    advance_wealth(wealth, simulated_returns, weights, flows, time_delta)
+    return wealth
+
+
+def validate_simulation_inputs(
+    s: int,
+    k: int,
+    weights: np.ndarray,
+    initial_wealth: float,
+    cashflows: np.ndarray,
+    transactions: np.ndarray,
+    time_steps: np.ndarray,
+) -> None:
+    """
+    Check the plan inputs of a wealth simulation with s time steps and k assets.
+    """
+    time_delta = np.diff(time_steps)
     assert len(cashflows) == s, "Cashflows must be the same length as the number of time steps"
     assert len(transactions) == s, "Transactions must be the same length as the number of time steps"
     assert len(time_steps) == s + 1, "Time steps must be the same length as the number of time steps + 1"
@@ -77,24 +232,456 @@ def simulate_wealth(
     assert weights.shape[1] == k, "Weights second dimension must be the same length as the number of assets"
     assert len(time_delta) == s, "Time delta must be the same length as the number of time steps - 1"
     assert np.all(time_delta > 0), "Time steps must be in ascending order"
-    assert np.all(np.isfinite(simulated_returns)), "Simulated returns must be finite"
     assert np.all(np.isfinite(weights)), "Weights must be finite"
     assert np.all(np.isfinite(cashflows)), "Cashflows must be finite"
     assert np.all(np.isfinite(transactions)), "Transactions must be finite"
     assert np.all(np.isfinite(initial_wealth)), "Initial wealth must be finite"
     assert np.all(np.isfinite(time_steps)), "Time steps must be finite"
 
-    inflation_factor = 1
-    for i in range(s):
-        inflation_factor *= (1 + inflation) ** time_delta[i]
-        wealth[:, i + 1] = (
-            wealth[:, i] * (weights[i] * (1 + simulated_returns[:, i, :]) ** time_delta[i]).sum(axis=1) + (cashflows[i]*time_delta[i] + transactions[i]) * inflation_factor 
+
+def nominal_cashflows(
+    cashflows: np.ndarray, transactions: np.ndarray, inflation: float, time_delta: np.ndarray
+) -> np.ndarray:
+    """
+    Cash added to the portfolio at the end of each time step, in nominal terms.
+    Parameters
+    ----------
+    cashflows : np.array
+        s x 1 vector of cashflow rates (per unit of time, in real terms).
+    transactions : np.array
+        s x 1 vector of one-off transactions (in real terms).
+    inflation : float
+        Inflation rate.
+    time_delta : np.array
+        s x 1 vector of time step lengths.
+    Returns
+    -------
+    np.array
+        s x 1 vector of nominal cash flows.
+    """
+    inflation_factor = np.cumprod((1 + inflation) ** time_delta)
+    return (cashflows * time_delta + transactions) * inflation_factor
+
+
+def advance_wealth(
+    wealth: np.ndarray,
+    simulated_returns: np.ndarray,
+    weights: np.ndarray,
+    flows: np.ndarray,
+    time_delta: np.ndarray,
+    scratch: Optional[tuple[np.ndarray, ...]] = None,
+    floor: bool = True,
+) -> np.ndarray:
+    """
+    Roll wealth forward over a block of time steps, in place.
+    Every step runs in preallocated buffers: the gross asset returns are raised to the step length only when
+    it is not 1, weighted with a BLAS matrix-vector product and floored at zero straight into the wealth matrix.
+    Parameters
+    ----------
+    wealth : np.array
+        n x L+1 matrix of wealth. The first column must hold the wealth at the start of the block.
+    simulated_returns : np.array
+        n x L x n_assets tensor of simulated returns for the block.
+    weights : np.array
+        L x num_assets matrix of weights.
+    flows : np.array
+        L x 1 vector of nominal cash flows (see `nominal_cashflows`).
+    time_delta : np.array
+        L x 1 vector of time step lengths.
+    scratch : tuple of np.array, optional
+        (n x num_assets, n, n) buffers in the wealth's floating point type. If None, they are allocated.
+    floor : bool, optional
+        Set negative wealth to 0. Without the floor wealth is a plain linear recursion, whose expectation
+        is known in closed form (used as a control variate). Default is True.
+    Returns
+    -------
+    np.array
+        The wealth matrix.
+    """
+    n, steps, k = simulated_returns.shape
+    if scratch is None:
+        scratch = allocate_wealth_scratch(n, k, wealth.dtype)
+    gross_returns, growth, current = scratch[0][:n], scratch[1][:n], scratch[2][:n]
+    current[:] = wealth[:, 0]  # contiguous copy of the running wealth
+    for i in range(steps):
+        np.add(simulated_returns[:, i, :], 1, out=gross_returns)
+        if time_delta[i] != 1:
+            np.power(gross_returns, time_delta[i], out=gross_returns)
+        np.matmul(gross_returns, weights[i], out=growth)
+        np.multiply(current, growth, out=growth)
+        np.add(growth, flows[i], out=growth)
+        if floor:
+            np.maximum(growth, 0, out=current)  # set negative wealth to 0
+        else:
+            np.copyto(current, growth)
+        wealth[:, i + 1] = current
+    return wealth
+
+
+def allocate_wealth_scratch(n: int, k: int, dtype: np.dtype = np.float64) -> tuple[np.ndarray, ...]:
+    """
+    Allocate the scratch buffers used by `advance_wealth` for up to n paths and k assets.
+    """
+    return np.empty((n, k), dtype=dtype), np.empty(n, dtype=dtype), np.empty(n, dtype=dtype)
+
+
+def simulate_wealth_chunk(
+    returns_fn: ReturnsFunction,
+    wealth: np.ndarray,
+    weights: np.ndarray,
+    flows: np.ndarray,
+    time_delta: np.ndarray,
+    step_chunk_size: Optional[int] = None,
+    returns_buffer: Optional[np.ndarray] = None,
+    kernel: Optional[WealthKernel] = None,
+    control: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Simulate one chunk of paths, generating its returns block by block.
+    Parameters
+    ----------
+    returns_fn : callable
+        returns_fn(n, start, stop, out) -> n x (stop - start) x n_assets tensor of returns for steps [start, stop).
+    wealth : np.array
+        n x s+1 output matrix. The first column must hold the initial wealth.
+    weights : np.array
+        s x num_assets matrix of weights.
+    flows : np.array
+        s x 1 vector of nominal cash flows (see `nominal_cashflows`).
+    time_delta : np.array
+        s x 1 vector of time step lengths.
+    step_chunk_size : int, optional
+        Number of time steps generated at once. If None, all steps are generated together.
+    returns_buffer : np.array, optional
+        Flat scratch buffer of at least n x step_chunk_size x num_assets elements that the returns are
+        generated into. If None, one is allocated.
+    kernel : callable, optional
+        Time-step kernel with the signature of `advance_wealth`. If None, `advance_wealth` is used.
+    control : np.array, optional
+        n x s+1 matrix receiving the same paths without the zero floor (see `expected_wealth_path`).
+        The first column must hold the initial wealth.
+    Returns
+    -------
+    np.array
+        The wealth matrix. All intermediates are kept in the wealth matrix's floating point type.
+    """
+    n = wealth.shape[0]
+    s = wealth.shape[1] - 1
+    k = weights.shape[1]
+    weights = weights.astype(wealth.dtype, copy=False)
+    flows = flows.astype(wealth.dtype, copy=False)
+    time_delta = time_delta.astype(wealth.dtype, copy=False)
+    step_chunk_size = step_chunk_size or s
+    if returns_buffer is None:
+        returns_buffer = np.empty(n * min(s, step_chunk_size) * k, dtype=wealth.dtype)
+    kernel = kernel or advance_wealth
+    scratch = allocate_wealth_scratch(n, k, wealth.dtype)
+    for start in range(0, s, step_chunk_size):
+        stop = min(s, start + step_chunk_size)
+        out = returns_buffer[: n * (stop - start) * k].reshape(n, stop - start, k)
+        returns = returns_fn(n, start, stop, out=out)
+        kernel(
+            wealth[:, start : stop + 1], returns, weights[start:stop], flows[start:stop], time_delta[start:stop], scratch
         )
-        wealth[wealth[:, i + 1] < 0, i + 1] = 0  # set negative wealth to 0
+        if control is not None:
+            kernel(
+                control[:, start : stop + 1],
+                returns,
+                weights[start:stop],
+                flows[start:stop],
+                time_delta[start:stop],
+                scratch,
+                False,
+            )
+    return wealth
+
+
+def simulate_wealth_streaming(
+    returns_fn: ReturnsFunction,
+    number_of_simulations: int,
+    weights: np.ndarray,
+    initial_wealth: float,
+    cashflows: np.ndarray,
+    transactions: np.ndarray,
+    inflation: float = 0.03,
+    time_steps: np.ndarray = None,
+    chunk_size: int = 10000,
+    step_chunk_size: Optional[int] = None,
+    out: Optional[np.ndarray] = None,
+    dtype: np.dtype = np.float64,
+    kernel: Optional[WealthKernel] = None,
+    control_out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Simulate wealth without materializing the full returns tensor.
+    Returns are generated for `chunk_size` paths and `step_chunk_size` steps at a time, fed into the wealth
+    update and discarded, so peak memory for returns is chunk_size x step_chunk_size x n_assets.
+    Parameters
+    ----------
+    returns_fn : callable
+        returns_fn(n, start, stop, out) -> n x (stop - start) x n_assets tensor of returns for steps [start, stop).
+    number_of_simulations : int
+        Number of simulations.
+    weights : np.array
+        s x num_assets matrix of weights.
+    initial_wealth : float
+        Initial wealth.
+    cashflows : np.array
+        s x 1 vector of cashflows.
+    transactions : np.array
+        s x 1 vector of transactions.
+    inflation : float, optional
+        Inflation rate. Default is 0.03.
+    time_steps : np.array, optional
+        s+1 x 1 vector of time steps. If None, will be set to np.arange(0, s + 1).
+    chunk_size : int, optional
+        Number of paths simulated at once. Default is 10000.
+    step_chunk_size : int, optional
+        Number of time steps generated at once. If None, all steps are generated together.
+    out : np.array, optional
+        n x s+1 matrix to write the wealth into. If None, a new matrix is allocated.
+    dtype : np.dtype, optional
+        Floating point type of the returns and wealth when `out` is not given. Default is float64.
+    kernel : callable, optional
+        Time-step kernel with the signature of `advance_wealth`. If None, `advance_wealth` is used.
+    control_out : np.array, optional
+        n x s+1 matrix to write the paths without the zero floor into, for use as a control variate.
+    Returns
+    -------
+    np.array
+        n x s+1 matrix of wealth.
+    """
+    s = weights.shape[0]
+    if time_steps is None:
+        time_steps = np.arange(0, s + 1)
+    time_delta = np.diff(time_steps)
+    validate_simulation_inputs(s, weights.shape[1], weights, initial_wealth, cashflows, transactions, time_steps)
+    assert chunk_size > 0, "Chunk size must be positive"
+
+    flows = nominal_cashflows(cashflows, transactions, inflation, time_delta)
+    wealth = np.empty((number_of_simulations, s + 1), dtype=dtype) if out is None else out
+    assert wealth.shape == (number_of_simulations, s + 1), "Output must be n x s+1"
+    wealth[:, 0] = initial_wealth
+    if control_out is not None:
+        assert control_out.shape == wealth.shape, "Control output must be n x s+1"
+        control_out[:, 0] = initial_wealth
+    returns_buffer = np.empty(
+        min(chunk_size, number_of_simulations) * min(s, step_chunk_size or s) * weights.shape[1], dtype=wealth.dtype
+    )
+    for start in range(0, number_of_simulations, chunk_size):
+        stop = min(number_of_simulations, start + chunk_size)
+        control = None if control_out is None else control_out[start:stop]
+        simulate_wealth_chunk(
+            returns_fn, wealth[start:stop], weights, flows, time_delta, step_chunk_size, returns_buffer, kernel, control
+        )
+    return wealth
+
+
+def advance_wealth_plans(
+    wealth: np.ndarray,
+    simulated_returns: np.ndarray,
+    weights: np.ndarray,
+    flows: np.ndarray,
+    time_delta: np.ndarray,
+    floor: bool = True,
+) -> np.ndarray:
+    """
+    Roll the wealth of several plans forward over the same block of simulated returns, in place.
+    The gross returns of every step are computed once and weighted for all plans with a single BLAS
+    matrix product, so each additional plan only costs its share of the product and the wealth update.
+    Parameters
+    ----------
+    wealth : np.array
+        P x n x L+1 tensor of wealth, one matrix per plan. The first column must hold the wealth at the start of the block.
+    simulated_returns : np.array
+        n x L x n_assets tensor of simulated returns for the block, shared by all plans.
+    weights : np.array
+        P x L x num_assets tensor of weights.
+    flows : np.array
+        P x L matrix of nominal cash flows (see `nominal_cashflows`).
+    time_delta : np.array
+        L x 1 vector of time step lengths.
+    floor : bool, optional
+        Set negative wealth to 0. Default is True.
+    Returns
+    -------
+    np.array
+        The wealth tensor.
+    """
+    n, steps, k = simulated_returns.shape
+    gross_returns = np.empty((k, n), dtype=wealth.dtype)
+    growth = np.empty((wealth.shape[0], n), dtype=wealth.dtype)
+    current = np.ascontiguousarray(wealth[:, :, 0])  # P x n running wealth
+    for i in range(steps):
+        np.add(simulated_returns[:, i, :].T, 1, out=gross_returns)
+        if time_delta[i] != 1:
+            np.power(gross_returns, time_delta[i], out=gross_returns)
+        np.matmul(weights[:, i, :], gross_returns, out=growth)
+        np.multiply(current, growth, out=growth)
+        np.add(growth, flows[:, i, None], out=growth)
+        if floor:
+            np.maximum(growth, 0, out=current)  # set negative wealth to 0
+        else:
+            np.copyto(current, growth)
+        wealth[:, :, i + 1] = current
+    return wealth
 
+
+def advance_final_wealth_plans(
+    current: np.ndarray,
+    simulated_returns: np.ndarray,
+    weights: np.ndarray,
+    flows: np.ndarray,
+    time_delta: np.ndarray,
+    zero_counts: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Roll the wealth of several plans forward over the same returns, in place, keeping only the running wealth.
+    This is the reduced counterpart of `advance_wealth_plans` for callers that only need the final wealth and
+    the number of destitute paths per step (sweeps and solvers evaluating many plans on cached draws).
+    Parameters
+    ----------
+    current : np.array
+        P x n matrix of wealth at the start of the returns, updated to the wealth after the last step.
+    simulated_returns : np.array
+        n x L x n_assets tensor of simulated returns, shared by all plans.
+    weights : np.array
+        P x L x num_assets tensor of weights.
+    flows : np.array
+        P x L matrix of nominal cash flows (see `nominal_cashflows`).
+    time_delta : np.array
+        L x 1 vector of time step lengths.
+    zero_counts : np.array, optional
+        P x L integer matrix the number of paths with zero wealth after every step is added to.
+    Returns
+    -------
+    np.array
+        The P x n matrix of wealth after the last step.
+    """
+    n, steps, k = simulated_returns.shape
+    gross_returns = np.empty((k, n), dtype=current.dtype)
+    growth = np.empty(current.shape, dtype=current.dtype)
+    for i in range(steps):
+        np.add(simulated_returns[:, i, :].T, 1, out=gross_returns)
+        if time_delta[i] != 1:
+            np.power(gross_returns, time_delta[i], out=gross_returns)
+        np.matmul(weights[:, i, :], gross_returns, out=growth)
+        np.multiply(current, growth, out=growth)
+        np.add(growth, flows[:, i, None], out=growth)
+        np.maximum(growth, 0, out=current)  # set negative wealth to 0
+        if zero_counts is not None:
+            zero_counts[:, i] += np.count_nonzero(current == 0, axis=1)
+    return current
+
+
+def simulate_plans_streaming(
+    returns_fn: ReturnsFunction,
+    number_of_simulations: int,
+    weights: np.ndarray,
+    initial_wealth: np.ndarray,
+    flows: np.ndarray,
+    time_steps: np.ndarray,
+    chunk_size: int = 10000,
+    step_chunk_size: Optional[int] = None,
+    out: Optional[np.ndarray] = None,
+    control_out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Simulate the wealth of several plans on common random numbers: every block of returns is generated once
+    and fed to all plans (see `advance_wealth_plans`), so differences between plans carry no sampling noise
+    from the draws themselves.
+    Parameters
+    ----------
+    returns_fn : callable
+        returns_fn(n, start, stop, out) -> n x (stop - start) x n_assets tensor of returns for steps [start, stop).
+    number_of_simulations : int
+        Number of simulations.
+    weights : np.array
+        P x s x num_assets tensor of weights.
+    initial_wealth : np.array
+        P x 1 vector of initial wealth.
+    flows : np.array
+        P x s matrix of nominal cash flows (see `nominal_cashflows`).
+    time_steps : np.array
+        s+1 x 1 vector of time steps, shared by all plans.
+    chunk_size : int, optional
+        Number of paths simulated at once. Default is 10000.
+    step_chunk_size : int, optional
+        Number of time steps generated at once. If None, all steps are generated together.
+    out : np.array, optional
+        P x n x s+1 tensor to write the wealth into. If None, a new float64 tensor is allocated.
+    control_out : np.array, optional
+        P x n x s+1 tensor to write the paths without the zero floor into, for use as a control variate.
+    Returns
+    -------
+    np.array
+        P x n x s+1 tensor of wealth.
+    """
+    num_plans, s, k = weights.shape
+    time_delta = np.diff(time_steps)
+    assert flows.shape == (num_plans, s), "Flows must be P x s"
+    assert len(initial_wealth) == num_plans, "Initial wealth must have one value per plan"
+    assert len(time_delta) == s, "Time delta must be the same length as the number of time steps - 1"
+    assert chunk_size > 0, "Chunk size must be positive"
+
+    wealth = np.empty((num_plans, number_of_simulations, s + 1)) if out is None else out
+    assert wealth.shape == (num_plans, number_of_simulations, s + 1), "Output must be P x n x s+1"
+    wealth[:, :, 0] = np.asarray(initial_wealth)[:, None]
+    weights = weights.astype(wealth.dtype, copy=False)
+    flows = flows.astype(wealth.dtype, copy=False)
+    time_delta = time_delta.astype(wealth.dtype, copy=False)
+    if control_out is not None:
+        assert control_out.shape == wealth.shape, "Control output must be P x n x s+1"
+        control_out[:, :, 0] = wealth[:, :, 0]
+    step_chunk_size = step_chunk_size or s
+    returns_buffer = np.empty(min(chunk_size, number_of_simulations) * min(s, step_chunk_size) * k, dtype=wealth.dtype)
+    for chunk_start in range(0, number_of_simulations, chunk_size):
+        chunk_stop = min(number_of_simulations, chunk_start + chunk_size)
+        n = chunk_stop - chunk_start
+        for start in range(0, s, step_chunk_size):
+            stop = min(s, start + step_chunk_size)
+            returns = returns_fn(n, start, stop, out=returns_buffer[: n * (stop - start) * k].reshape(n, stop - start, k))
+            block = (slice(None), slice(chunk_start, chunk_stop), slice(start, stop + 1))
+            advance_wealth_plans(
+                wealth[block], returns, weights[:, start:stop], flows[:, start:stop], time_delta[start:stop]
+            )
+            if control_out is not None:
+                advance_wealth_plans(
+                    control_out[block],
+                    returns,
+                    weights[:, start:stop],
+                    flows[:, start:stop],
+                    time_delta[start:stop],
+                    False,
+                )
     return wealth
 
 
+def expected_wealth_path(initial_wealth: float, portfolio_means: np.ndarray, flows: np.ndarray) -> np.ndarray:
+    """
+    Expected wealth without the zero floor, for unit time steps.
+    Without the floor wealth follows X_t+1 = X_t * (1 + w_t . r_t) + f_t, and r_t is independent of X_t,
+    so E[X_t+1] = E[X_t] * (1 + w_t . mu_t) + f_t.
+    Parameters
+    ----------
+    initial_wealth : float
+        Initial wealth.
+    portfolio_means : np.array
+        s x 1 vector of portfolio expected returns w_t . mu_t.
+    flows : np.array
+        s x 1 vector of nominal cash flows (see `nominal_cashflows`).
+    Returns
+    -------
+    np.array
+        s+1 x 1 vector of expected wealth.
+    """
+    expected = np.empty(len(flows) + 1)
+    expected[0] = initial_wealth
+    for i in range(len(flows)):
+        expected[i + 1] = expected[i] * (1 + portfolio_means[i]) + flows[i]
+    return expected
+
+
 def convert_to_real_wealth(
     wealth: np.ndarray, time_steps: np.ndarray, inflation: float = 0.03, 
 ) -> np.array:
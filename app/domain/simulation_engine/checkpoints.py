@@ -0,0 +1,154 @@
+import os
+import threading
+from collections import OrderedDict
+from functools import cache
+from typing import Optional
+import numpy as np
+from .summary import WealthSummary, summarize_wealth
+
+# time steps whose draws come from one seed: editing step t regenerates the draws from the block containing t
+DEFAULT_CHECKPOINT_BLOCK_STEPS = 12
+
+
+class SimulationCheckpoint:
+    """
+    State of a finished incremental simulation: the compiled timeline it was run with and its wealth paths,
+    every column of which is a checkpoint the next run of the same draws can restart from.
+    Checkpoints never modify their matrices, so results that still reference them stay valid; they only cache
+    the summaries of their wealth, which the next checkpoint reuses for the columns it kept.
+    """
+
+    def __init__(
+        self,
+        initial_wealth: float,
+        weights: np.ndarray,
+        flows: np.ndarray,
+        time_steps: np.ndarray,
+        wealth: np.ndarray,
+        control: Optional[np.ndarray] = None,
+        previous: Optional["SimulationCheckpoint"] = None,
+        kept_columns: int = 0,
+    ):
+        """
+        Parameters
+        ----------
+        initial_wealth : float
+            Initial wealth.
+        weights : np.ndarray
+            s x num_assets matrix of weights.
+        flows : np.ndarray
+            s x 1 vector of nominal cash flows (see `nominal_cashflows`).
+        time_steps : np.ndarray
+            s+1 x 1 vector of time steps.
+        wealth : np.ndarray
+            n x s+1 matrix of wealth.
+        control : np.ndarray, optional
+            n x s+1 matrix of the paths without the zero floor, if a control variate is used.
+        previous : SimulationCheckpoint, optional
+            Checkpoint this one was resumed from, whose summaries are reused for the kept columns.
+        kept_columns : int, optional
+            Number of leading wealth columns kept from `previous`, by default 0.
+        """
+        self.initial_wealth = initial_wealth
+        self.weights = weights
+        self.flows = flows
+        self.time_steps = time_steps
+        self.wealth = wealth
+        self.control = control
+        # only the summaries are taken over, so that the previous wealth matrices can be released
+        self.kept_columns = kept_columns if previous is not None else 0
+        self._previous_summaries = dict(previous._summaries) if previous is not None else {}
+        self._summaries: dict[tuple[float, ...], WealthSummary] = {}
+
+    @property
+    def number_of_steps(self) -> int:
+        return len(self.flows)
+
+    def first_changed_step(
+        self, initial_wealth: float, weights: np.ndarray, flows: np.ndarray, time_steps: np.ndarray
+    ) -> int:
+        """
+        Returns the first time step whose inputs differ from the checkpoint's over their common horizon, or the end
+        of the common horizon if none does: wealth up to that step is unchanged and can be kept.
+        """
+        if initial_wealth != self.initial_wealth or weights.shape[1] != self.weights.shape[1]:
+            return 0
+        common = min(len(flows), self.number_of_steps)
+        changed = (
+            np.any(weights[:common] != self.weights[:common], axis=1)
+            | (flows[:common] != self.flows[:common])
+            | (time_steps[1 : common + 1] != self.time_steps[1 : common + 1])
+        )
+        return int(np.argmax(changed)) if changed.any() else common
+
+    def summarize(self, percentiles: list[float]) -> WealthSummary:
+        """
+        Returns the summary of the checkpoint's wealth (see `summarize_wealth`). Only the columns after the ones
+        kept from the previous checkpoint are summarised when the previous checkpoint was summarised with the
+        same percentiles.
+        """
+        key = tuple(percentiles)
+        summary = self._summaries.get(key)
+        if summary is not None:
+            return summary
+        previous = self._previous_summaries.get(key)
+        if previous is None or self.kept_columns == 0:
+            summary = summarize_wealth(self.wealth, percentiles)
+        elif self.kept_columns >= self.wealth.shape[1]:
+            summary = previous.take(slice(0, self.wealth.shape[1]))
+        else:
+            tail = summarize_wealth(self.wealth[:, self.kept_columns :], percentiles)
+            summary = WealthSummary.concatenate([previous.take(slice(0, self.kept_columns)), tail])
+        self._summaries[key] = summary
+        return summary
+
+
+class CheckpointStore:
+    """
+    In-memory LRU store of the latest checkpoint of every set of draws (see `RunSimulationCommand.checkpoint_key`).
+    """
+
+    def __init__(self, max_entries: int = 16):
+        """
+        Parameters
+        ----------
+        max_entries : int, optional
+            Maximum number of checkpoints kept, by default 16.
+        """
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, SimulationCheckpoint] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[SimulationCheckpoint]:
+        """
+        Returns the latest checkpoint for `key`, or None on a miss.
+        """
+        with self._lock:
+            checkpoint = self._entries.get(key)
+            if checkpoint is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return checkpoint
+
+    def put(self, key: str, checkpoint: SimulationCheckpoint) -> None:
+        with self._lock:
+            self._entries[key] = checkpoint
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+@cache
+def get_checkpoint_store() -> CheckpointStore:
+    """
+    Process-wide checkpoint store, configured from the SIMULATION_CHECKPOINT_SIZE environment variable.
+    """
+    return CheckpointStore(max_entries=int(os.environ.get("SIMULATION_CHECKPOINT_SIZE", 16)))
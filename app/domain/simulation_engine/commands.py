@@ -1,15 +1,40 @@
 import pydantic
-from enum import Enum
 from functools import cached_property
-import pandas as pd
 import numpy as np
-from .common.types import SimulationPortfolioWeights, CashFlow, AssetCosts, ExpectedReturns
-from .common.enums import SimulationType, SimulationStepType, InterpolationMethod
-from .simulation_strategies import SimulationStrategyFactory
-from .dto import SimulationDataDTO, SimulationResultDTO
-from pydantic.alias_generators import to_camel, to_snake
-from .calcs import convert_to_real_wealth
+from .common.types import SimulationPortfolioWeights, CashFlow, AssetCosts, ExpectedReturns, SweepAxis
+from .common.enums import (
+    SimulationType,
+    SimulationStepType,
+    InterpolationMethod,
+    StatisticsMode,
+    ExecutorType,
+    SimulationPrecision,
+    KernelBackendType,
+    PrecisionTarget,
+    OutcomeMetric,
+    SweepParameter,
+)
+from .simulation_strategies import AbstractSimulationStrategy, SimulationStrategyFactory
+from .data_store import HistoricalData
+from .parallel import DEFAULT_SHARD_SIZE
+from .result_cache import canonical_hash, get_result_cache
+from .scenario_bank import get_scenario_bank
+from .checkpoints import get_checkpoint_store
+from .dto import SimulationDataDTO, SimulationResultDTO, SweepResultDTO, GoalSeekResultDTO, GlidePathResultDTO
+from .variants import PlanVariants
+from .goal_seek import MONOTONE_PARAMETERS, GoalSeeker
+from .outcomes import PlanOutcomes
+from .glide_path import GlidePathOptimizer
+from .timeline import PlanTimeline
 import os
+import json
+import time
+import itertools
+from typing import Optional
+
+
+# fields that change how a simulation is executed but never its result
+EXECUTION_FIELDS = {"workers", "executor", "kernel_backend"}
 
 
 class RunSimulationCommand(pydantic.BaseModel):
@@ -29,180 +54,666 @@ class RunSimulationCommand(pydantic.BaseModel):
     savings_rate_interpolation: InterpolationMethod = pydantic.Field(default=InterpolationMethod.LINEAR)
     asset_costs: AssetCosts = pydantic.Field(default=AssetCosts())
     asset_returns: ExpectedReturns = pydantic.Field(default=ExpectedReturns())
-
+    chunk_size: Optional[int] = pydantic.Field(default=None, gt=0)
+    step_chunk_size: Optional[int] = pydantic.Field(default=None, gt=0)
+    statistics_mode: StatisticsMode = pydantic.Field(default=StatisticsMode.EXACT)
+    sketch_rank_error: float = pydantic.Field(default=0.001, gt=0.0, lt=1.0)
+    seed: Optional[int] = pydantic.Field(default=None, ge=0)
+    workers: int = pydantic.Field(default_factory=lambda: int(os.environ.get("SIMULATION_WORKERS", 1)), gt=0)
+    executor: ExecutorType = pydantic.Field(
+        default_factory=lambda: ExecutorType(os.environ.get("SIMULATION_EXECUTOR", ExecutorType.THREAD))
+    )
+    shard_size: int = pydantic.Field(default=DEFAULT_SHARD_SIZE, gt=0)
+    dtype: SimulationPrecision = pydantic.Field(default=SimulationPrecision.FLOAT64)
+    kernel_backend: Optional[KernelBackendType] = pydantic.Field(default=None)
+    block_size: Optional[int] = pydantic.Field(default=None, gt=0)
+    stationary_blocks: bool = False
+    antithetic: bool = False
+    control_variate: bool = False
+    importance_sampling: bool = False
+    importance_shift: Optional[float] = pydantic.Field(default=None, gt=0.0)
+    # adaptive mode: number_of_simulations is the path budget, spent in batches of adaptive_batch_size paths
+    target_standard_error: Optional[float] = pydantic.Field(default=None, gt=0.0)
+    target_metric: PrecisionTarget = pydantic.Field(default=PrecisionTarget.FINAL_MEDIAN)
+    adaptive_batch_size: int = pydantic.Field(default=1000, gt=0)
+    quasi_monte_carlo: bool = False
+    qmc_replicates: int = pydantic.Field(default=8, ge=2)
+    brownian_bridge: bool = True
+    # read the normals from the memory-mapped scenario bank, by default its latest version
+    scenario_bank: bool = False
+    scenario_bank_version: Optional[int] = pydantic.Field(default=None, gt=0)
+    # resume from the checkpoint of the previous run of the same draws, re-simulating only the changed steps
+    incremental: bool = False
 
     def __init__(self, **data):
         super().__init__(**data)
-        self.number_of_simulations = min(int(os.environ.get("MAX_SIMULATIONS", 1000000)), self.number_of_simulations)
-        self._simulation_strategy = SimulationStrategyFactory(
-            self.base_simulation_data, self.number_of_simulations, self.inflation, self.initial_wealth, self.step_size
+        self.number_of_simulations = min(self.max_simulations, self.number_of_simulations)
+        if self.scenario_bank:
+            # pins the version in the cache key
+            self.scenario_bank_version = get_scenario_bank(self.scenario_bank_version).version
+        elif self.scenario_bank_version is not None:
+            raise ValueError("A scenario bank version needs the scenario bank to be enabled.")
+        if self.incremental and (self.seed is None or self.target_standard_error is not None):
+            raise ValueError("Incremental runs need a seed and cannot be run adaptively.")
+        self._simulation_strategy = self.build_simulation_strategy()
+
+    def build_simulation_strategy(self, market_data: Optional[HistoricalData] = None) -> AbstractSimulationStrategy:
+        """
+        Build the simulation strategy of the command.
+        Parameters
+        ----------
+        market_data : HistoricalData, optional
+            Version of the historical data to calibrate on, by default the current one.
+        Returns
+        -------
+        AbstractSimulationStrategy
+            The strategy, not yet run.
+        """
+        return SimulationStrategyFactory(
+            self.timeline,
+            self.number_of_simulations,
+            self.inflation,
+            self.initial_wealth,
+            self.step_size,
+            block_size=self.block_size,
+            stationary_blocks=self.stationary_blocks,
+            quasi_monte_carlo=self.quasi_monte_carlo,
+            qmc_replicates=self.qmc_replicates,
+            brownian_bridge=self.brownian_bridge,
+            scenario_bank=get_scenario_bank(self.scenario_bank_version) if self.scenario_bank else None,
+            chunk_size=self.chunk_size,
+            step_chunk_size=self.step_chunk_size,
+            statistics_mode=self.statistics_mode,
+            sketch_rank_error=self.sketch_rank_error,
+            seed=self.seed,
+            workers=self.workers,
+            executor_type=self.executor,
+            shard_size=self.shard_size if self.target_standard_error is None else self.adaptive_batch_size,
+            dtype=self.dtype,
+            kernel_backend=self.kernel_backend,
+            antithetic=self.antithetic,
+            control_variate=self.control_variate,
+            importance_sampling=self.importance_sampling,
+            importance_shift=self.importance_shift,
+            market_data=market_data,
         ).build_strategy(self.simulation_type)
-        
-        asset_returns_df = pd.DataFrame([self.asset_returns.model_dump()])
 
     @property
-    def simulation_strategy(self) -> SimulationStrategyFactory:
-        return self._simulation_strategy
+    def max_simulations(self) -> int:
+        """
+        Upper bound on the number of simulations. Sketch runs hold neither the returns tensor nor the wealth
+        matrix, so they are bounded separately by MAX_STREAMING_SIMULATIONS; exact runs keep the full wealth
+        matrix even when chunked.
+        """
+        if self.statistics_mode == StatisticsMode.SKETCH:
+            return int(os.environ.get("MAX_STREAMING_SIMULATIONS", 10000000))
+        return self.max_drawn_simulations
 
-    @cached_property
-    def base_simulation_data(self) -> pd.DataFrame:
-        base_timesteps = np.arange(0, self.end_step + 1, 1)
-        base_timesteps = pd.Series(base_timesteps, name="timesteps")
+    @property
+    def max_drawn_simulations(self) -> int:
+        """
+        Upper bound on the number of simulations whose returns are held in memory at once, MAX_SIMULATIONS.
+        """
+        return int(os.environ.get("MAX_SIMULATIONS", 1000000))
 
-        base_sim_data = pd.DataFrame(index=base_timesteps)
+    def limit_simulations(self, limit: int) -> None:
+        """
+        Clamp the number of simulations to `limit`, rebuilding the strategy on the same data version if needed.
+        """
+        if self.number_of_simulations > limit:
+            self.number_of_simulations = limit
+            self._simulation_strategy = self.build_simulation_strategy(self._simulation_strategy.market_data)
 
-        self.weights.sort(key=lambda x: x.step)
-        self.savings_rates.sort(key=lambda x: x.step)
+    @property
+    def simulation_strategy(self) -> SimulationStrategyFactory:
+        return self._simulation_strategy
 
-        weights_df = pd.DataFrame([weight.model_dump() for weight in self.weights])
-        weights_df = weights_df.set_index("step")
+    @property
+    def data_version(self) -> str:
+        """
+        Version of the historical data the command's strategy was built on, kept for the command's whole life.
+        """
+        return self.simulation_strategy.data_version
 
-        cashflows_df = pd.DataFrame([cashflow.model_dump() for cashflow in self.savings_rates])
-        cashflows_df = cashflows_df.rename(columns={"value": "cashflow"})
-        print(cashflows_df)
-        print(weights_df)
-        cashflows_df = cashflows_df.set_index("step")
+    @cached_property
+    def timeline(self) -> PlanTimeline:
+        """
+        The plan compiled into its time line of weights, cash flow rates and transactions (see `PlanTimeline`).
+        """
+        return PlanTimeline.compile(
+            self.end_step,
+            self.weights,
+            self.savings_rates,
+            self.oneoff_transactions,
+            self.weights_interpolation,
+            self.savings_rate_interpolation,
+        )
 
-        
-        if self.oneoff_transactions:
-            oneoff_df = pd.DataFrame([oneoff.model_dump() for oneoff in self.oneoff_transactions])
-            oneoff_df = oneoff_df.rename(columns={"value": "transactions"})
-            oneoff_df = oneoff_df.set_index("step")
-        else:
-            oneoff_df = pd.DataFrame(columns=["transactions"])
-
-        base_sim_data = base_sim_data.merge(weights_df, how="outer", left_index=True, right_index=True)
-        base_sim_data = base_sim_data.merge(cashflows_df, how="outer", left_index=True, right_index=True)
-        base_sim_data = base_sim_data.merge(oneoff_df, how="outer", left_index=True, right_index=True)
-
-        base_sim_data["stocks"] = self.interpolate_series(
-            base_sim_data["stocks"], self.weights_interpolation
-        ).fillna(0)
-        base_sim_data["bonds"] = self.interpolate_series(
-            base_sim_data["bonds"], self.weights_interpolation
-        ).fillna(0)
-        base_sim_data["cash"] = 1 - base_sim_data["stocks"] - base_sim_data["bonds"]
-
-        base_sim_data["cashflow"] = self.interpolate_series(
-            base_sim_data["cashflow"], self.savings_rate_interpolation
-        ).fillna(0)
-
-        base_sim_data["transactions"] = base_sim_data["transactions"].fillna(0)
-        base_sim_data["time_delta"] = base_sim_data.index.to_series().diff().astype(float)
-        base_sim_data["time_delta"] = base_sim_data["time_delta"].astype(float)
-        return base_sim_data
-    
-    @staticmethod
-    def interpolate_series(series: pd.Series, method: InterpolationMethod) -> pd.Series:
+    def interpolate_cashflows(self, savings_rates: list[CashFlow]) -> np.ndarray:
         """
-        Interpolate a pandas Series using the specified method.
+        Interpolate savings rates other than the command's own onto the command's time steps.
         Parameters
         ----------
-        series : pd.Series
-            The series to interpolate.
-        method : InterpolationMethod
-            The interpolation method to use.
+        savings_rates : list[CashFlow]
+            Savings rate points.
         Returns
         -------
-        pd.Series
-            The interpolated series.
+        np.ndarray
+            s x 1 vector of the cash flow rate of every step, as in the time line.
         """
-        if method == InterpolationMethod.LINEAR:
-            return series.interpolate(method="index", limit_direction="both")
-        elif method == InterpolationMethod.FFILL:
-            return series.ffill()
-        else:
-            raise ValueError(f"Unknown interpolation method: {method}")
-    
+        return self.timeline.interpolate_cashflows(savings_rates, self.savings_rate_interpolation)
+
+    @property
+    def cache_key(self) -> Optional[str]:
+        """
+        Canonical hash of the normalized command and its data version, or None if the command is not seeded
+        (an unseeded run is not reproducible, so its result is never cached).
+        """
+        if self.seed is None:
+            return None
+        payload = self.model_dump(mode="json", exclude=EXECUTION_FIELDS)
+        payload["data_version"] = self.data_version
+        for field in ("weights", "savings_rates", "oneoff_transactions"):
+            payload[field] = sorted(payload[field], key=lambda point: (point["step"], json.dumps(point, sort_keys=True)))
+        return canonical_hash(payload)
+
+    @property
+    def checkpoint_key(self) -> str:
+        """
+        Canonical hash of everything that decides the draws of an incremental run: the command without the plan
+        and its horizon, which the checkpoint is diffed against instead, with the data version.
+        """
+        payload = self.model_dump(mode="json", exclude=PLAN_FIELDS | EXECUTION_FIELDS | {"end_step"})
+        payload["data_version"] = self.data_version
+        return canonical_hash(payload)
+
     def handle(self) -> SimulationResultDTO:
         """
         Handle the command to run the simulation.
+        Seeded commands are served from the result cache when an identical command has already been run.
         Returns
         -------
         SimulationDTO
             Data Transfer Object containing the simulation results.
         """
-        import time
+        cache_key = self.cache_key
+        if cache_key is None:
+            return self.simulate()
 
-        simulation = self.simulation_strategy
-
-        # setup simulation
+        result_cache = get_result_cache()
+        result = result_cache.get(cache_key)
+        if result is None:
+            result = self.simulate()
+            result_cache.put(cache_key, result)
+        return result
 
-        exp_return = self.simulation_strategy.expected_returns.join(pd.Series(self.asset_returns.model_dump(), name='overrides'))
-        exp_return = exp_return.join(pd.Series(self.asset_costs.model_dump(), name='costs'))
-        exp_return['Expected Return'] = exp_return['overrides'].combine_first(exp_return['Expected Return'])
-        exp_return['Expected Return'] = exp_return['Expected Return'] - exp_return['costs']
-        exp_return = exp_return.drop(columns=['overrides', 'costs'])
+    def setup_simulation(self) -> None:
+        """
+        Apply the command's expected return overrides and asset costs to the simulation strategy.
+        """
+        simulation = self.simulation_strategy
+        overrides = self.asset_returns.model_dump()
+        costs = self.asset_costs.model_dump()
+        simulation.expected_returns = np.array(
+            [
+                (overrides[asset] if overrides.get(asset) is not None else expected_return) - costs.get(asset, 0.0)
+                for asset, expected_return in zip(simulation.assets, simulation.expected_returns)
+            ]
+        )
 
+    def simulate(self) -> SimulationResultDTO:
+        """
+        Run the simulation.
+        Returns
+        -------
+        SimulationDTO
+            Data Transfer Object containing the simulation results.
+        """
+        simulation = self.simulation_strategy
 
-        simulation.expected_returns = exp_return
+        # setup simulation
+        self.setup_simulation()
         
         start = time.time()
-        simulation.simulation_data
-        
-
-        mean = simulation.get_mean()
-        mean_real = convert_to_real_wealth(
-            mean, self.base_simulation_data.index.values, self.inflation
-        )[0]
-        
-        median = simulation.get_median()
-        median_real = convert_to_real_wealth(
-            median, self.base_simulation_data.index.values, self.inflation
-        )[0]
-        
+        if self.incremental:
+            checkpoint_store = get_checkpoint_store()
+            checkpoint_key = self.checkpoint_key
+            checkpoint = simulation.run_from_checkpoint(checkpoint_store.get(checkpoint_key))
+            checkpoint_store.put(checkpoint_key, checkpoint)
+        elif self.target_standard_error is None:
+            simulation.run()
+        else:
+            simulation.run_adaptive(self.target_metric, self.target_standard_error)
+        return self.build_result(start)
 
-        percentiles = simulation.get_percentiles(self.percentiles)
-        percentiles_real = convert_to_real_wealth(
-            percentiles, self.base_simulation_data.index.values, self.inflation
-        )
+    def build_result(self, start: float) -> SimulationResultDTO:
+        """
+        Summarise the simulated paths into the result DTO.
+        Parameters
+        ----------
+        start : float
+            Time the simulation started at, as returned by time.time().
+        Returns
+        -------
+        SimulationDTO
+            Data Transfer Object containing the simulation results.
+        """
+        simulation = self.simulation_strategy
 
-        destitution_risk = (simulation.simulation_data == 0).sum(axis=0) / simulation.simulation_data.shape[0]
-        destitution_risk = destitution_risk
+        summary = simulation.summarize(self.percentiles)
+        timeline = self.timeline
+        summary_real = summary.to_real(timeline.time_steps, self.inflation)
+        destitution_risk = summary.destitution_risk
 
-        final_std=np.std(simulation.simulation_data[-1])
-        final_min=np.min(simulation.simulation_data[-1])
-        final_max=np.max(simulation.simulation_data[-1])
-        
-        real_data = convert_to_real_wealth(
-            simulation.simulation_data[-1], self.base_simulation_data.index.values, self.inflation
-        )
-        final_std_real = np.std(real_data[-1])
-        final_min_real = np.min(real_data[-1])
-        final_max_real = np.max(real_data[-1])
-        
-        destitution_area = np.sum(destitution_risk * self.base_simulation_data.time_delta.fillna(0).values)/ np.sum(self.base_simulation_data.time_delta.fillna(0).values)
+        destitution_area = np.sum(destitution_risk[1:] * timeline.time_delta) / np.sum(timeline.time_delta)
         
         end = time.time()
         
         print("destitution area", destitution_area)
         nominal = SimulationDataDTO(
-            percentiles={percentile: percentiles[i, :].tolist() for i, percentile in enumerate(self.percentiles)},
-            mean=mean.tolist(),
-            final_mean=mean[-1],
-            final_median=median[-1],
-            final_max=final_max,
-            final_min=final_min,
-            final_std=final_std,
+            percentiles={percentile: summary.percentile_values[i, :].tolist() for i, percentile in enumerate(self.percentiles)},
+            mean=summary.mean.tolist(),
+            final_mean=summary.mean[-1],
+            final_median=summary.median[-1],
+            final_max=summary.max[-1],
+            final_min=summary.min[-1],
+            final_std=summary.std[-1],
         )
         real = SimulationDataDTO(
-            percentiles={percentile: percentiles_real[i, :].tolist() for i, percentile in enumerate(self.percentiles)},
-            mean=mean_real.tolist(),
-            final_mean=mean_real[-1],
-            final_median=median_real[-1],
-            final_max=final_max_real,
-            final_min=final_min_real,
-            final_std=final_std_real,
+            percentiles={percentile: summary_real.percentile_values[i, :].tolist() for i, percentile in enumerate(self.percentiles)},
+            mean=summary_real.mean.tolist(),
+            final_mean=summary_real.mean[-1],
+            final_median=summary_real.median[-1],
+            final_max=summary_real.max[-1],
+            final_min=summary_real.min[-1],
+            final_std=summary_real.std[-1],
         )
 
         return SimulationResultDTO(
             real=real,
             nominal=nominal,
             destitution=destitution_risk.tolist(),
-            timesteps=self.base_simulation_data.index.to_list(),
+            timesteps=timeline.time_steps.tolist(),
             simulation_time=end - start,
-            simulation_time_per_timestep=(end - start) / len(self.base_simulation_data.index),
-            total_parameters=len(self.base_simulation_data.index) * 3 * simulation.number_of_simulations,
+            simulation_time_per_timestep=(end - start) / len(timeline.time_steps),
+            total_parameters=len(timeline.time_steps) * 3 * simulation.number_of_simulations,
             simulation_time_per_path=(end - start) / simulation.number_of_simulations,
             destitution_area=destitution_area,
+            precision=simulation.dtype.name,
+            variance_reduction=simulation.get_variance_reduction(),
+            standard_error=float(simulation.get_standard_error()[-1]),
+            effective_sample_size=simulation.get_effective_sample_size(),
+            paths_used=simulation.number_of_simulations,
+            achieved_standard_error=simulation.get_achieved_standard_error(),
+            data_version=self.data_version,
+        )
+
+
+# largest coarse grid of the glide path optimizer
+MAX_GLIDE_PATH_GRID = 10000
+# largest Cartesian grid of a sweep
+MAX_SWEEP_GRID = 10000
+# most plans scored at once on shared draws, and most plan x path final wealth values they may hold
+MAX_PLAN_BATCH = 256
+MAX_PLAN_BATCH_ELEMENTS = 2**24
+
+
+def plan_batch_size(number_of_simulations: int) -> int:
+    """
+    Returns how many plans to score at once on shared draws, so that their P x n final wealth stays bounded.
+    """
+    return max(1, min(MAX_PLAN_BATCH, MAX_PLAN_BATCH_ELEMENTS // number_of_simulations))
+
+# fields that may differ between the plans of a batch: they describe the plan, not the draws
+PLAN_FIELDS = {
+    "weights",
+    "savings_rates",
+    "oneoff_transactions",
+    "inflation",
+    "initial_wealth",
+    "percentiles",
+    "weights_interpolation",
+    "savings_rate_interpolation",
+}
+
+
+class RunSimulationBatchCommand(pydantic.BaseModel):
+    """Command to simulate several variants of a plan on common random numbers."""
+
+    plans: list[RunSimulationCommand] = pydantic.Field(min_length=1)
+
+    @pydantic.model_validator(mode="after")
+    def validate_shared_draws(self):
+        """
+        Validate that the plans only differ in the plan itself, so that they can share the same draws.
+        """
+        shared = self.plans[0].model_dump(exclude=PLAN_FIELDS | EXECUTION_FIELDS)
+        for plan in self.plans[1:]:
+            if plan.model_dump(exclude=PLAN_FIELDS | EXECUTION_FIELDS) != shared:
+                raise ValueError(
+                    f"Plans of a batch may only differ in {', '.join(sorted(PLAN_FIELDS))}."
+                )
+        if self.plans[0].target_standard_error is not None:
+            raise ValueError("Plans of a batch cannot be run adaptively.")
+        if len({plan.data_version for plan in self.plans}) > 1:
+            raise ValueError("The historical data changed while the batch was built; please retry.")
+        return self
+
+    def handle(self) -> list[SimulationResultDTO]:
+        """
+        Handle the command to run the batch.
+        Returns
+        -------
+        list[SimulationResultDTO]
+            Data Transfer Objects containing the simulation results, in plan order.
+        """
+        return self.simulate()
+
+    def simulate(self) -> list[SimulationResultDTO]:
+        """
+        Run every plan on one shared set of returns (see `AbstractSimulationStrategy.simulate_plans`).
+        The simulation time reported for each plan is that of the whole batch.
+        Returns
+        -------
+        list[SimulationResultDTO]
+            Data Transfer Objects containing the simulation results, in plan order.
+        """
+        for plan in self.plans:
+            plan.setup_simulation()
+
+        start = time.time()
+        strategies = [plan.simulation_strategy for plan in self.plans]
+        strategies[0].simulate_plans(strategies)
+        return [plan.build_result(start) for plan in self.plans]
+
+
+class RunSimulationSweepCommand(pydantic.BaseModel):
+    """Command to evaluate a plan over a grid of parameter values on shared draws."""
+
+    plan: RunSimulationCommand
+    axes: list[SweepAxis] = pydantic.Field(min_length=1)
+    metrics: list[OutcomeMetric] = [OutcomeMetric.SUCCESS_PROBABILITY]
+
+    @pydantic.model_validator(mode="after")
+    def validate_sweep(self):
+        """
+        Validate that every parameter is swept at most once, that the grid is small enough and that the plan can
+        be scored on plain draws. The draws are held in memory, so the plan is bounded by MAX_SIMULATIONS even
+        when it streams its own runs.
+        """
+        parameters = [axis.parameter for axis in self.axes]
+        if len(set(parameters)) != len(parameters):
+            raise ValueError("Every parameter can only be swept once.")
+        if np.prod([len(axis.values) for axis in self.axes]) > MAX_SWEEP_GRID:
+            raise ValueError(f"The sweep grid has more than {MAX_SWEEP_GRID} cells.")
+        if self.plan.importance_sampling or self.plan.target_standard_error is not None:
+            raise ValueError("Sweeps cannot use importance sampling or adaptive runs.")
+        for axis in self.axes:
+            PlanVariants.validate(axis.parameter, axis.values)
+        self.plan.limit_simulations(self.plan.max_drawn_simulations)
+        return self
+
+    def handle(self) -> SweepResultDTO:
+        """
+        Handle the command to run the sweep.
+        Returns
+        -------
+        SweepResultDTO
+            Data Transfer Object containing the metrics of every grid cell.
+        """
+        return self.simulate()
+
+    def simulate(self) -> SweepResultDTO:
+        """
+        Draw the returns once and score every cell of the Cartesian grid of the axes on them, computing only
+        the requested metrics of each cell. Cells are scored in batches (see `plan_batch_size`).
+        Returns
+        -------
+        SweepResultDTO
+            Data Transfer Object containing the metrics of every grid cell.
+        """
+        simulation = self.plan.simulation_strategy
+        self.plan.setup_simulation()
+
+        start = time.time()
+        returns = simulation.draw_returns()
+        cells = self.grid_cells()
+        batch_size = plan_batch_size(simulation.number_of_simulations)
+        variants = PlanVariants(self.plan)
+        scores = {metric: [] for metric in self.metrics}
+        for first in range(0, len(cells), batch_size):
+            outcomes = simulation.evaluate_plans(returns, *variants.build(cells[first : first + batch_size]))
+            for metric in self.metrics:
+                scores[metric].append(outcomes.metric(metric))
+        shape = [len(axis.values) for axis in self.axes]
+        metrics = {metric.value: np.concatenate(scores[metric]).reshape(shape).tolist() for metric in self.metrics}
+        end = time.time()
+
+        return SweepResultDTO(
+            axes={axis.parameter.value: axis.values for axis in self.axes},
+            shape=shape,
+            metrics=metrics,
+            simulation_time=end - start,
+            paths_used=simulation.number_of_simulations,
+            data_version=self.plan.data_version,
         )
+
+    def grid_cells(self) -> list[dict[SweepParameter, float]]:
+        """
+        Returns the parameter values of every grid cell, in C order over the axes, as `PlanVariants.build` takes them.
+        """
+        parameters = [axis.parameter for axis in self.axes]
+        return [dict(zip(parameters, cell)) for cell in itertools.product(*(axis.values for axis in self.axes))]
+
+
+class RunGoalSeekCommand(pydantic.BaseModel):
+    """Command to solve for the plan parameter value that reaches a target success probability."""
+
+    plan: RunSimulationCommand
+    parameter: SweepParameter
+    target_success_probability: float = pydantic.Field(gt=0.0, le=1.0)
+    lower: float = pydantic.Field(default=0.0, ge=0.0)
+    upper: Optional[float] = pydantic.Field(default=None, ge=0.0)
+    tolerance: float = pydantic.Field(default=1e-3, gt=0.0)
+    candidates_per_iteration: int = pydantic.Field(default=8, gt=0)
+    max_iterations: int = pydantic.Field(default=50, gt=0)
+
+    @pydantic.model_validator(mode="after")
+    def validate_goal(self):
+        """
+        Validate that the success probability is monotone in the parameter and that the plan can be scored on
+        plain draws. The draws are held in memory, so the plan is bounded by MAX_SIMULATIONS.
+        """
+        if self.parameter not in MONOTONE_PARAMETERS:
+            raise ValueError(f"The success probability is not monotone in {self.parameter.value}.")
+        if self.upper is not None and self.upper < self.lower:
+            raise ValueError("The upper bound must not be below the lower bound.")
+        if self.plan.importance_sampling or self.plan.target_standard_error is not None:
+            raise ValueError("Goal seeking cannot use importance sampling or adaptive runs.")
+        self.plan.limit_simulations(self.plan.max_drawn_simulations)
+        return self
+
+    def handle(self) -> GoalSeekResultDTO:
+        """
+        Handle the command to run the solver.
+        Returns
+        -------
+        GoalSeekResultDTO
+            Data Transfer Object containing the solution and its metrics.
+        """
+        return self.simulate()
+
+    def simulate(self) -> GoalSeekResultDTO:
+        """
+        Draw the returns once and search the parameter on them (see `GoalSeeker`). Every iteration only re-runs
+        the wealth recursion for a batch of candidate values.
+        Returns
+        -------
+        GoalSeekResultDTO
+            Data Transfer Object containing the solution and its metrics.
+        """
+        simulation = self.plan.simulation_strategy
+        self.plan.setup_simulation()
+
+        start = time.time()
+        returns = simulation.draw_returns()
+        variants = PlanVariants(self.plan)
+        batch_size = plan_batch_size(simulation.number_of_simulations)
+
+        def evaluate(values: np.ndarray) -> PlanOutcomes:
+            return simulation.evaluate_plans(returns, *variants.build([{self.parameter: value} for value in values]))
+
+        def success_probability(values: np.ndarray) -> np.ndarray:
+            return np.concatenate(
+                [
+                    evaluate(values[first : first + batch_size]).metric(OutcomeMetric.SUCCESS_PROBABILITY)
+                    for first in range(0, len(values), batch_size)
+                ]
+            )
+
+        seeker = GoalSeeker(
+            success_probability,
+            self.target_success_probability,
+            MONOTONE_PARAMETERS[self.parameter],
+            integer=self.parameter == SweepParameter.RETIREMENT_STEP,
+            candidates=self.candidates_per_iteration,
+            tolerance=self.tolerance,
+            max_iterations=self.max_iterations,
+        )
+        upper = self.upper
+        if upper is None and self.parameter == SweepParameter.RETIREMENT_STEP:
+            upper = float(self.end_step)
+        solution = seeker.solve(self.lower, upper, self.start_value(variants))
+        outcomes = evaluate(np.array([solution]))
+        end = time.time()
+
+        return GoalSeekResultDTO(
+            parameter=self.parameter.value,
+            solution=solution,
+            target_success_probability=self.target_success_probability,
+            metrics={metric.value: float(outcomes.metric(metric)[0]) for metric in OutcomeMetric},
+            iterations=seeker.iterations,
+            evaluations=seeker.evaluations,
+            simulation_time=end - start,
+            paths_used=simulation.number_of_simulations,
+            data_version=self.plan.data_version,
+        )
+
+    @property
+    def end_step(self) -> float:
+        return float(self.plan.timeline.time_steps[-1])
+
+    def start_value(self, variants: PlanVariants) -> float:
+        """
+        Returns the plan's own value of the parameter, from which an unbounded search range is doubled.
+        """
+        match self.parameter:
+            case SweepParameter.INITIAL_WEALTH:
+                return self.plan.initial_wealth
+            case SweepParameter.SAVINGS_LEVEL:
+                return float(np.max(variants.cashflows, initial=0.0))
+            case SweepParameter.SPENDING_LEVEL:
+                return float(-np.min(variants.cashflows, initial=0.0))
+        return 1.0
+
+
+class RunGlidePathOptimizationCommand(pydantic.BaseModel):
+    """Command to find the stocks weight schedule that maximizes an objective, subject to destitution caps."""
+
+    plan: RunSimulationCommand
+    objective: OutcomeMetric = pydantic.Field(default=OutcomeMetric.FINAL_MEDIAN_REAL)
+    knots: int = pydantic.Field(default=3, ge=2)
+    grid_levels: int = pydantic.Field(default=5, ge=2)
+    max_destitution_area: Optional[float] = pydantic.Field(default=None, ge=0.0, le=1.0)
+    min_success_probability: Optional[float] = pydantic.Field(default=None, ge=0.0, le=1.0)
+    min_step: float = pydantic.Field(default=0.01, gt=0.0)
+    max_iterations: int = pydantic.Field(default=50, gt=0)
+
+    @pydantic.model_validator(mode="after")
+    def validate_search(self):
+        """
+        Validate that the coarse grid is small enough and that the plan can be scored on plain draws. The draws
+        are held in memory, so the plan is bounded by MAX_SIMULATIONS.
+        """
+        if self.grid_levels**self.knots > MAX_GLIDE_PATH_GRID:
+            raise ValueError(f"The coarse grid has more than {MAX_GLIDE_PATH_GRID} glide paths.")
+        if self.plan.importance_sampling or self.plan.target_standard_error is not None:
+            raise ValueError("Glide path optimization cannot use importance sampling or adaptive runs.")
+        self.plan.limit_simulations(self.plan.max_drawn_simulations)
+        return self
+
+    def handle(self) -> GlidePathResultDTO:
+        """
+        Handle the command to run the optimizer.
+        Returns
+        -------
+        GlidePathResultDTO
+            Data Transfer Object containing the best glide path and its metrics.
+        """
+        return self.simulate()
+
+    def simulate(self) -> GlidePathResultDTO:
+        """
+        Draw the returns once and search the stocks weights at evenly spaced knots, interpolated linearly in
+        between (see `GlidePathOptimizer`). Candidates are scored in batches on the same draws.
+        Returns
+        -------
+        GlidePathResultDTO
+            Data Transfer Object containing the best glide path and its metrics.
+        """
+        simulation = self.plan.simulation_strategy
+        self.plan.setup_simulation()
+
+        start = time.time()
+        returns = simulation.draw_returns()
+        variants = PlanVariants(self.plan)
+        knot_steps = np.linspace(simulation.time_steps[0], simulation.time_steps[-1], self.knots)
+
+        def evaluate(candidates: np.ndarray) -> PlanOutcomes:
+            paths = [self.stocks_path(knot_steps, candidate, simulation.time_steps) for candidate in candidates]
+            return simulation.evaluate_plans(
+                returns, *variants.build([{SweepParameter.STOCKS_WEIGHT: path} for path in paths])
+            )
+
+        def score(candidates: np.ndarray) -> np.ndarray:
+            outcomes = evaluate(candidates)
+            feasible = np.ones(len(candidates), dtype=bool)
+            if self.max_destitution_area is not None:
+                feasible &= outcomes.metric(OutcomeMetric.DESTITUTION_AREA) <= self.max_destitution_area
+            if self.min_success_probability is not None:
+                feasible &= outcomes.metric(OutcomeMetric.SUCCESS_PROBABILITY) >= self.min_success_probability
+            return np.where(feasible, outcomes.metric(self.objective), -np.inf)
+
+        optimizer = GlidePathOptimizer(
+            score,
+            self.knots,
+            self.grid_levels,
+            self.min_step,
+            self.max_iterations,
+            batch_size=plan_batch_size(simulation.number_of_simulations),
+        )
+        knot_weights, _ = optimizer.solve()
+        outcomes = evaluate(knot_weights[None, :])
+        end = time.time()
+
+        return GlidePathResultDTO(
+            knot_steps=knot_steps.tolist(),
+            knot_stocks_weights=knot_weights.tolist(),
+            stocks_weights=self.stocks_path(knot_steps, knot_weights, simulation.time_steps).tolist(),
+            timesteps=simulation.time_steps[1:].tolist(),
+            objective=self.objective.value,
+            metrics={metric.value: float(outcomes.metric(metric)[0]) for metric in OutcomeMetric},
+            iterations=optimizer.iterations,
+            evaluations=optimizer.evaluations,
+            simulation_time=end - start,
+            paths_used=simulation.number_of_simulations,
+            data_version=self.plan.data_version,
+        )
+
+    @staticmethod
+    def stocks_path(knot_steps: np.ndarray, knot_weights: np.ndarray, time_steps: np.ndarray) -> np.ndarray:
+        """
+        Returns the s x 1 stocks weights of every step, interpolated linearly between the knots
+        (step i being the step ending at time_steps[i + 1], as in the simulation data).
+        """
+        return np.interp(time_steps[1:], knot_steps, knot_weights)
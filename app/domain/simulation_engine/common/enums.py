@@ -12,4 +12,42 @@ class SimulationStepType(str, Enum):
 class InterpolationMethod(str, Enum):
     LINEAR = "linear"
     FFILL = "ffill"
-    
\ No newline at end of file
+
+class StatisticsMode(str, Enum):
+    EXACT = "exact"
+    SKETCH = "sketch"
+
+class ExecutorType(str, Enum):
+    THREAD = "thread"
+    PROCESS = "process"
+
+class SimulationPrecision(str, Enum):
+    FLOAT64 = "float64"
+    FLOAT32 = "float32"
+
+class KernelBackendType(str, Enum):
+    AUTO = "auto"
+    NUMPY = "numpy"
+    NUMBA = "numba"
+
+class PrecisionTarget(str, Enum):
+    FINAL_MEDIAN = "final_median"
+    FINAL_MEAN = "final_mean"
+    SUCCESS_PROBABILITY = "success_probability"
+
+class OutcomeMetric(str, Enum):
+    SUCCESS_PROBABILITY = "success_probability"
+    DESTITUTION_AREA = "destitution_area"
+    FINAL_MEAN = "final_mean"
+    FINAL_MEDIAN = "final_median"
+    FINAL_MEAN_REAL = "final_mean_real"
+    FINAL_MEDIAN_REAL = "final_median_real"
+
+class SweepParameter(str, Enum):
+    INITIAL_WEALTH = "initial_wealth"
+    SAVINGS_SCALE = "savings_scale"
+    SPENDING_SCALE = "spending_scale"
+    SAVINGS_LEVEL = "savings_level"
+    SPENDING_LEVEL = "spending_level"
+    STOCKS_WEIGHT = "stocks_weight"
+    RETIREMENT_STEP = "retirement_step"
@@ -3,6 +3,7 @@ from pydantic import Field
 from typing import List, Optional
 from functools import cached_property
 import numpy as np
+from .enums import SweepParameter
 
 
 class ExpectedReturns(pydantic.BaseModel):
@@ -67,6 +68,12 @@ class SimulationPortfolioWeights(pydantic.BaseModel):
         return data
 
 
+class SweepAxis(pydantic.BaseModel):
+    """Model for one axis of a parameter sweep."""
+    parameter: SweepParameter
+    values: list[float] = Field(min_length=1)
+
+
 class CashFlow(pydantic.BaseModel):
     step: float
     value: float
@@ -0,0 +1,464 @@
+import csv
+import hashlib
+import io
+import json
+import os
+import shutil
+import threading
+import time
+from functools import cache
+from typing import Optional
+import numpy as np
+from .common.enums import SimulationStepType
+
+DATA_DIR = "../data"
+
+this_dir = os.path.dirname(os.path.abspath(__file__))
+
+DATA_DIR = os.path.join(this_dir, DATA_DIR)
+
+# bump when the layout of the compiled files changes, so that stale caches are compiled again
+DATA_STORE_FORMAT = 2
+METADATA_FILE = "metadata.json"
+# length of the prefix of the CSV's SHA-256 used as the data version
+DATA_VERSION_LENGTH = 16
+
+
+def annual_returns(dates: np.ndarray, monthly: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Compound monthly returns into calendar-year returns, (1 + r_1) ... (1 + r_m) - 1 over the months of every year
+    present (missing months count as 0).
+    Parameters
+    ----------
+    dates : np.ndarray
+        Sorted dates of the monthly returns.
+    monthly : np.ndarray
+        months x num_assets matrix of monthly returns.
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]
+        The years and the years x num_assets matrix of annual returns.
+    """
+    years = dates.astype("datetime64[Y]")
+    if len(years) == 0:
+        return years, np.empty((0, monthly.shape[1]))
+    starts = np.flatnonzero(np.append(True, years[1:] != years[:-1]))
+    gross = np.where(np.isnan(monthly), 1.0, 1.0 + monthly)
+    return years[starts], np.multiply.reduceat(gross, starts, axis=0) - 1
+
+
+def parse_returns(text: str) -> tuple[list[str], np.ndarray, np.ndarray]:
+    """
+    Parse CSV rows of a date and one monthly return per asset (empty for a missing return).
+    Returns
+    -------
+    tuple[list[str], np.ndarray, np.ndarray]
+        The first row, the dates of the other rows and their returns.
+    """
+    rows = [row for row in csv.reader(io.StringIO(text)) if row]
+    if not rows:
+        raise ValueError("The historical returns file is empty.")
+    dates = np.array([row[0] for row in rows[1:]], dtype="datetime64[D]")
+    returns = np.array(
+        [[float(value) if value else np.nan for value in row[1:]] for row in rows[1:]], dtype=np.float64
+    ).reshape(len(rows) - 1, len(rows[0]) - 1)
+    return rows[0], dates, returns
+
+
+class ReturnMoments:
+    """
+    Running moments of a matrix of returns: the available returns of every asset, for their means, and the
+    centred cross products of the periods where all assets have a return, for their sample covariance.
+    Periods are added with the pairwise update of Chan et al. and removed with its inverse, so appended
+    history never needs a pass over the rows already seen. Instances are immutable.
+    """
+
+    def __init__(self, counts: np.ndarray, sums: np.ndarray, complete: int, center: np.ndarray, m2: np.ndarray):
+        """
+        Parameters
+        ----------
+        counts : np.ndarray
+            Number of available returns of every asset.
+        sums : np.ndarray
+            Sum of the available returns of every asset.
+        complete : int
+            Number of periods where all assets have a return.
+        center : np.ndarray
+            Mean of the complete periods.
+        m2 : np.ndarray
+            num_assets x num_assets sum of the centred cross products of the complete periods.
+        """
+        self.counts = counts
+        self.sums = sums
+        self.complete = int(complete)
+        self.center = center
+        self.m2 = m2
+
+    @classmethod
+    def from_returns(cls, returns: np.ndarray) -> "ReturnMoments":
+        available = ~np.isnan(returns)
+        complete = returns[available.all(axis=1)]
+        center = complete.mean(axis=0) if len(complete) else np.zeros(returns.shape[1])
+        centred = complete - center
+        return cls(available.sum(axis=0), np.where(available, returns, 0.0).sum(axis=0), len(complete), center, centred.T @ centred)
+
+    def add(self, returns: np.ndarray) -> "ReturnMoments":
+        """
+        Returns the moments with the periods of `returns` added.
+        """
+        other = ReturnMoments.from_returns(returns)
+        complete = self.complete + other.complete
+        if other.complete == 0:
+            center, m2 = self.center, self.m2
+        else:
+            delta = other.center - self.center
+            center = self.center + delta * (other.complete / complete)
+            m2 = self.m2 + other.m2 + np.outer(delta, delta) * (self.complete * other.complete / complete)
+        return ReturnMoments(self.counts + other.counts, self.sums + other.sums, complete, center, m2)
+
+    def remove(self, period: np.ndarray) -> "ReturnMoments":
+        """
+        Returns the moments with one period that was added before removed again.
+        """
+        available = ~np.isnan(period)
+        counts, sums = self.counts - available, self.sums - np.where(available, period, 0.0)
+        if not available.all():
+            return ReturnMoments(counts, sums, self.complete, self.center, self.m2)
+        complete = self.complete - 1
+        if complete == 0:
+            return ReturnMoments(counts, sums, 0, np.zeros_like(self.center), np.zeros_like(self.m2))
+        center = (self.center * self.complete - period) / complete
+        delta = period - center
+        return ReturnMoments(counts, sums, complete, center, self.m2 - np.outer(delta, delta) * (complete / self.complete))
+
+    @property
+    def mean(self) -> np.ndarray:
+        return self.sums / self.counts
+
+    @property
+    def cov(self) -> np.ndarray:
+        return self.m2 / (self.complete - 1)
+
+    def to_arrays(self, prefix: str) -> dict[str, np.ndarray]:
+        return {
+            f"{prefix}_counts": self.counts,
+            f"{prefix}_sums": self.sums,
+            f"{prefix}_complete": np.array(self.complete),
+            f"{prefix}_center": self.center,
+            f"{prefix}_m2": self.m2,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: dict[str, np.ndarray], prefix: str) -> "ReturnMoments":
+        return cls(*(np.array(arrays[f"{prefix}_{name}"]) for name in ("counts", "sums", "complete", "center", "m2")))
+
+
+class HistoricalData:
+    """
+    One version of the historical returns compiled from `returns.csv`: the monthly and annual return matrices and
+    their moments, as plain arrays. Loaded from the binary store, the return matrices are memory-mapped read-only.
+    A version is never modified, so simulations that hold it keep consistent inputs while newer versions load.
+    """
+
+    ARRAYS = ("dates", "monthly_returns", "years", "annual_returns")
+
+    def __init__(
+        self,
+        assets: list[str],
+        arrays: dict[str, np.ndarray],
+        moments: dict[SimulationStepType, ReturnMoments],
+        metadata: Optional[dict] = None,
+    ):
+        """
+        Parameters
+        ----------
+        assets : list[str]
+            Asset names, in the column order of the CSV.
+        arrays : dict[str, np.ndarray]
+            The arrays named in ARRAYS.
+        moments : dict[SimulationStepType, ReturnMoments]
+            Moments of the returns of every step type.
+        metadata : dict, optional
+            Metadata of the compiled store.
+        """
+        self.assets = assets
+        self.arrays = arrays
+        self.moments = moments
+        self.metadata = metadata or {}
+        for array in arrays.values():
+            array.flags.writeable = False
+        self._cholesky: dict[SimulationStepType, np.ndarray] = {}
+
+    @property
+    def sha256(self) -> Optional[str]:
+        return self.metadata.get("sha256")
+
+    @property
+    def version(self) -> str:
+        """
+        Version of the data: a prefix of the SHA-256 of the CSV it was compiled from.
+        """
+        return (self.sha256 or "")[:DATA_VERSION_LENGTH]
+
+    @classmethod
+    def from_csv(cls, content: bytes, source: str = "returns.csv") -> "HistoricalData":
+        """
+        Parse and aggregate the contents of a CSV (a date column, then one column of monthly returns per asset)
+        with NumPy.
+        """
+        header, dates, monthly = parse_returns(content.decode("utf-8"))
+        order = np.argsort(dates, kind="stable")
+        dates, monthly = dates[order], monthly[order]
+        years, annual = annual_returns(dates, monthly)
+        arrays = {"dates": dates, "monthly_returns": monthly, "years": years, "annual_returns": annual}
+        moments = {
+            SimulationStepType.MONTHLY: ReturnMoments.from_returns(monthly),
+            SimulationStepType.ANNUAL: ReturnMoments.from_returns(annual),
+        }
+        metadata = {
+            "format": DATA_STORE_FORMAT,
+            "source": source,
+            "source_bytes": len(content),
+            "sha256": hashlib.sha256(content).hexdigest(),
+        }
+        return cls(header[1:], arrays, moments, metadata)
+
+    def append_csv(self, content: bytes) -> Optional["HistoricalData"]:
+        """
+        Returns the next version of the data if `content` is the CSV this version was compiled from with rows
+        appended after its last date, updating the moments with the new rows only; None otherwise.
+        """
+        size = self.metadata.get("source_bytes")
+        if (
+            size is None
+            or len(content) <= size
+            or content[size - 1 : size] != b"\n"
+            or hashlib.sha256(content[:size]).hexdigest() != self.sha256
+        ):
+            return None
+        try:
+            _, dates, monthly = parse_returns(content[:size].split(b"\n", 1)[0].decode("utf-8") + "\n" + content[size:].decode("utf-8"))
+        except ValueError:
+            return None
+        if len(dates) == 0 or monthly.shape[1] != len(self.assets):
+            return None
+        old_dates, old_years, old_annual = self.arrays["dates"], self.arrays["years"], self.arrays["annual_returns"]
+        if np.any(np.diff(dates) <= np.timedelta64(0, "D")) or (len(old_dates) and dates[0] <= old_dates[-1]):
+            return None
+
+        new_years, new_annual = annual_returns(dates, monthly)
+        annual_moments = self.moments[SimulationStepType.ANNUAL]
+        kept = len(old_years)
+        if kept and new_years[0] == old_years[-1]:  # the last year continues
+            kept -= 1
+            annual_moments = annual_moments.remove(np.array(old_annual[-1]))
+            new_annual = new_annual.copy()
+            new_annual[0] = (1 + old_annual[-1]) * (1 + new_annual[0]) - 1
+        arrays = {
+            "dates": np.concatenate([old_dates, dates]),
+            "monthly_returns": np.concatenate([self.arrays["monthly_returns"], monthly]),
+            "years": np.concatenate([old_years[:kept], new_years]),
+            "annual_returns": np.concatenate([old_annual[:kept], new_annual]),
+        }
+        moments = {
+            SimulationStepType.MONTHLY: self.moments[SimulationStepType.MONTHLY].add(monthly),
+            SimulationStepType.ANNUAL: annual_moments.add(new_annual),
+        }
+        metadata = {
+            **self.metadata,
+            "source_bytes": len(content),
+            "sha256": hashlib.sha256(content).hexdigest(),
+            "appended_to": self.sha256,
+        }
+        return HistoricalData(self.assets, arrays, moments, metadata)
+
+    @classmethod
+    def load(cls, directory: str) -> "HistoricalData":
+        """
+        Load a compiled store, memory-mapping its arrays.
+        Raises FileNotFoundError or ValueError if the store is missing, incomplete or of another format.
+        """
+        with open(os.path.join(directory, METADATA_FILE), "r", encoding="utf-8") as handle:
+            metadata = json.load(handle)
+        if metadata.get("format") != DATA_STORE_FORMAT:
+            raise ValueError(f"Unsupported data store format in {directory}.")
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in cls.ARRAYS}
+        with np.load(os.path.join(directory, "moments.npz")) as stored:
+            moments = {step_type: ReturnMoments.from_arrays(stored, step_type.value) for step_type in SimulationStepType}
+        return cls(metadata["assets"], arrays, moments, metadata)
+
+    def save(self, directory: str) -> None:
+        """
+        Write the store into `directory`. The files are written into a temporary directory that is renamed into
+        place, so that concurrent workers never see a partial store; if another worker was first, its store is kept.
+        """
+        parent = os.path.dirname(directory)
+        os.makedirs(parent, exist_ok=True)
+        staging = f"{directory}.{os.getpid()}.{threading.get_ident()}.tmp"
+        os.makedirs(staging, exist_ok=True)
+        try:
+            for name in self.ARRAYS:
+                np.save(os.path.join(staging, f"{name}.npy"), self.arrays[name])
+            moments = {}
+            for step_type, step_moments in self.moments.items():
+                moments.update(step_moments.to_arrays(step_type.value))
+                moments[f"{step_type.value}_mean"] = step_moments.mean
+                moments[f"{step_type.value}_cov"] = step_moments.cov
+            np.savez(os.path.join(staging, "moments.npz"), **moments)
+            metadata = {**self.metadata, "assets": self.assets, "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+            with open(os.path.join(staging, METADATA_FILE), "w", encoding="utf-8") as handle:
+                json.dump(metadata, handle, indent=2)
+            os.replace(staging, directory)
+        except OSError:
+            if not os.path.exists(os.path.join(directory, METADATA_FILE)):
+                raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def returns(self, step_type: SimulationStepType = SimulationStepType.MONTHLY) -> np.ndarray:
+        """
+        Returns the periods x num_assets matrix of historical returns of the step type.
+        """
+        return self.arrays[f"{SimulationStepType(step_type).value}_returns"]
+
+    def periods(self, step_type: SimulationStepType = SimulationStepType.MONTHLY) -> np.ndarray:
+        """
+        Returns the dates (monthly) or years (annual) of the historical returns.
+        """
+        return self.arrays["dates" if SimulationStepType(step_type) == SimulationStepType.MONTHLY else "years"]
+
+    def mean(self, step_type: SimulationStepType = SimulationStepType.MONTHLY) -> np.ndarray:
+        return self.moments[SimulationStepType(step_type)].mean
+
+    def cov(self, step_type: SimulationStepType = SimulationStepType.MONTHLY) -> np.ndarray:
+        return self.moments[SimulationStepType(step_type)].cov
+
+    def cholesky(self, step_type: SimulationStepType = SimulationStepType.MONTHLY) -> np.ndarray:
+        """
+        Returns the lower triangular Cholesky factor of the covariance matrix, computed once per version.
+        """
+        step_type = SimulationStepType(step_type)
+        if step_type not in self._cholesky:
+            self._cholesky[step_type] = np.linalg.cholesky(self.cov(step_type))
+        return self._cholesky[step_type]
+
+    def __getstate__(self):
+        # process workers receive the arrays themselves rather than the memory maps
+        state = dict(self.__dict__)
+        state["arrays"] = {name: np.array(array) for name, array in self.arrays.items()}
+        return state
+
+
+def load_historical_data(
+    csv_path: str, cache_dir: str, previous: Optional[HistoricalData] = None
+) -> HistoricalData:
+    """
+    Load the historical data of a CSV from its compiled store in `cache_dir`, keyed by the SHA-256 of the CSV.
+    The store is compiled on the first load of new CSV contents: from `previous` and the appended rows only
+    if the CSV only gained rows since `previous` was compiled, from the whole CSV otherwise. If it cannot be
+    written (e.g. on a read-only file system), the compiled data is used from memory.
+    Parameters
+    ----------
+    csv_path : str
+        Path of the CSV of monthly returns.
+    cache_dir : str
+        Directory of the compiled stores.
+    previous : HistoricalData, optional
+        The version loaded before, if any.
+    Returns
+    -------
+    HistoricalData
+        The historical data, `previous` itself if the CSV did not change.
+    """
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f"File not found: {csv_path}")
+    with open(csv_path, "rb") as handle:
+        content = handle.read()
+    digest = hashlib.sha256(content).hexdigest()
+    if previous is not None and previous.sha256 == digest:
+        return previous
+    directory = os.path.join(cache_dir, digest)
+    try:
+        return HistoricalData.load(directory)
+    except (FileNotFoundError, ValueError, KeyError):
+        pass
+    data = previous.append_csv(content) if previous is not None else None
+    if data is None:
+        data = HistoricalData.from_csv(content, os.path.basename(csv_path))
+    try:
+        data.save(directory)
+        return HistoricalData.load(directory)
+    except OSError:
+        return data
+
+
+class MarketDataRegistry:
+    """
+    Holds the current version of the historical data and swaps to a new one when the CSV changes on disk,
+    without restarting the process. Every caller gets an immutable version (see `HistoricalData`); a swap only
+    replaces the registry's reference, so simulations that already hold the previous version finish on it.
+    """
+
+    def __init__(self, csv_path: str, cache_dir: str):
+        """
+        Parameters
+        ----------
+        csv_path : str
+            Path of the CSV of monthly returns.
+        cache_dir : str
+            Directory of the compiled stores.
+        """
+        self.csv_path = csv_path
+        self.cache_dir = cache_dir
+        self.reloads = 0
+        self._data: Optional[HistoricalData] = None
+        self._stat: Optional[tuple[int, int]] = None
+        self._lock = threading.Lock()
+
+    def current(self) -> HistoricalData:
+        """
+        Returns the current version, loading a new one first if the CSV was modified since the last check.
+        If a modified CSV cannot be loaded (e.g. while it is being written), the current version is kept and
+        loading is retried on the next call.
+        """
+        stat = os.stat(self.csv_path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if key != self._stat or self._data is None:
+                try:
+                    data = load_historical_data(self.csv_path, self.cache_dir, self._data)
+                except (OSError, ValueError):
+                    if self._data is None:
+                        raise
+                else:
+                    if data is not self._data:
+                        self._data = data
+                        self.reloads += 1
+                    self._stat = key
+            return self._data
+
+
+def data_cache_dir() -> str:
+    """
+    Directory of the compiled historical data, SIMULATION_DATA_CACHE_DIR or `.cache` in the data directory.
+    """
+    return os.environ.get("SIMULATION_DATA_CACHE_DIR", os.path.join(DATA_DIR, ".cache"))
+
+
+@cache
+def get_market_data_registry() -> MarketDataRegistry:
+    """
+    Process-wide registry of the versions of `returns.csv`, compiled into SIMULATION_DATA_CACHE_DIR.
+    """
+    return MarketDataRegistry(os.path.join(DATA_DIR, "returns.csv"), data_cache_dir())
+
+
+def get_historical_data() -> HistoricalData:
+    """
+    Get the current version of the historical data, reloaded when `returns.csv` changes.
+    Returns
+    -------
+    HistoricalData
+        Monthly and annual return matrices, means and covariances.
+    """
+    return get_market_data_registry().current()
@@ -1,55 +1,49 @@
-import os
 import pandas as pd
 import numpy as np
-from functools import cache
+from typing import Optional
 from .common.enums import SimulationStepType
+from .data_store import DATA_DIR, HistoricalData, data_cache_dir, get_historical_data, get_market_data_registry
 
-DATA_DIR = "../data"
 
-this_dir = os.path.dirname(os.path.abspath(__file__))
-
-DATA_DIR = os.path.join(this_dir, DATA_DIR)
-
-@cache
-def load_historical_returns_header() -> pd.Series:
+def load_historical_returns_header(data: Optional[HistoricalData] = None) -> pd.Series:
     """
     Load the header of the historical returns file.
+    Parameters
+    ----------
+    data : HistoricalData, optional
+        Version of the historical data, by default the current one.
     Returns
     -------
     pd.Series
         Series containing the header of the historical returns file.
     """
-    file_path = os.path.join(DATA_DIR, "returns.csv")
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(f"File not found: {file_path}")
-    
-    df = pd.read_csv(file_path, header=0)
-    header = df.columns[1:]
-    return pd.Series(header, name="Assets")
-    
+    data = data if data is not None else get_historical_data()
+    return pd.Series(data.assets, name="Assets")
+
 
-@cache
-def load_historical_returns(step_type: SimulationStepType = SimulationStepType.MONTHLY) -> pd.DataFrame:
+def load_historical_returns(
+    step_type: SimulationStepType = SimulationStepType.MONTHLY, data: Optional[HistoricalData] = None
+) -> pd.DataFrame:
     """
     Load historical returns from the data directory.
+    Annual returns compound the monthly returns of every calendar year and are indexed by the year's end.
+    Parameters
+    ----------
+    step_type : SimulationStepType, optional
+        Step type of the returns, by default monthly.
+    data : HistoricalData, optional
+        Version of the historical data, by default the current one.
     Returns
     -------
     pd.DataFrame
         DataFrame containing historical returns.
     """
-    file_path = os.path.join(DATA_DIR, "returns.csv")
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(f"File not found: {file_path}")
-    
-    returns = pd.read_csv(file_path, index_col=0, parse_dates=True, header=0)
-    returns.index.name = "Date"
-    match step_type:
-        case SimulationStepType.MONTHLY:
-            pass # Monthly returns are already in the correct format
-        case SimulationStepType.ANNUAL:
-            returns = returns.resample("YE").apply(lambda x: (1 + x).prod() - 1)
-            returns = returns.dropna()
-    return returns
+    data = data if data is not None else get_historical_data()
+    periods = data.periods(step_type)
+    if SimulationStepType(step_type) == SimulationStepType.ANNUAL:
+        periods = (periods + 1).astype("datetime64[D]") - 1
+    index = pd.DatetimeIndex(np.asarray(periods, dtype="datetime64[ns]"), name="Date")
+    return pd.DataFrame(np.array(data.returns(step_type)), index=index, columns=data.assets)
 
 
 def get_cov_from_returns(returns: pd.DataFrame) -> pd.DataFrame:
@@ -72,8 +66,9 @@ def get_cov_from_returns(returns: pd.DataFrame) -> pd.DataFrame:
     return cov_matrix
 
 
-@cache
-def get_historical_cov(step_type: SimulationStepType = SimulationStepType.MONTHLY) -> pd.DataFrame:
+def get_historical_cov(
+    step_type: SimulationStepType = SimulationStepType.MONTHLY, data: Optional[HistoricalData] = None
+) -> pd.DataFrame:
     """
     Get the covariance matrix of historical returns.
     Returns
@@ -81,12 +76,27 @@ def get_historical_cov(step_type: SimulationStepType = SimulationStepType.MONTHL
     pd.DataFrame
         Covariance matrix of historical returns.
     """
-    returns = load_historical_returns(step_type=step_type)
-    return get_cov_from_returns(returns)
+    data = data if data is not None else get_historical_data()
+    return pd.DataFrame(data.cov(step_type), index=data.assets, columns=data.assets)
+
+
+def get_historical_cholesky(
+    step_type: SimulationStepType = SimulationStepType.MONTHLY, data: Optional[HistoricalData] = None
+) -> np.ndarray:
+    """
+    Get the lower triangular Cholesky factor of the historical covariance matrix.
+    Returns
+    -------
+    np.ndarray
+        Cholesky factor, in the asset order of the covariance matrix.
+    """
+    data = data if data is not None else get_historical_data()
+    return data.cholesky(step_type)
 
 
-@cache
-def get_historical_exp_ret(step_type: SimulationStepType = SimulationStepType.MONTHLY) -> pd.DataFrame:
+def get_historical_exp_ret(
+    step_type: SimulationStepType = SimulationStepType.MONTHLY, data: Optional[HistoricalData] = None
+) -> pd.DataFrame:
     """
     Get the expected returns from historical returns.
     Returns
@@ -94,13 +104,13 @@ def get_historical_exp_ret(step_type: SimulationStepType = SimulationStepType.MO
     pd.DataFrame
         Expected returns of historical returns.
     """
-    returns = load_historical_returns(step_type=step_type)
-    exp_ret = returns.mean()
-    return exp_ret.to_frame(name="Expected Return")
+    data = data if data is not None else get_historical_data()
+    return pd.DataFrame({"Expected Return": data.mean(step_type)}, index=data.assets)
 
 
-@cache
-def get_historical_vol(step_type: SimulationStepType = SimulationStepType.MONTHLY) -> pd.DataFrame:
+def get_historical_vol(
+    step_type: SimulationStepType = SimulationStepType.MONTHLY, data: Optional[HistoricalData] = None
+) -> pd.DataFrame:
     """
     Get the historical volatility from historical returns.
     Returns
@@ -108,11 +118,11 @@ def get_historical_vol(step_type: SimulationStepType = SimulationStepType.MONTHL
     pd.DataFrame
         Historical volatility of returns.
     """
-    returns = load_historical_returns()
+    returns = load_historical_returns(data=data)
     vol = returns.std()
     match step_type:
         case SimulationStepType.MONTHLY:
             pass 
         case SimulationStepType.ANNUAL:
             vol = vol * np.sqrt(12)
-    return vol.to_frame(name="Historical Volatility")
\ No newline at end of file
+    return vol.to_frame(name="Historical Volatility")
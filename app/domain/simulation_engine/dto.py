@@ -1,4 +1,5 @@
 import pydantic
+from typing import Optional
 
 
 class AbstractDTO(pydantic.BaseModel):
@@ -45,4 +46,53 @@ class SimulationResultDTO(AbstractDTO):
     simulation_time_per_path: float
     total_parameters: int
     destitution_area: float
-    
\ No newline at end of file
+    precision: str = "float64"
+    variance_reduction: Optional[float] = None
+    standard_error: Optional[float] = None
+    effective_sample_size: Optional[float] = None
+    paths_used: Optional[int] = None
+    achieved_standard_error: Optional[float] = None
+    # version of the historical data the simulation was calibrated on
+    data_version: Optional[str] = None
+    
+
+class SweepResultDTO(AbstractDTO):
+    """Data Transfer Object for the metrics of a parameter sweep."""
+    axes: dict[str, list[float]]
+    shape: list[int]
+    # metric -> N-dimensional nested list over the axes, in axis order
+    metrics: dict[str, list]
+    simulation_time: float
+    paths_used: int
+    data_version: Optional[str] = None
+
+
+class GoalSeekResultDTO(AbstractDTO):
+    """Data Transfer Object for the solution of a goal seek."""
+    parameter: str
+    solution: float
+    target_success_probability: float
+    # final metrics of the plan at the solution, by OutcomeMetric
+    metrics: dict[str, float]
+    iterations: int
+    evaluations: int
+    simulation_time: float
+    paths_used: int
+    data_version: Optional[str] = None
+
+
+class GlidePathResultDTO(AbstractDTO):
+    """Data Transfer Object for the result of a glide path optimization."""
+    knot_steps: list[float]
+    knot_stocks_weights: list[float]
+    # stocks weight of the step ending at every time step
+    stocks_weights: list[float]
+    timesteps: list[float]
+    objective: str
+    # final metrics of the plan on the best glide path, by OutcomeMetric
+    metrics: dict[str, float]
+    iterations: int
+    evaluations: int
+    simulation_time: float
+    paths_used: int
+    data_version: Optional[str] = None
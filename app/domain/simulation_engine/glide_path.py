@@ -0,0 +1,82 @@
+import itertools
+from typing import Callable
+import numpy as np
+
+
+class GlidePathOptimizer:
+    """
+    Searches piecewise-linear stocks weight schedules for the best score: a coarse grid over the stocks weights at
+    the knots, refined with a pattern (compass) search around the best grid point. Every grid block and every set of
+    pattern search neighbours is scored together, as one batch of plans on the same draws.
+    """
+
+    def __init__(
+        self,
+        score: Callable[[np.ndarray], np.ndarray],
+        knots: int,
+        grid_levels: int = 5,
+        min_step: float = 0.01,
+        max_iterations: int = 50,
+        batch_size: int = 256,
+    ):
+        """
+        Parameters
+        ----------
+        score : callable
+            score(candidates) -> score of every candidate, given as a P x knots matrix of stocks weights;
+            -inf for candidates that violate the constraints.
+        knots : int
+            Number of knots of the schedule.
+        grid_levels : int, optional
+            Number of stocks weights in [0, 1] tried at every knot by the coarse grid, by default 5.
+        min_step : float, optional
+            Pattern search step at which the search stops, by default 0.01.
+        max_iterations : int, optional
+            Maximum number of pattern search iterations, by default 50.
+        batch_size : int, optional
+            Maximum number of candidates scored at once, by default 256.
+        """
+        self.score = score
+        self.knots = knots
+        self.grid_levels = grid_levels
+        self.min_step = min_step
+        self.max_iterations = max_iterations
+        self.batch_size = batch_size
+        self.iterations = 0
+        self.evaluations = 0
+
+    def score_batch(self, candidates: np.ndarray) -> np.ndarray:
+        """
+        Score the candidates in batches of at most `batch_size`.
+        """
+        self.evaluations += len(candidates)
+        return np.concatenate(
+            [self.score(candidates[start : start + self.batch_size]) for start in range(0, len(candidates), self.batch_size)]
+        )
+
+    def solve(self) -> tuple[np.ndarray, float]:
+        """
+        Returns the best stocks weights at the knots and their score.
+        Raises ValueError if no schedule of the coarse grid meets the constraints.
+        """
+        levels = np.linspace(0, 1, self.grid_levels)
+        grid = np.array(list(itertools.product(levels, repeat=self.knots)))
+        scores = self.score_batch(grid)
+        if not np.isfinite(scores).any():
+            raise ValueError("No glide path of the search grid meets the constraints.")
+        best = int(np.argmax(scores))
+        current, current_score = grid[best], scores[best]
+
+        step = 1 / (self.grid_levels - 1) / 2
+        while step >= self.min_step and self.iterations < self.max_iterations:
+            self.iterations += 1
+            moves = np.concatenate([np.eye(self.knots), -np.eye(self.knots)]) * step
+            neighbours = np.unique(np.clip(current + moves, 0, 1), axis=0)
+            neighbours = neighbours[np.any(neighbours != current, axis=1)]
+            scores = self.score_batch(neighbours)
+            best = int(np.argmax(scores))
+            if scores[best] > current_score:
+                current, current_score = neighbours[best], scores[best]
+            else:
+                step /= 2
+        return current, float(current_score)
@@ -0,0 +1,138 @@
+from typing import Callable, Optional
+import numpy as np
+from .common.enums import SweepParameter
+
+# parameters the success probability is monotone in: True if it increases with the parameter
+MONOTONE_PARAMETERS = {
+    SweepParameter.INITIAL_WEALTH: True,
+    SweepParameter.SAVINGS_LEVEL: True,
+    SweepParameter.SAVINGS_SCALE: True,
+    SweepParameter.RETIREMENT_STEP: True,
+    SweepParameter.SPENDING_LEVEL: False,
+    SweepParameter.SPENDING_SCALE: False,
+}
+# rounds of doubling the search range before a target is declared out of reach
+MAX_BRACKET_ROUNDS = 4
+
+
+class GoalSeeker:
+    """
+    Solves for the parameter value at which a monotone metric reaches a target, by multisection: every round
+    evaluates several points of the current bracket at once (one batch of plans on the same draws) and keeps the
+    interval where the metric crosses the target.
+
+    With fixed draws the success probability of every path is monotone in the parameter, so the search is exact
+    on those draws. The solution returned is the end of the final bracket that meets the target: the smallest
+    value for an increasing metric (e.g. the least savings), the largest for a decreasing one (the most spending).
+    """
+
+    def __init__(
+        self,
+        evaluate: Callable[[np.ndarray], np.ndarray],
+        target: float,
+        increasing: bool,
+        integer: bool = False,
+        candidates: int = 8,
+        tolerance: float = 1e-3,
+        max_iterations: int = 50,
+    ):
+        """
+        Parameters
+        ----------
+        evaluate : callable
+            evaluate(values) -> metric of every parameter value, evaluated together.
+        target : float
+            Value the metric must reach.
+        increasing : bool
+            Whether the metric increases with the parameter.
+        integer : bool, optional
+            Only search integer values, by default False.
+        candidates : int, optional
+            Number of points evaluated per round, by default 8.
+        tolerance : float, optional
+            Relative width of the bracket at which the search stops, by default 1e-3.
+        max_iterations : int, optional
+            Maximum number of rounds, by default 50.
+        """
+        self.evaluate = evaluate
+        self.target = target
+        self.increasing = increasing
+        self.integer = integer
+        self.candidates = candidates
+        self.tolerance = tolerance
+        self.max_iterations = max_iterations
+        self.iterations = 0
+        self.evaluations = 0
+
+    def feasible(self, values: np.ndarray) -> np.ndarray:
+        """
+        Evaluate the values together and return which of them meet the target.
+        """
+        self.iterations += 1
+        self.evaluations += len(values)
+        return self.evaluate(values) >= self.target
+
+    def solve(self, lower: float, upper: Optional[float], start: float = 1.0) -> float:
+        """
+        Returns the parameter value in [lower, upper] at which the metric reaches the target.
+        If `upper` is None, the range is doubled from max(start, lower) until it brackets the target
+        (a decreasing metric that still meets the target at the last doubling returns that value).
+        Raises ValueError if the target cannot be reached in the range.
+        """
+        infeasible_end, feasible_end = self.bracket(lower, upper, start)
+        while not self.converged(infeasible_end, feasible_end) and self.iterations < self.max_iterations:
+            points = np.linspace(infeasible_end, feasible_end, self.candidates + 2)[1:-1]
+            if self.integer:
+                points = np.unique(np.round(points))
+                points = points[(points != infeasible_end) & (points != feasible_end)]
+                points = points if self.increasing else points[::-1]
+            feasible = self.feasible(points)
+            # along the bracket from its infeasible end, monotonicity makes the feasible points a suffix
+            first = int(np.argmax(feasible)) if feasible.any() else len(points)
+            if first > 0:
+                infeasible_end = points[first - 1]
+            if first < len(points):
+                feasible_end = points[first]
+        return float(feasible_end)
+
+    def bracket(self, lower: float, upper: Optional[float], start: float) -> tuple[float, float]:
+        """
+        Returns (infeasible_end, feasible_end), the ends of a range the target is crossed in.
+        If the end of the range with the worse metric already meets the target, both ends are that value.
+        """
+        if upper is not None:
+            values = np.array([lower, upper], dtype=np.float64)
+            feasible = self.feasible(values)
+        else:
+            # double the range from the start value until the metric crosses the target
+            base = np.ceil(max(start, lower, 1.0)) if self.integer else max(start, lower, 1.0)
+            values, feasible = np.array([lower], dtype=np.float64), np.zeros(0, dtype=bool)
+            for round_ in range(MAX_BRACKET_ROUNDS):
+                new_values = base * 2.0 ** np.arange(round_ * self.candidates, (round_ + 1) * self.candidates)
+                if round_ == 0:
+                    new_values = np.concatenate([values, new_values])
+                feasible = np.concatenate([feasible, self.feasible(new_values)])
+                values = new_values if round_ == 0 else np.concatenate([values, new_values])
+                if feasible.any() if self.increasing else not feasible.all():
+                    break
+
+        # the metric is monotone along `values`, which increase, so `feasible` changes at most once
+        if self.increasing:
+            if feasible[0]:
+                return lower, lower
+            if not feasible.any():
+                raise ValueError(f"The target cannot be reached with values up to {values[-1]}.")
+            first = int(np.argmax(feasible))
+            return values[first - 1], values[first]
+        if not feasible[0]:
+            raise ValueError(f"The target cannot be reached with values down to {lower}.")
+        if feasible.all():
+            return values[-1], values[-1]
+        first = int(np.argmin(feasible))
+        return values[first], values[first - 1]
+
+    def converged(self, infeasible_end: float, feasible_end: float) -> bool:
+        gap = abs(feasible_end - infeasible_end)
+        if self.integer:
+            return gap <= 1
+        return gap <= self.tolerance * max(abs(feasible_end), abs(infeasible_end)) or gap == 0
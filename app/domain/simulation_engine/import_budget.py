@@ -0,0 +1,97 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import Optional
+
+# module -> (budget of its cumulative import time in milliseconds, top-level packages it must not import).
+# A NumPy-only run needs neither pandas nor Flask; scipy and numba are optional and only imported on first use.
+IMPORT_BUDGETS = {
+    "app.domain.simulation_engine.simulation_strategies": (300, ("pandas", "pydantic", "flask", "scipy", "numba")),
+    "app.domain.simulation_engine.commands": (600, ("pandas", "flask", "scipy", "numba")),
+}
+IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+# repository root, from which the `app` package is importable
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+
+
+def measure_import(module: str) -> tuple[float, set[str]]:
+    """
+    Import `module` in a fresh interpreter with `-X importtime`.
+    Returns
+    -------
+    tuple[float, set[str]]
+        The cumulative import time of the module in milliseconds and the names of all modules it imported.
+    """
+    environment = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [ROOT_DIR, os.environ.get("PYTHONPATH")]))}
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-W", "ignore", "-c", f"import {module}"],
+        cwd=ROOT_DIR,
+        env=environment,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative, imported = None, set()
+    for match in map(IMPORT_TIME_LINE.match, completed.stderr.splitlines()):
+        if match is None:
+            continue
+        imported.add(match.group(4))
+        if match.group(4) == module:
+            cumulative = int(match.group(2)) / 1000
+    if cumulative is None:
+        raise RuntimeError(f"No import time was reported for {module}.")
+    return cumulative, imported
+
+
+def check_import_budgets(repeats: int = 5, scale: float = 1.0, verbose: bool = False) -> list[str]:
+    """
+    Measure every module of IMPORT_BUDGETS, keeping the fastest of `repeats` imports to filter out noise.
+    Parameters
+    ----------
+    repeats : int, optional
+        Number of imports per module, by default 5.
+    scale : float, optional
+        Factor applied to every budget, e.g. for slower machines, by default 1.0.
+    verbose : bool, optional
+        Print the measurement of every module, by default False.
+    Returns
+    -------
+    list[str]
+        Description of every violated budget, empty if all budgets are met.
+    """
+    violations = []
+    for module, (budget, forbidden) in IMPORT_BUDGETS.items():
+        measurements = [measure_import(module) for _ in range(repeats)]
+        milliseconds = min(cumulative for cumulative, _ in measurements)
+        imported = set.union(*(modules for _, modules in measurements))
+        loaded = sorted(package for package in forbidden if any(name.split(".")[0] == package for name in imported))
+        if verbose:
+            print(f"{module}: {milliseconds:.1f} ms (budget {budget * scale:.0f} ms)")
+        if milliseconds > budget * scale:
+            violations.append(f"{module} takes {milliseconds:.1f} ms to import, over its budget of {budget * scale:.0f} ms")
+        if loaded:
+            violations.append(f"{module} imports {', '.join(loaded)}")
+    return violations
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Check the import-time budget of the simulation engine.")
+    parser.add_argument("--repeats", type=int, default=5, help="imports per module, the fastest is kept")
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=float(os.environ.get("SIMULATION_IMPORT_BUDGET_SCALE", 1.0)),
+        help="factor applied to every budget",
+    )
+    parser.add_argument("--verbose", action="store_true", help="print the measurement of every module")
+    args = parser.parse_args(argv)
+    violations = check_import_budgets(args.repeats, args.scale, args.verbose)
+    for violation in violations:
+        print(violation, file=sys.stderr)
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == "__main__":
+    main()
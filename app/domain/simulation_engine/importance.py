@@ -0,0 +1,122 @@
+from typing import Optional
+import numpy as np
+from .calcs import ReturnsFunction
+
+
+class TiltedReturns:
+    """
+    Returns function for importance sampling: wraps a Gaussian returns function, shifts its expected returns
+    toward bad outcomes and records the log likelihood ratio of every path it generates.
+
+    Shifting the standard normals of step t by -c_t along the direction that lowers the portfolio return most
+    moves the asset returns by -c_t * Sigma w_t / sigma_t. The likelihood ratio of the original to the shifted
+    distribution then only depends on the standardized portfolio returns u_t = (w_t . r_t - m_t) / sigma_t:
+    log L = sum_t c_t * u_t + c_t ** 2 / 2.
+    """
+
+    def __init__(
+        self,
+        returns_fn: ReturnsFunction,
+        weights: np.ndarray,
+        shift: np.ndarray,
+        portfolio_means: np.ndarray,
+        portfolio_stds: np.ndarray,
+        tilt: np.ndarray,
+        log_weights: np.ndarray,
+        standardized_out: Optional[np.ndarray] = None,
+    ):
+        """
+        Parameters
+        ----------
+        returns_fn : callable
+            returns_fn(n, start, stop, out) of the original (untilted) distribution.
+        weights : np.ndarray
+            s x num_assets weights the kernel applies to the returns.
+        shift : np.ndarray
+            s x num_assets shift added to the generated returns.
+        portfolio_means, portfolio_stds : np.ndarray
+            s x 1 vectors of the untilted portfolio return moments.
+        tilt : np.ndarray
+            s x 1 vector of the normal shifts c_t, 0 where the portfolio has no volatility.
+        log_weights : np.ndarray
+            Output vector receiving the log likelihood ratio of every path, chunk after chunk.
+        standardized_out : np.ndarray, optional
+            n x s output matrix receiving the standardized portfolio returns u_t of every path.
+        """
+        self.returns_fn = returns_fn
+        self.weights = weights
+        self.shift = shift
+        self.portfolio_means = portfolio_means
+        self.inverse_stds = np.divide(1.0, portfolio_stds, out=np.zeros(len(portfolio_stds)), where=portfolio_stds > 0)
+        self.tilt = tilt
+        self.log_weights = log_weights
+        self.standardized_out = standardized_out
+        self._offset = 0
+        self._next_offset = 0
+
+    def __call__(self, n: int, start: int, stop: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+        if start == 0:  # a new chunk of paths starts
+            self._offset, self._next_offset = self._next_offset, self._next_offset + n
+            self.log_weights[self._offset : self._next_offset] = 0
+        returns = self.returns_fn(n, start, stop, out=out)
+        returns += self.shift[start:stop].astype(returns.dtype)
+
+        portfolio_returns = np.einsum("nlk,lk->nl", returns, self.weights[start:stop], dtype=np.float64)
+        standardized = (portfolio_returns - self.portfolio_means[start:stop]) * self.inverse_stds[start:stop]
+        if self.standardized_out is not None:
+            self.standardized_out[self._offset : self._next_offset, start:stop] = standardized
+        tilt = self.tilt[start:stop]
+        self.log_weights[self._offset : self._next_offset] += standardized @ tilt + 0.5 * np.sum(tilt**2)
+        return returns
+
+
+def importance_weights(log_weights: np.ndarray) -> np.ndarray:
+    """
+    Importance weights of n paths from their log likelihood ratios: L_i / n, so that weighted sums are unbiased
+    estimates of expectations under the original distribution. They sum to 1 only on average; the weights are not
+    self-normalized, because the few huge likelihood ratios of paths far from the tail make the sum very noisy.
+    """
+    return np.exp(log_weights) / len(log_weights)
+
+
+def effective_sample_size(weights: np.ndarray) -> float:
+    """
+    Kish effective sample size of a set of importance weights.
+    """
+    return float(weights.sum() ** 2 / np.sum(weights**2))
+
+
+def weighted_percentiles(values: np.ndarray, weights: np.ndarray, percentiles: list[float]) -> np.ndarray:
+    """
+    Percentiles of every column of `values` under the weighted empirical distribution of its rows.
+    Each percentile is read from the tail it belongs to: percentiles up to the median invert the weighted CDF
+    from below, higher ones invert the weighted survival function from above, so that every tail estimate only
+    depends on the paths in that tail.
+    Parameters
+    ----------
+    values : np.array
+        n x num_columns matrix.
+    weights : np.array
+        n x 1 vector of non-negative weights, summing to about 1 (see `importance_weights`).
+    percentiles : list[float]
+        Percentiles to compute, in [0, 100].
+    Returns
+    -------
+    np.array
+        len(percentiles) x num_columns matrix of percentiles.
+    """
+    order = np.argsort(values, axis=0)
+    sorted_values = np.take_along_axis(values, order, axis=0)
+    sorted_weights = weights[order]
+    lower_mass = np.cumsum(sorted_weights, axis=0)
+    upper_mass = np.cumsum(sorted_weights[::-1], axis=0)[::-1]
+    result = np.empty((len(percentiles), values.shape[1]), dtype=values.dtype)
+    for i, percentile in enumerate(percentiles):
+        q = percentile / 100
+        if q <= 0.5:
+            positions = (lower_mass < q).sum(axis=0)
+        else:
+            positions = (upper_mass >= 1 - q).sum(axis=0) - 1
+        positions = np.clip(positions, 0, len(values) - 1)
+        result[i] = np.take_along_axis(sorted_values, positions[None, :], axis=0)[0]
+    return result
@@ -0,0 +1,181 @@
+import importlib.util
+import os
+import time
+from abc import ABC, abstractmethod
+from functools import cache
+from typing import Optional
+import numpy as np
+from .calcs import advance_wealth
+from .common.enums import KernelBackendType
+
+PROBE_STEPS = 16
+PROBE_MAX_SIZE_CLASS = 14
+PROBE_REPEATS = 3
+
+
+class AbstractKernelBackend(ABC):
+    """
+    Abstract base class for the time-step kernels that roll wealth forward over a block of returns.
+    """
+
+    name: KernelBackendType
+
+    @abstractmethod
+    def advance_wealth(
+        self,
+        wealth: np.ndarray,
+        simulated_returns: np.ndarray,
+        weights: np.ndarray,
+        flows: np.ndarray,
+        time_delta: np.ndarray,
+        scratch: Optional[tuple[np.ndarray, ...]] = None,
+        floor: bool = True,
+    ) -> np.ndarray:
+        """
+        Roll wealth forward over a block of time steps, in place. See `calcs.advance_wealth`.
+        """
+        raise NotImplementedError("Subclasses must implement this method.")
+
+
+class NumpyKernelBackend(AbstractKernelBackend):
+    """
+    Reference backend: vectorized over paths, one pass over memory per operation and step.
+    """
+
+    name = KernelBackendType.NUMPY
+
+    def advance_wealth(self, wealth, simulated_returns, weights, flows, time_delta, scratch=None, floor=True):
+        return advance_wealth(wealth, simulated_returns, weights, flows, time_delta, scratch, floor)
+
+
+class NumbaKernelBackend(AbstractKernelBackend):
+    """
+    Compiled backend: one fused pass per path that weights the returns, adds the cash flow and applies
+    the zero floor while the path's returns are in cache. Requires numba.
+    """
+
+    name = KernelBackendType.NUMBA
+
+    def __init__(self):
+        if not numba_available():
+            raise ImportError("The numba kernel backend requires numba to be installed.")
+
+    def advance_wealth(self, wealth, simulated_returns, weights, flows, time_delta, scratch=None, floor=True):
+        _numba_advance_wealth()(wealth, simulated_returns, weights, flows, time_delta, floor)
+        return wealth
+
+
+@cache
+def _numba_advance_wealth():
+    """
+    Compile the fused per-path kernel on first use.
+    """
+    import numba
+
+    @numba.njit(cache=True, nogil=True)
+    def kernel(wealth, simulated_returns, weights, flows, time_delta, floor):
+        n, steps, k = simulated_returns.shape
+        for p in range(n):
+            current = wealth[p, 0]
+            for i in range(steps):
+                growth = 0.0
+                for j in range(k):
+                    gross_return = 1.0 + simulated_returns[p, i, j]
+                    if time_delta[i] != 1:
+                        gross_return = gross_return ** time_delta[i]
+                    growth += weights[i, j] * gross_return
+                current = current * growth + flows[i]
+                if floor and current < 0:
+                    current = 0.0  # set negative wealth to 0
+                wealth[p, i + 1] = current
+
+    return kernel
+
+
+@cache
+def numba_available() -> bool:
+    """
+    Whether numba (an optional dependency) is installed, without importing it: it is only imported
+    when the numba kernel is first compiled.
+    """
+    return importlib.util.find_spec("numba") is not None
+
+
+def available_backends() -> list[KernelBackendType]:
+    """
+    Returns the kernel backends that can run in this environment.
+    """
+    if not numba_available():
+        return [KernelBackendType.NUMPY]
+    return [KernelBackendType.NUMPY, KernelBackendType.NUMBA]
+
+
+def build_backend(backend_type: KernelBackendType) -> AbstractKernelBackend:
+    match backend_type:
+        case KernelBackendType.NUMPY:
+            return NumpyKernelBackend()
+        case KernelBackendType.NUMBA:
+            return NumbaKernelBackend()
+    raise ValueError(f"Unsupported kernel backend: {backend_type}")
+
+
+@cache
+def probe_backend(size_class: int, dtype: str = "float64") -> KernelBackendType:
+    """
+    Time every available backend on a small problem of 2 ** size_class paths and return the fastest.
+    The result is cached for the lifetime of the process.
+    """
+    backends = available_backends()
+    if len(backends) == 1:
+        return backends[0]
+
+    n = 2 ** min(size_class, PROBE_MAX_SIZE_CLASS)
+    rng = np.random.default_rng(0)
+    returns = rng.normal(0.005, 0.04, (n, PROBE_STEPS, 3)).astype(dtype)
+    weights = np.full((PROBE_STEPS, 3), 1 / 3, dtype=dtype)
+    flows = np.zeros(PROBE_STEPS, dtype=dtype)
+    time_delta = np.ones(PROBE_STEPS, dtype=dtype)
+    wealth = np.ones((n, PROBE_STEPS + 1), dtype=dtype)
+
+    timings = {}
+    for backend_type in backends:
+        backend = build_backend(backend_type)
+        backend.advance_wealth(wealth, returns, weights, flows, time_delta)  # warm up / compile
+        best = np.inf
+        for _ in range(PROBE_REPEATS):
+            start = time.perf_counter()
+            backend.advance_wealth(wealth, returns, weights, flows, time_delta)
+            best = min(best, time.perf_counter() - start)
+        timings[backend_type] = best
+    return min(timings, key=timings.get)
+
+
+def select_backend(
+    number_of_paths: int,
+    dtype: np.dtype = np.float64,
+    backend_type: Optional[KernelBackendType] = None,
+) -> AbstractKernelBackend:
+    """
+    Pick the kernel backend for chunks of `number_of_paths` paths.
+
+    Parameters
+    ----------
+    number_of_paths : int
+        Number of paths the kernel is called with at once.
+    dtype : np.dtype, optional
+        Floating point type of the simulation, by default float64.
+    backend_type : KernelBackendType, optional
+        Requested backend. If None, the SIMULATION_KERNEL_BACKEND environment variable is used,
+        and AUTO picks the fastest available backend for the problem size with a cached timing probe.
+
+    Returns
+    -------
+    AbstractKernelBackend
+        The kernel backend.
+    """
+    if backend_type is None:
+        backend_type = KernelBackendType(os.environ.get("SIMULATION_KERNEL_BACKEND", KernelBackendType.AUTO))
+    if backend_type == KernelBackendType.AUTO:
+        size_class = min(int(np.log2(max(number_of_paths, 1))), PROBE_MAX_SIZE_CLASS)
+        backend_type = probe_backend(size_class, np.dtype(dtype).name)
+    return build_backend(backend_type)
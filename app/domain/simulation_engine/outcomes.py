@@ -0,0 +1,62 @@
+import numpy as np
+from .common.enums import OutcomeMetric
+
+
+class PlanOutcomes:
+    """
+    Reduced outcomes of several plans evaluated on the same paths: the final wealth of every path and the
+    fraction of destitute paths at every step, which is all that sweeps and solvers need to score a plan.
+    """
+
+    def __init__(
+        self, final_wealth: np.ndarray, destitution_risk: np.ndarray, time_steps: np.ndarray, inflation: float
+    ):
+        """
+        Parameters
+        ----------
+        final_wealth : np.ndarray
+            P x n matrix of the final wealth of every plan and path.
+        destitution_risk : np.ndarray
+            P x s matrix of the fraction of paths with zero wealth after every step.
+        time_steps : np.ndarray
+            s+1 x 1 vector of time steps.
+        inflation : float
+            Inflation rate used to express final wealth in real terms.
+        """
+        self.final_wealth = final_wealth
+        self.destitution_risk = destitution_risk
+        self.time_steps = time_steps
+        self.inflation = inflation
+
+    @property
+    def number_of_plans(self) -> int:
+        return self.final_wealth.shape[0]
+
+    def metric(self, metric: OutcomeMetric) -> np.ndarray:
+        """
+        Returns the P x 1 vector of a metric of every plan.
+        The destitution area is the time-weighted mean destitution risk over the horizon, as in the simulation
+        results; real metrics deflate the final wealth to the start of the horizon.
+        """
+        match metric:
+            case OutcomeMetric.SUCCESS_PROBABILITY:
+                return np.mean(self.final_wealth > 0, axis=1)
+            case OutcomeMetric.DESTITUTION_AREA:
+                time_delta = np.diff(self.time_steps)
+                return self.destitution_risk @ time_delta / np.sum(time_delta)
+            case OutcomeMetric.FINAL_MEAN:
+                return np.mean(self.final_wealth, axis=1, dtype=np.float64)
+            case OutcomeMetric.FINAL_MEDIAN:
+                return np.median(self.final_wealth, axis=1)
+            case OutcomeMetric.FINAL_MEAN_REAL:
+                return self.metric(OutcomeMetric.FINAL_MEAN) / self.deflator
+            case OutcomeMetric.FINAL_MEDIAN_REAL:
+                return self.metric(OutcomeMetric.FINAL_MEDIAN) / self.deflator
+        raise ValueError(f"Unsupported outcome metric: {metric}")
+
+    @property
+    def deflator(self) -> float:
+        """
+        Price level at the end of the horizon relative to its start.
+        """
+        return float((1 + self.inflation) ** self.time_steps[-1])
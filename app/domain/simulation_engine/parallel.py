@@ -0,0 +1,95 @@
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+from typing import Callable, Optional
+import numpy as np
+from .common.enums import ExecutorType
+
+DEFAULT_SHARD_SIZE = 100000
+
+
+def split_shards(number_of_simulations: int, shard_size: int = DEFAULT_SHARD_SIZE) -> list[tuple[int, int]]:
+    """
+    Split the simulated paths into contiguous shards.
+    The split only depends on the number of simulations and the shard size, never on the number of workers.
+
+    Returns
+    -------
+    list[tuple[int, int]]
+        [start, stop) path ranges of the shards.
+    """
+    assert shard_size > 0, "Shard size must be positive"
+    return [
+        (start, min(number_of_simulations, start + shard_size))
+        for start in range(0, number_of_simulations, shard_size)
+    ]
+
+
+def spawn_seeds(root: np.random.SeedSequence, count: int) -> list[np.random.SeedSequence]:
+    """
+    Spawn `count` independent child seeds from the root seed.
+    A fresh copy of the root is used, so repeated calls return the same children.
+    """
+    return np.random.SeedSequence(root.entropy, spawn_key=root.spawn_key).spawn(count)
+
+
+def make_executor(executor_type: ExecutorType, workers: int) -> Executor:
+    """
+    Build the pool that runs the shards.
+    """
+    match executor_type:
+        case ExecutorType.THREAD:
+            return ThreadPoolExecutor(max_workers=workers)
+        case ExecutorType.PROCESS:
+            return ProcessPoolExecutor(max_workers=workers)
+    raise ValueError(f"Unsupported executor type: {executor_type}")
+
+
+def map_shards(
+    fn: Callable,
+    tasks: list[tuple],
+    workers: int = 1,
+    executor_type: ExecutorType = ExecutorType.THREAD,
+) -> list:
+    """
+    Run fn(*task) for every task, in a pool if more than one worker is requested.
+    Results are returned in task order, whatever order the shards finish in.
+    """
+    if workers <= 1 or len(tasks) <= 1:
+        return [fn(*task) for task in tasks]
+    with make_executor(executor_type, min(workers, len(tasks))) as executor:
+        futures = [executor.submit(fn, *task) for task in tasks]
+        return [future.result() for future in futures]
+
+
+class SharedWealthMatrix:
+    """
+    Wealth matrix backed by shared memory, so worker processes can write their shard's rows in place
+    instead of pickling them back to the parent.
+    """
+
+    def __init__(self, shape: tuple[int, ...], dtype: np.dtype = np.float64, name: Optional[str] = None):
+        self.shape = shape
+        self.dtype = np.dtype(dtype)
+        size = max(1, int(np.prod(shape)) * self.dtype.itemsize)
+        self._owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self._owner, size=size)
+        self.array = np.ndarray(shape, dtype=self.dtype, buffer=self.shm.buf)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def close(self) -> None:
+        """
+        Release this handle, and free the block if this handle created it.
+        """
+        del self.array
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+
+    def __enter__(self) -> "SharedWealthMatrix":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
@@ -0,0 +1,133 @@
+from functools import cache
+from typing import Optional
+import numpy as np
+
+# smallest and largest uniform mapped through the inverse normal CDF, so that no draw is infinite
+UNIFORM_CLIP = 1e-12
+
+
+@cache
+def scipy_qmc():
+    """
+    Import scipy's QMC module and inverse normal CDF on first use: scipy is an optional dependency
+    and takes longer to import than the rest of the engine.
+    """
+    try:
+        from scipy.special import ndtri
+        from scipy.stats import qmc
+    except ImportError:
+        raise ImportError("Quasi-Monte Carlo simulation requires scipy to be installed.") from None
+    return qmc, ndtri
+
+
+def sobol_engine(dimension: int, rng: np.random.Generator) -> "qmc.Sobol":
+    """
+    Build a scrambled Sobol sequence of the given dimension, scrambled from `rng`.
+    Every engine built from an independent generator is an independent randomized QMC replicate.
+    """
+    qmc, _ = scipy_qmc()
+    if dimension > qmc.Sobol.MAXDIM:
+        raise ValueError(f"Quasi-Monte Carlo supports at most {qmc.Sobol.MAXDIM} time steps x assets, got {dimension}.")
+    return qmc.Sobol(dimension, scramble=True, seed=rng)
+
+
+@cache
+def brownian_bridge_plan(steps: int) -> tuple[np.ndarray, ...]:
+    """
+    Construction order of a Brownian bridge over `steps` unit time steps.
+    The end point is built first, then the midpoints of the known intervals, breadth first, so that the first
+    (best distributed) coordinates decide the large-scale shape of the path.
+
+    Returns
+    -------
+    tuple of np.ndarray
+        (points, left, right, left_weight, right_weight, std): the i-th normal builds the value at `points[i]`
+        as left_weight * B[left] + right_weight * B[right] + std * z, with B[0] = 0.
+    """
+    plan = [(steps, 0, 0, 0.0, 0.0, np.sqrt(steps))]
+    intervals = [(0, steps)]
+    for left, right in intervals:
+        if right - left < 2:
+            continue
+        middle = (left + right) // 2
+        length = right - left
+        plan.append(
+            (
+                middle,
+                left,
+                right,
+                (right - middle) / length,
+                (middle - left) / length,
+                np.sqrt((middle - left) * (right - middle) / length),
+            )
+        )
+        intervals.extend([(left, middle), (middle, right)])
+    points, left, right, left_weight, right_weight, std = zip(*plan)
+    return (
+        np.array(points),
+        np.array(left),
+        np.array(right),
+        np.array(left_weight),
+        np.array(right_weight),
+        np.array(std),
+    )
+
+
+def apply_brownian_bridge(normals: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Turn normals in bridge construction order into the independent per-step increments of the bridged path.
+    Parameters
+    ----------
+    normals : np.array
+        n x steps x k tensor of independent standard normals, the step axis in bridge construction order.
+    out : np.array, optional
+        n x steps x k buffer for the increments, which may be `normals` itself. If None, one is allocated.
+    Returns
+    -------
+    np.array
+        n x steps x k tensor of independent standard normal increments, the step axis in time order.
+    """
+    n, steps, k = normals.shape
+    points, left, right, left_weight, right_weight, std = brownian_bridge_plan(steps)
+    path = np.zeros((n, steps + 1, k))
+    for i in range(steps):
+        path[:, points[i]] = (
+            left_weight[i] * path[:, left[i]] + right_weight[i] * path[:, right[i]] + std[i] * normals[:, i]
+        )
+    if out is None:
+        out = np.empty_like(normals)
+    np.subtract(path[:, 1:], path[:, :-1], out=out, casting="same_kind")
+    return out
+
+
+def sobol_normals(engine: "qmc.Sobol", out: np.ndarray, brownian_bridge: bool = True) -> np.ndarray:
+    """
+    Fill `out` with the next out.shape[0] points of the Sobol sequence, mapped to standard normals.
+    Parameters
+    ----------
+    engine : scipy.stats.qmc.Sobol
+        Scrambled Sobol sequence of dimension steps x k.
+    out : np.array
+        n x steps x k buffer. Point coordinate level * k + j drives asset j at bridge level `level`.
+    brownian_bridge : bool, optional
+        Order the time steps with a Brownian bridge. If False, coordinates follow the time steps. Default is True.
+    Returns
+    -------
+    np.array
+        n x steps x k tensor of standard normals (path increments), quasi-random along the path axis.
+    """
+    _, ndtri = scipy_qmc()
+    n, steps, k = out.shape
+    if engine.num_generated == 0 and n & (n - 1):
+        # the engine warns about a first draw that is not a power of 2 in size, which chunks rarely are;
+        # drawing the largest power of 2 first yields the same points without the warning
+        head = 1 << (n.bit_length() - 1)
+        points = np.concatenate([engine.random(head), engine.random(n - head)])
+    else:
+        points = engine.random(n)
+    points = np.clip(points, UNIFORM_CLIP, 1 - UNIFORM_CLIP)
+    normals = ndtri(points, out=points).reshape(n, steps, k)
+    if brownian_bridge:
+        return apply_brownian_bridge(normals, out)
+    np.copyto(out, normals, casting="same_kind")
+    return out
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from functools import cache
+from typing import Optional
+from .dto import SimulationResultDTO
+
+
+def canonical_hash(payload: dict) -> str:
+    """
+    SHA-256 of the canonical JSON encoding of a payload (sorted keys, no whitespace).
+    """
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class SimulationResultCache:
+    """
+    Content-addressed LRU cache of simulation results, kept in memory with an optional
+    size-bounded on-disk tier shared by all workers pointing at the same directory.
+    """
+
+    def __init__(self, max_entries: int = 128, disk_dir: Optional[str] = None, max_disk_bytes: int = 256 * 2**20):
+        """
+        Parameters
+        ----------
+        max_entries : int, optional
+            Maximum number of results kept in memory, by default 128.
+        disk_dir : str, optional
+            Directory of the on-disk tier. If None, results are only cached in memory.
+        max_disk_bytes : int, optional
+            Maximum total size of the on-disk tier, by default 256 MiB.
+        """
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._entries: OrderedDict[str, SimulationResultDTO] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        if disk_dir is not None:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get(self, key: str) -> Optional[SimulationResultDTO]:
+        """
+        Returns the cached result for `key`, or None on a miss.
+        """
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+
+        result = self._read_from_disk(key)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store_in_memory(key, result)
+        return result
+
+    def put(self, key: str, result: SimulationResultDTO) -> None:
+        """
+        Store a result under `key` in memory and, if configured, on disk.
+        """
+        with self._lock:
+            self._store_in_memory(key, result)
+        self._write_to_disk(key, result)
+
+    def clear(self) -> None:
+        """
+        Drop every cached result from memory and disk. Counters are kept.
+        """
+        with self._lock:
+            self._entries.clear()
+        for path, _, _ in self._disk_files():
+            os.remove(path)
+
+    def stats(self) -> dict[str, int]:
+        """
+        Returns the cache counters.
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "disk_evictions": self.disk_evictions,
+            }
+
+    def _store_in_memory(self, key: str, result: SimulationResultDTO) -> None:
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _disk_files(self) -> list[tuple[str, int, float]]:
+        if self.disk_dir is None:
+            return []
+        files = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.is_file() and entry.name.endswith(".json"):
+                stat = entry.stat()
+                files.append((entry.path, stat.st_size, stat.st_mtime))
+        return files
+
+    def _read_from_disk(self, key: str) -> Optional[SimulationResultDTO]:
+        if self.disk_dir is None:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                result = SimulationResultDTO.model_validate_json(f.read())
+            os.utime(path)  # mark as recently used
+        except (FileNotFoundError, ValueError):
+            return None
+        return result
+
+    def _write_to_disk(self, key: str, result: SimulationResultDTO) -> None:
+        if self.disk_dir is None:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(result.model_dump_json())
+        os.replace(tmp_path, path)
+
+        files = sorted(self._disk_files(), key=lambda file: file[2])
+        total = sum(size for _, size, _ in files)
+        for file_path, size, _ in files:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                continue
+            total -= size
+            with self._lock:
+                self.disk_evictions += 1
+
+
+@cache
+def get_result_cache() -> SimulationResultCache:
+    """
+    Process-wide result cache, configured from the SIMULATION_CACHE_SIZE, SIMULATION_CACHE_DIR
+    and SIMULATION_CACHE_DISK_BYTES environment variables.
+    """
+    return SimulationResultCache(
+        max_entries=int(os.environ.get("SIMULATION_CACHE_SIZE", 128)),
+        disk_dir=os.environ.get("SIMULATION_CACHE_DIR"),
+        max_disk_bytes=int(os.environ.get("SIMULATION_CACHE_DISK_BYTES", 256 * 2**20)),
+    )
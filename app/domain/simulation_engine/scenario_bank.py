@@ -0,0 +1,227 @@
+import argparse
+import json
+import os
+import re
+import time
+from functools import cache
+from typing import Optional
+import numpy as np
+from .data_store import DATA_DIR, get_historical_data
+
+SCENARIO_BANK_PREFIX = "normals"
+# paths drawn and written at once by `write_scenario_bank`
+BANK_WRITE_CHUNK_PATHS = 10000
+
+
+def scenario_bank_dir() -> str:
+    """
+    Directory of the scenario banks, SIMULATION_SCENARIO_BANK_DIR or `scenarios` in the data directory.
+    """
+    return os.environ.get("SIMULATION_SCENARIO_BANK_DIR", os.path.join(DATA_DIR, "scenarios"))
+
+
+def scenario_bank_versions(directory: str) -> list[int]:
+    """
+    Returns the sorted versions of the complete banks (array and metadata) in `directory`.
+    """
+    if not os.path.isdir(directory):
+        return []
+    pattern = re.compile(rf"{SCENARIO_BANK_PREFIX}_v(\d+)\.json")
+    versions = [int(match.group(1)) for match in map(pattern.fullmatch, os.listdir(directory)) if match]
+    return sorted(version for version in versions if os.path.exists(scenario_bank_path(directory, version)))
+
+
+def scenario_bank_path(directory: str, version: int) -> str:
+    return os.path.join(directory, f"{SCENARIO_BANK_PREFIX}_v{version}.npy")
+
+
+class ScenarioBank:
+    """
+    Pre-generated standard normals of many paths, memory-mapped read-only from a versioned `.npy` file.
+    Every thread and every forked worker maps the same file, so the operating system keeps a single copy
+    of the bank in its page cache however many simulations read from it.
+
+    The bank holds standard normals rather than returns, so that one bank serves every step type, expected
+    return override and portfolio: the strategies still apply their own Cholesky factor (or portfolio moments).
+    """
+
+    def __init__(self, path: str):
+        """
+        Parameters
+        ----------
+        path : str
+            Path of the `.npy` file; its metadata is read from the `.json` file next to it.
+        """
+        self.path = path
+        with open(os.path.splitext(path)[0] + ".json", "r", encoding="utf-8") as handle:
+            self.metadata = json.load(handle)
+        self.normals = np.load(path, mmap_mode="r")
+        if self.normals.ndim != 3:
+            raise ValueError(f"The scenario bank {path} must be a paths x steps x assets array.")
+
+    def __reduce__(self):
+        # process workers reopen the mapping instead of receiving a pickled copy of the bank
+        return load_scenario_bank, (self.path,)
+
+    @property
+    def version(self) -> int:
+        return int(self.metadata["version"])
+
+    @property
+    def paths(self) -> int:
+        return self.normals.shape[0]
+
+    @property
+    def steps(self) -> int:
+        return self.normals.shape[1]
+
+    @property
+    def assets(self) -> int:
+        return self.normals.shape[2]
+
+    def sampler(self, first_row: int, antithetic: bool = False) -> "BankSampler":
+        return BankSampler(self.normals, first_row, antithetic)
+
+
+class BankSampler:
+    """
+    Fills normals buffers from windows of consecutive bank paths. Path i of a simulation reads bank path
+    `first_row + i` of the sampler of its shard, wrapping around the end of the bank, so the chunks of a shard
+    (and the shards of a simulation, see `CholeskySimulationStrategy.bank_offset`) read disjoint windows
+    whatever their sizes. A chunk keeps its window for all of its step blocks. The windows are zero-copy views
+    of the mapping; the only copy is into the buffer the returns are computed in.
+    """
+
+    def __init__(self, normals: np.ndarray, first_row: int, antithetic: bool = False):
+        self.normals = normals
+        self.antithetic = antithetic
+        self._next_row = first_row
+        self._row = None
+        self._stop = None
+
+    def __call__(self, out: np.ndarray, start: int, stop: int) -> np.ndarray:
+        """
+        Fill the n x (stop - start) x k buffer `out` with the bank normals of steps [start, stop).
+        With `antithetic`, only ceil(n / 2) bank paths are read and the rest of `out` is their negation,
+        as `draw_standard_normals` does.
+        """
+        n = out.shape[0]
+        m = -(-n // 2) if self.antithetic else n
+        paths = self.normals.shape[0]
+        if m > paths:
+            raise ValueError(f"The scenario bank has {paths} paths, {m} are needed at once.")
+        if start != self._stop:  # a new chunk of paths starts, after the previous one
+            self._row, self._next_row = self._next_row % paths, self._next_row + n
+        self._stop = stop
+        head = min(m, paths - self._row)
+        out[:head] = self.normals[self._row : self._row + head, start:stop, : out.shape[2]]
+        out[head:m] = self.normals[: m - head, start:stop, : out.shape[2]]
+        if self.antithetic:
+            np.negative(out[: n - m], out=out[m:])
+        return out
+
+
+@cache
+def load_scenario_bank(path: str) -> ScenarioBank:
+    """
+    Map a scenario bank, once per process.
+    """
+    return ScenarioBank(path)
+
+
+def get_scenario_bank(version: Optional[int] = None, directory: Optional[str] = None) -> ScenarioBank:
+    """
+    Returns the scenario bank of the given version, by default the latest one.
+    Raises FileNotFoundError if there is no such bank.
+    """
+    directory = directory or scenario_bank_dir()
+    if version is None:
+        versions = scenario_bank_versions(directory)
+        if not versions:
+            raise FileNotFoundError(f"No scenario bank found in {directory}.")
+        version = versions[-1]
+    path = scenario_bank_path(directory, version)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Scenario bank version {version} not found in {directory}.")
+    return load_scenario_bank(path)
+
+
+def write_scenario_bank(
+    paths: int,
+    steps: int,
+    assets: int,
+    seed: Optional[int] = None,
+    dtype: np.dtype = np.float32,
+    directory: Optional[str] = None,
+) -> str:
+    """
+    Write a new version of the scenario bank: a paths x steps x assets array of standard normals.
+    The array is drawn and written chunk by chunk through a memory map, so the bank can be larger than memory,
+    and it only appears under its final name once complete, with its metadata written last.
+    Parameters
+    ----------
+    paths : int
+        Number of paths.
+    steps : int
+        Number of time steps, at least the longest horizon the bank is used for.
+    assets : int
+        Number of assets.
+    seed : int, optional
+        Seed of the draws. If None, fresh entropy is used and recorded in the metadata.
+    dtype : np.dtype, optional
+        Floating point type of the bank, by default float32 (half the page cache of float64).
+    directory : str, optional
+        Directory of the banks. If None, `scenario_bank_dir()` is used.
+    Returns
+    -------
+    str
+        Path of the new bank.
+    """
+    directory = directory or scenario_bank_dir()
+    os.makedirs(directory, exist_ok=True)
+    versions = scenario_bank_versions(directory)
+    version = versions[-1] + 1 if versions else 1
+    path = scenario_bank_path(directory, version)
+    seed_sequence = np.random.SeedSequence(seed)
+    rng = np.random.default_rng(seed_sequence)
+    dtype = np.dtype(dtype)
+
+    partial_path = path + ".partial"
+    bank = np.lib.format.open_memmap(partial_path, mode="w+", dtype=dtype, shape=(paths, steps, assets))
+    for start in range(0, paths, BANK_WRITE_CHUNK_PATHS):
+        stop = min(paths, start + BANK_WRITE_CHUNK_PATHS)
+        rng.standard_normal(out=bank[start:stop], dtype=dtype)
+    bank.flush()
+    del bank
+    os.replace(partial_path, path)
+
+    metadata = {
+        "version": version,
+        "paths": paths,
+        "steps": steps,
+        "assets": assets,
+        "dtype": dtype.name,
+        "seed": seed_sequence.entropy,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    with open(os.path.splitext(path)[0] + ".json", "w", encoding="utf-8") as handle:
+        json.dump(metadata, handle, indent=2, default=str)
+    return path
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Write a new version of the scenario bank of standard normals.")
+    parser.add_argument("--paths", type=int, default=100000, help="number of paths")
+    parser.add_argument("--steps", type=int, default=600, help="number of time steps")
+    parser.add_argument("--assets", type=int, default=None, help="number of assets, by default those of returns.csv")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the draws")
+    parser.add_argument("--dtype", choices=["float32", "float64"], default="float32", help="floating point type")
+    parser.add_argument("--directory", default=None, help="directory of the banks")
+    args = parser.parse_args(argv)
+    assets = args.assets if args.assets is not None else len(get_historical_data().assets)
+    path = write_scenario_bank(args.paths, args.steps, assets, args.seed, np.dtype(args.dtype), args.directory)
+    print(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,59 @@
 from abc import ABC, abstractmethod
+from contextlib import ExitStack
 import numpy as np
-import pandas as pd
-from functools import cached_property
-from .data_utils import get_historical_cov, get_historical_exp_ret, load_historical_returns_header
-from .calcs import cholesky_bootstrap_returns, simulate_wealth
-from .common.enums import SimulationStepType, SimulationType
+from functools import cached_property, partial
+from typing import Optional
+from .data_store import HistoricalData, get_historical_data
+from .calcs import (
+    ReturnsFunction,
+    advance_final_wealth_plans,
+    allocate_wealth_scratch,
+    apply_cholesky_factor,
+    cholesky_bootstrap_returns,
+    expected_wealth_path,
+    gaussian_portfolio_returns,
+    nominal_cashflows,
+    scale_portfolio_normals,
+    simulate_plans_streaming,
+    simulate_wealth_chunk,
+    simulate_wealth_streaming,
+)
+from .common.enums import (
+    ExecutorType,
+    KernelBackendType,
+    PrecisionTarget,
+    SimulationPrecision,
+    SimulationStepType,
+    SimulationType,
+    StatisticsMode,
+)
+from .kernels import AbstractKernelBackend, select_backend
+from .parallel import DEFAULT_SHARD_SIZE, SharedWealthMatrix, map_shards, spawn_seeds, split_shards
+from .outcomes import PlanOutcomes
+from .checkpoints import DEFAULT_CHECKPOINT_BLOCK_STEPS, SimulationCheckpoint
+from .importance import TiltedReturns, effective_sample_size, importance_weights, weighted_percentiles
+from .qmc import sobol_engine, sobol_normals
+from .scenario_bank import BankSampler, ScenarioBank
+from .sketches import MeanEstimator, WealthStatistics
+from .summary import WealthSummary, summarize_wealth
+from .timeline import PlanTimeline
+
+DEFAULT_CHUNK_SIZE = 10000
+DEFAULT_BLOCK_SIZES = {SimulationStepType.ANNUAL: 3, SimulationStepType.MONTHLY: 12}
+ADAPTIVE_MIN_BATCHES = 8
+# plans x paths evaluated at once by `evaluate_plans`
+PLAN_BLOCK_ELEMENTS = 2**16
+IMPORTANCE_PILOT_PATHS = 2000
+IMPORTANCE_ELITE_FRACTION = 0.1
+IMPORTANCE_PILOT_ITERATIONS = 5
+# spawn key of the pilot runs' seed, beyond any shard index so that it never depends on the number of shards
+IMPORTANCE_PILOT_SEED_KEY = 2**31 - 1
+# spawn key of the seed of the scenario bank offset, see IMPORTANCE_PILOT_SEED_KEY
+BANK_OFFSET_SEED_KEY = 2**31 - 2
+# spawn key of the seed of a shard's sketch compactions, a child of the shard seed, so they never consume the draws
+SKETCH_SEED_KEY = 2**31 - 3
+# per path outputs of `simulate_paths`, in argument order
+PATH_OUTPUTS = ("wealth", "control", "log_weights")
 
 
 class AbstractSimulationStrategy(ABC):
@@ -14,26 +63,92 @@ class AbstractSimulationStrategy(ABC):
 
     def __init__(
         self,
-        base_sim_data: pd.DataFrame,
+        timeline: PlanTimeline,
         number_of_simulations: int,
         inflation: float,
         initial_wealth: float,
         step_type: SimulationStepType = SimulationStepType.MONTHLY,
+        chunk_size: Optional[int] = None,
+        step_chunk_size: Optional[int] = None,
+        statistics_mode: StatisticsMode = StatisticsMode.EXACT,
+        sketch_rank_error: float = 0.001,
+        seed: Optional[int] = None,
+        workers: int = 1,
+        executor_type: ExecutorType = ExecutorType.THREAD,
+        shard_size: int = DEFAULT_SHARD_SIZE,
+        dtype: SimulationPrecision = SimulationPrecision.FLOAT64,
+        kernel_backend: Optional[KernelBackendType] = None,
+        portfolio_fast_path: bool = True,
+        antithetic: bool = False,
+        control_variate: bool = False,
+        importance_sampling: bool = False,
+        importance_shift: Optional[float] = None,
     ):
-        self.base_sim_data = base_sim_data
+        self.timeline = timeline
         self.number_of_simulations = number_of_simulations
         self.inflation = inflation
         self.initial_wealth = initial_wealth
         self._simulation_data = None
         self.step_type = step_type
+        self.chunk_size = chunk_size
+        self.step_chunk_size = step_chunk_size
+        self.statistics_mode = statistics_mode
+        self.sketch_rank_error = sketch_rank_error
+        self._statistics = None
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.workers = workers
+        self.executor_type = executor_type
+        self.shard_size = shard_size
+        self.dtype = np.dtype(SimulationPrecision(dtype).value)
+        self.kernel_backend = kernel_backend
+        self.portfolio_fast_path = portfolio_fast_path
+        self.antithetic = antithetic
+        self.control_variate = control_variate
+        self.importance_sampling = importance_sampling
+        self.importance_shift = importance_shift
+        self._mean_estimator = None
+        self._shard_means = None
+        self._log_weights = None
+        self._achieved_standard_error = None
+        self._checkpoint = None
+        if (antithetic or control_variate or importance_sampling) and not self.is_gaussian:
+            raise ValueError("Variance reduction is only available for Gaussian simulation types.")
+        if control_variate and not self.has_unit_steps:
+            raise ValueError("The control variate is only available with unit time steps.")
+        if importance_sampling and (antithetic or control_variate):
+            raise ValueError("Importance sampling cannot be combined with antithetic or control variates.")
+        if importance_sampling and statistics_mode == StatisticsMode.SKETCH:
+            raise ValueError("Importance sampling needs the exact statistics mode.")
 
-    @property
     @abstractmethod
+    def generate_returns(
+        self, rng: np.random.Generator, n: int, start: int, stop: int, out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Generate simulated returns for n paths over the time steps [start, stop),
+        into the C-contiguous buffer `out` if given.
+
+        Returns
+        -------
+        np.ndarray
+            n x (stop - start) x num_assets tensor of returns.
+        """
+        raise NotImplementedError("Subclasses must implement this method.")
+
+    @property
+    def number_of_steps(self) -> int:
+        """
+        Returns the number of time steps simulated.
+        """
+        return self.timeline.number_of_steps
+
+    @property
     def simulated_returns(self) -> np.ndarray:
         """
-        Returns the simulated returns.
+        Returns the simulated returns for all paths and time steps.
         """
-        raise NotImplementedError("Subclasses must implement this property.")
+        rng = np.random.default_rng(self.seed_sequence)
+        return self.generate_returns(rng, self.number_of_simulations, 0, self.number_of_steps)
 
     @property
     @abstractmethod
@@ -43,53 +158,772 @@ class AbstractSimulationStrategy(ABC):
         """
         raise NotImplementedError("Subclasses must implement this property.")
 
-    @property
+    @cached_property
     def weights(self) -> np.ndarray:
         """
-        Returns the weights of the assets.
+        Returns the s x num_assets matrix of weights, in asset order.
         """
-        _sim_data = self.base_sim_data.dropna(how="any")
-        weights = _sim_data[self.assets]
-        weights = weights.values
-        return weights
+        return self.timeline.asset_weights(self.assets)
 
     @property
     def cashflows(self) -> np.ndarray:
         """
         Returns the cashflows.
         """
-        _sim_data = self.base_sim_data.dropna(how="any")
-        cashflows = _sim_data["cashflow"].values
-        return cashflows
+        return self.timeline.cashflows
 
     @property
     def transactions(self) -> np.ndarray:
         """
         Returns the transactions.
         """
-        _sim_data = self.base_sim_data.dropna(how="any")
-        transactions = _sim_data["transactions"].values
-        return transactions
+        return self.timeline.transactions
 
     @property
     def time_steps(self) -> np.ndarray:
         """
         Returns the time steps.
         """
-        time_steps = self.base_sim_data.index.to_series().values
-        return time_steps
+        return self.timeline.time_steps
+
+    @property
+    def is_gaussian(self) -> bool:
+        """
+        Whether simulated asset returns are jointly normal, with moments given by `portfolio_return_moments`.
+        """
+        return False
+
+    def portfolio_return_moments(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the mean and volatility of the portfolio return at every time step (Gaussian strategies only).
+        """
+        raise NotImplementedError("Only Gaussian strategies have closed-form portfolio return moments.")
+
+    @property
+    def has_unit_steps(self) -> bool:
+        """
+        Whether every time step has length 1.
+        """
+        return bool(np.all(np.diff(self.time_steps) == 1))
+
+    @property
+    def uses_portfolio_returns(self) -> bool:
+        """
+        Whether one portfolio-level return per path and step can replace the asset returns.
+        With unit time steps wealth only depends on w_i . r, which is itself normal for Gaussian returns.
+        """
+        return self.portfolio_fast_path and self.is_gaussian and self.has_unit_steps
+
+    @property
+    def uses_mean_estimator(self) -> bool:
+        """
+        Whether the mean is estimated with variance reduction (antithetic pairs and/or a control variate).
+        """
+        return self.antithetic or self.control_variate
+
+    def expected_control_path(self) -> np.ndarray:
+        """
+        Returns the known expectation of the control variate: the expected wealth path without the zero floor.
+        """
+        means, _ = self.portfolio_return_moments()
+        flows = nominal_cashflows(self.cashflows, self.transactions, self.inflation, np.diff(self.time_steps))
+        return expected_wealth_path(self.initial_wealth, means, flows)
 
-    def simulate(self):
-        return simulate_wealth(
-            self.simulated_returns,
-            self.weights,
+    def importance_return_shift(self, tilt: np.ndarray) -> np.ndarray:
+        """
+        Returns the s x num_assets shift of the returns fed to the kernel that moves the standard normals of
+        every step t by -tilt[t] along the direction lowering the portfolio return most (Gaussian strategies only).
+        """
+        raise NotImplementedError("Only Gaussian strategies support importance sampling.")
+
+    def tilted_returns(
+        self,
+        returns_fn: ReturnsFunction,
+        weights: np.ndarray,
+        log_weights: np.ndarray,
+        tilt: Optional[np.ndarray] = None,
+        standardized_out: Optional[np.ndarray] = None,
+    ) -> TiltedReturns:
+        """
+        Wrap a returns function for importance sampling, shifting the normals of every step by -tilt
+        (by default `importance_tilt`).
+        """
+        means, stds = self.portfolio_return_moments()
+        tilt = self.importance_tilt if tilt is None else tilt
+        shift = self.importance_return_shift(tilt)
+        return TiltedReturns(returns_fn, weights, shift, means, stds, tilt, log_weights, standardized_out)
+
+    @cached_property
+    def importance_tilt(self) -> np.ndarray:
+        """
+        Returns the s x 1 shift of the standard normals toward bad outcomes at every step.
+        A fixed `importance_shift` (in standard deviations over the whole horizon) is spread evenly over the steps;
+        otherwise the shift is fitted with a cross-entropy pilot run.
+        """
+        _, stds = self.portfolio_return_moments()
+        if self.importance_shift is not None:
+            return np.where(stds > 0, self.importance_shift / np.sqrt(self.number_of_steps), 0.0)
+        return self.cross_entropy_tilt()
+
+    def cross_entropy_tilt(self) -> np.ndarray:
+        """
+        Fit the importance sampling shift with the cross-entropy method on small pilot runs.
+        Each iteration simulates IMPORTANCE_PILOT_PATHS paths under the current shift, keeps the worst
+        IMPORTANCE_ELITE_FRACTION of final wealth (or all destitute paths once they are that frequent) and moves the
+        shift to their likelihood-weighted mean standardized portfolio returns, which concentrates the shift on the
+        steps that drive bad outcomes (e.g. sequence-of-returns risk around retirement).
+        The pilot draws from its own child of the root seed, so it does not change the simulated paths' streams.
+        """
+        _, stds = self.portfolio_return_moments()
+        root = self.seed_sequence
+        rng = np.random.default_rng(
+            np.random.SeedSequence(root.entropy, spawn_key=(*root.spawn_key, IMPORTANCE_PILOT_SEED_KEY))
+        )
+        n = min(self.number_of_simulations, IMPORTANCE_PILOT_PATHS)
+        wealth = np.empty((n, len(self.time_steps)), dtype=self.dtype)
+        log_weights = np.empty(n)
+        standardized = np.empty((n, self.number_of_steps))
+        tilt = np.zeros(self.number_of_steps)
+        for _ in range(IMPORTANCE_PILOT_ITERATIONS):
+            returns_fn, weights = self.returns_source(rng)
+            returns_fn = self.tilted_returns(returns_fn, weights, log_weights, tilt, standardized)
+            simulate_wealth_streaming(
+                returns_fn,
+                n,
+                weights,
+                self.initial_wealth,
+                self.cashflows,
+                self.transactions,
+                self.inflation,
+                self.time_steps,
+                chunk_size=n,
+                out=wealth,
+                kernel=self.kernel.advance_wealth,
+            )
+            level = max(np.quantile(wealth[:, -1], IMPORTANCE_ELITE_FRACTION), 0)
+            elite = wealth[:, -1] <= level
+            likelihood = np.exp(log_weights[elite] - log_weights[elite].max())
+            tilt = np.where(stds > 0, -(likelihood @ standardized[elite]) / likelihood.sum(), 0.0)
+            if level == 0:
+                break
+        return tilt
+
+    def returns_source(self, rng: np.random.Generator, first_path: int = 0) -> tuple[ReturnsFunction, np.ndarray]:
+        """
+        Returns the function generating the returns fed to the kernel, and the weights the kernel applies to them.
+        `first_path` is the index of the first path it generates, which only sources reading fixed paths
+        (the scenario bank) depend on.
+        """
+        if self.uses_portfolio_returns:
+            means, stds = self.portfolio_return_moments()
+            returns_fn = partial(
+                gaussian_portfolio_returns, rng, means, stds, dtype=self.dtype, antithetic=self.antithetic
+            )
+            return returns_fn, np.ones((len(means), 1))
+        return partial(self.generate_returns, rng), self.weights
+
+    @cached_property
+    def kernel(self) -> AbstractKernelBackend:
+        """
+        Returns the time-step kernel backend, chosen for the number of paths simulated at once.
+        """
+        paths_at_once = min(self.chunk_size or self.shard_size, self.number_of_simulations)
+        return select_backend(paths_at_once, self.dtype, self.kernel_backend)
+
+    @property
+    def shards(self) -> list[tuple[int, int]]:
+        """
+        Returns the [start, stop) path ranges simulated as independent shards.
+        """
+        return split_shards(self.number_of_simulations, self.shard_size)
+
+    def simulate_paths(
+        self,
+        seed: np.random.SeedSequence,
+        wealth: np.ndarray,
+        control: Optional[np.ndarray] = None,
+        log_weights: Optional[np.ndarray] = None,
+        first_path: int = 0,
+    ) -> np.ndarray:
+        """
+        Simulate one shard of paths, starting at path `first_path`, into `wealth`, drawing from the shard's own
+        random stream. The same paths without the zero floor are written into `control` if given, and the
+        importance sampling log likelihood ratios of the paths into `log_weights` if given.
+        """
+        returns_fn, weights = self.returns_source(np.random.default_rng(seed), first_path)
+        if log_weights is not None:
+            returns_fn = self.tilted_returns(returns_fn, weights, log_weights)
+        return simulate_wealth_streaming(
+            returns_fn,
+            wealth.shape[0],
+            weights,
             self.initial_wealth,
             self.cashflows,
             self.transactions,
             self.inflation,
             self.time_steps,
+            chunk_size=self.chunk_size or wealth.shape[0],
+            step_chunk_size=self.step_chunk_size,
+            out=wealth,
+            kernel=self.kernel.advance_wealth,
+            control_out=control,
         )
 
+    def simulate(self) -> np.ndarray:
+        """
+        Simulate all paths shard by shard. Each shard draws from a child of the root seed,
+        so the result does not depend on the number of workers.
+        """
+        shards = self.shards
+        outputs = self.simulate_shards(shards, spawn_seeds(self.seed_sequence, len(shards)))
+        return self.collect_outputs(outputs)
+
+    def simulate_shards(
+        self, shards: list[tuple[int, int]], seeds: list[np.random.SeedSequence]
+    ) -> dict[str, np.ndarray]:
+        """
+        Simulate consecutive shards into fresh per path outputs (see PATH_OUTPUTS) whose rows start
+        at the first shard's first path.
+        """
+        offset = shards[0][0]
+        n = shards[-1][1] - offset
+        shards = [(start - offset, stop - offset) for start, stop in shards]
+        layouts = {"wealth": ((n, len(self.time_steps)), self.dtype)}
+        if self.control_variate:
+            layouts["control"] = ((n, len(self.time_steps)), self.dtype)
+        if self.importance_sampling:
+            layouts["log_weights"] = ((n,), np.dtype(np.float64))
+
+        if self.executor_type == ExecutorType.PROCESS and self.workers > 1:
+            with ExitStack() as stack:
+                shared = {
+                    key: stack.enter_context(SharedWealthMatrix(shape, dtype)) for key, (shape, dtype) in layouts.items()
+                }
+                handles = {key: (matrix.name, matrix.shape, matrix.dtype) for key, matrix in shared.items()}
+                tasks = [
+                    (self, handles, start, stop, seed, offset + start) for (start, stop), seed in zip(shards, seeds)
+                ]
+                map_shards(_simulate_shard_in_shared_memory, tasks, self.workers, self.executor_type)
+                return {key: matrix.array.copy() for key, matrix in shared.items()}
+
+        outputs = {key: np.empty(shape, dtype=dtype) for key, (shape, dtype) in layouts.items()}
+        tasks = [
+            (seed, *(outputs[key][start:stop] if key in outputs else None for key in PATH_OUTPUTS), offset + start)
+            for (start, stop), seed in zip(shards, seeds)
+        ]
+        map_shards(self.simulate_paths, tasks, self.workers, self.executor_type)
+        return outputs
+
+    def collect_outputs(self, outputs: dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Keep the per path outputs of all shards and return the wealth matrix.
+        """
+        self.estimate_mean(outputs["wealth"], outputs.get("control"))
+        self._log_weights = outputs.get("log_weights")
+        return outputs["wealth"]
+
+    def estimate_mean(self, wealth: np.ndarray, control: Optional[np.ndarray] = None) -> None:
+        """
+        Feed the simulated wealth matrix to the variance-reduced mean estimator, chunk by chunk as generated,
+        so that antithetic pairs are matched up. Does nothing without variance reduction.
+        """
+        if not self.uses_mean_estimator:
+            return
+        estimator = MeanEstimator(wealth.shape[1], self.antithetic, self.control_variate)
+        for shard_start, shard_stop in self.shards:
+            chunk_size = self.chunk_size or shard_stop - shard_start
+            for start in range(shard_start, shard_stop, chunk_size):
+                stop = min(shard_stop, start + chunk_size)
+                estimator.update(wealth[start:stop], None if control is None else control[start:stop])
+        self._mean_estimator = estimator
+
+    def simulate_plans(self, plans: list["AbstractSimulationStrategy"]) -> None:
+        """
+        Simulate several plans on common random numbers. The returns are drawn once from this strategy's
+        shard streams and every block is fed to all plans along a plan axis (see `simulate_plans_streaming`),
+        so the cost of the draws is shared and differences between plans are not blurred by sampling noise.
+        Each plan keeps its own wealth matrix and mean estimator, so its statistics are read as after `run`.
+        The plans must share this strategy's time steps and return model; only the plan itself (weights,
+        cash flows, one-off transactions, inflation and initial wealth) may differ. Shards run on threads.
+
+        Parameters
+        ----------
+        plans : list[AbstractSimulationStrategy]
+            Strategies of the plans to simulate, which may include this one.
+        """
+        if self.statistics_mode == StatisticsMode.SKETCH or any(plan.importance_sampling for plan in plans):
+            raise ValueError("Plans can only be simulated together in the exact statistics mode, without importance sampling.")
+        time_steps = self.time_steps
+        for plan in plans:
+            if not np.array_equal(plan.time_steps, time_steps):
+                raise ValueError("Plans simulated together must share the same time steps.")
+            if plan.number_of_simulations != self.number_of_simulations or plan.control_variate != self.control_variate:
+                raise ValueError("Plans simulated together must share the number of simulations and variance reduction.")
+
+        # plans weight the same asset returns differently, so the portfolio-level fast path does not apply
+        self.portfolio_fast_path = False
+        time_delta = np.diff(time_steps)
+        weights = np.stack([plan.weights for plan in plans])
+        initial_wealth = np.array([plan.initial_wealth for plan in plans], dtype=np.float64)
+        flows = np.stack(
+            [nominal_cashflows(plan.cashflows, plan.transactions, plan.inflation, time_delta) for plan in plans]
+        )
+        shape = (len(plans), self.number_of_simulations, len(time_steps))
+        wealth = np.empty(shape, dtype=self.dtype)
+        control = np.empty(shape, dtype=self.dtype) if self.control_variate else None
+
+        shards = self.shards
+        tasks = [
+            (seed, wealth[:, start:stop], None if control is None else control[:, start:stop], start)
+            for (start, stop), seed in zip(shards, spawn_seeds(self.seed_sequence, len(shards)))
+        ]
+        simulate_shard = partial(self.simulate_plan_paths, weights, initial_wealth, flows)
+        map_shards(simulate_shard, tasks, self.workers, ExecutorType.THREAD)
+        for i, plan in enumerate(plans):
+            outputs = {"wealth": wealth[i]}
+            if control is not None:
+                outputs["control"] = control[i]
+            plan._simulation_data = plan.collect_outputs(outputs)
+
+    def simulate_plan_paths(
+        self,
+        weights: np.ndarray,
+        initial_wealth: np.ndarray,
+        flows: np.ndarray,
+        seed: np.random.SeedSequence,
+        wealth: np.ndarray,
+        control: Optional[np.ndarray] = None,
+        first_path: int = 0,
+    ) -> np.ndarray:
+        """
+        Simulate one shard of paths of every plan, starting at path `first_path`, into the P x n x s+1 tensor
+        `wealth`, drawing from the shard's own random stream.
+        """
+        returns_fn, _ = self.returns_source(np.random.default_rng(seed), first_path)
+        return simulate_plans_streaming(
+            returns_fn,
+            wealth.shape[1],
+            weights,
+            initial_wealth,
+            flows,
+            self.time_steps,
+            chunk_size=self.chunk_size or wealth.shape[1],
+            step_chunk_size=self.step_chunk_size,
+            out=wealth,
+            control_out=control,
+        )
+
+    def draw_returns(self) -> np.ndarray:
+        """
+        Draw the asset returns of all paths once, shard by shard from the shard seeds and chunk by chunk as
+        `simulate_paths` does, so that many plans can be scored on the same draws with `evaluate_plans`.
+
+        Returns
+        -------
+        np.ndarray
+            n x s x num_assets tensor of returns.
+        """
+        # plans weight the same asset returns differently, so the portfolio-level fast path does not apply
+        self.portfolio_fast_path = False
+        returns = np.empty((self.number_of_simulations, self.number_of_steps, len(self.assets)), dtype=self.dtype)
+        shards = self.shards
+        tasks = [
+            (seed, returns[start:stop], start)
+            for (start, stop), seed in zip(shards, spawn_seeds(self.seed_sequence, len(shards)))
+        ]
+        map_shards(self.draw_shard_returns, tasks, self.workers, ExecutorType.THREAD)
+        return returns
+
+    def draw_shard_returns(self, seed: np.random.SeedSequence, out: np.ndarray, first_path: int = 0) -> np.ndarray:
+        """
+        Draw the returns of one shard, starting at path `first_path`, into `out`, from the shard's own random stream.
+        """
+        returns_fn, _ = self.returns_source(np.random.default_rng(seed), first_path)
+        chunk_size = self.chunk_size or len(out)
+        for start in range(0, len(out), chunk_size):
+            stop = min(len(out), start + chunk_size)
+            returns = returns_fn(stop - start, 0, self.number_of_steps, out=out[start:stop])
+            if returns is not out[start:stop]:
+                out[start:stop] = returns
+        return out
+
+    def evaluate_plans(
+        self, returns: np.ndarray, weights: np.ndarray, initial_wealth: np.ndarray, flows: np.ndarray
+    ) -> PlanOutcomes:
+        """
+        Score several plans on cached returns (see `draw_returns`), keeping only their final wealth and
+        destitution risk. Only the wealth recursion runs, in blocks of paths on threads, so plans are cheap to
+        re-evaluate while searching over them.
+
+        Parameters
+        ----------
+        returns : np.ndarray
+            n x s x num_assets tensor of returns.
+        weights : np.ndarray
+            P x s x num_assets tensor of weights.
+        initial_wealth : np.ndarray
+            P x 1 vector of initial wealth.
+        flows : np.ndarray
+            P x s matrix of nominal cash flows (see `nominal_cashflows`).
+
+        Returns
+        -------
+        PlanOutcomes
+            The outcomes of every plan.
+        """
+        n, s, _ = returns.shape
+        time_delta = np.diff(self.time_steps).astype(self.dtype)
+        weights = weights.astype(self.dtype, copy=False)
+        flows = flows.astype(self.dtype, copy=False)
+        final_wealth = np.empty((len(weights), n), dtype=self.dtype)
+        # keep the P x block running wealth and its temporaries in cache
+        block_size = min(self.chunk_size or DEFAULT_CHUNK_SIZE, max(1, PLAN_BLOCK_ELEMENTS // len(weights)))
+        blocks = split_shards(n, block_size)
+        zero_counts = np.zeros((len(blocks), len(weights), s), dtype=np.int64)
+
+        def evaluate_block(start: int, stop: int, counts: np.ndarray) -> None:
+            current = np.repeat(np.asarray(initial_wealth, dtype=self.dtype)[:, None], stop - start, axis=1)
+            advance_final_wealth_plans(current, returns[start:stop], weights, flows, time_delta, counts)
+            final_wealth[:, start:stop] = current
+
+        tasks = [(start, stop, counts) for (start, stop), counts in zip(blocks, zero_counts)]
+        map_shards(evaluate_block, tasks, self.workers, ExecutorType.THREAD)
+        return PlanOutcomes(final_wealth, zero_counts.sum(axis=0) / n, self.time_steps, self.inflation)
+
+    def run_from_checkpoint(
+        self, checkpoint: Optional[SimulationCheckpoint], block_steps: int = DEFAULT_CHECKPOINT_BLOCK_STEPS
+    ) -> SimulationCheckpoint:
+        """
+        Run the simulation incrementally: keep the checkpoint's wealth up to the first time step whose inputs
+        changed (or up to the checkpoint's horizon when the horizon is extended) and simulate only the steps after it.
+
+        Every shard draws each block of `block_steps` time steps from its own child of the shard seed, always over
+        the full block (past the horizon for the last one), so the draws of any block can be generated again without
+        those before it and do not depend on the horizon. The result is then the same whether it was resumed from
+        a checkpoint or not. The draws differ from those of `run`, whose streams span all time steps, and are
+        asset returns: the portfolio-level fast path would tie them to the plan's weights.
+
+        Parameters
+        ----------
+        checkpoint : SimulationCheckpoint, optional
+            Latest checkpoint of the same draws, or None to simulate every step.
+        block_steps : int, optional
+            Number of time steps drawn from one seed, by default DEFAULT_CHECKPOINT_BLOCK_STEPS.
+
+        Returns
+        -------
+        SimulationCheckpoint
+            Checkpoint of this run.
+        """
+        if self.statistics_mode == StatisticsMode.SKETCH or self.importance_sampling:
+            raise ValueError("Incremental runs need the exact statistics mode without importance sampling.")
+        self.portfolio_fast_path = False
+        time_steps = self.time_steps
+        time_delta = np.diff(time_steps)
+        weights = self.weights
+        flows = nominal_cashflows(self.cashflows, self.transactions, self.inflation, time_delta)
+        first = 0
+        if checkpoint is not None:
+            first = checkpoint.first_changed_step(self.initial_wealth, weights, flows, time_steps)
+
+        wealth = np.empty((self.number_of_simulations, len(time_steps)), dtype=self.dtype)
+        control = np.empty_like(wealth) if self.control_variate else None
+        for output, previous in ((wealth, checkpoint and checkpoint.wealth), (control, checkpoint and checkpoint.control)):
+            if output is None:
+                continue
+            if first == 0:
+                output[:, 0] = self.initial_wealth
+            else:
+                output[:, : first + 1] = previous[:, : first + 1]
+
+        if first < len(time_delta):
+            shards = self.shards
+            tasks = [
+                (
+                    seed,
+                    wealth[start:stop],
+                    None if control is None else control[start:stop],
+                    flows,
+                    first,
+                    block_steps,
+                    start,
+                )
+                for (start, stop), seed in zip(shards, spawn_seeds(self.seed_sequence, len(shards)))
+            ]
+            map_shards(self.simulate_shard_tail, tasks, self.workers, ExecutorType.THREAD)
+        self._simulation_data = wealth
+        self.estimate_mean(wealth, control)
+        self._checkpoint = SimulationCheckpoint(
+            self.initial_wealth, weights, flows, time_steps, wealth, control, checkpoint, first + 1 if first else 0
+        )
+        return self._checkpoint
+
+    def simulate_shard_tail(
+        self,
+        seed: np.random.SeedSequence,
+        wealth: np.ndarray,
+        control: Optional[np.ndarray],
+        flows: np.ndarray,
+        first: int,
+        block_steps: int,
+        first_path: int = 0,
+    ) -> np.ndarray:
+        """
+        Simulate the time steps after `first` of one shard starting at path `first_path`, whose wealth (and control)
+        columns up to `first` are already filled in. Only the step blocks from the one containing `first` are drawn.
+        """
+        time_delta = np.diff(self.time_steps).astype(self.dtype)
+        flows = flows.astype(self.dtype, copy=False)
+        s = len(time_delta)
+        n = len(wealth)
+        chunk_size = self.chunk_size or n
+        kernel = self.kernel.advance_wealth
+        weights = self.weights.astype(self.dtype)
+        k = weights.shape[1]
+        buffer = np.empty(min(chunk_size, n) * block_steps * k, dtype=self.dtype)
+        scratch = allocate_wealth_scratch(min(chunk_size, n), k, self.dtype)
+        for block_start in range(first - first % block_steps, s, block_steps):
+            block_stop = min(s, block_start + block_steps)
+            block_seed = np.random.SeedSequence(seed.entropy, spawn_key=(*seed.spawn_key, block_start // block_steps))
+            returns_fn, _ = self.returns_source(np.random.default_rng(block_seed), first_path)
+            begin = max(first, block_start)
+            steps = slice(begin, block_stop)
+            for start in range(0, n, chunk_size):
+                stop = min(n, start + chunk_size)
+                out = buffer[: (stop - start) * block_steps * k].reshape(stop - start, block_steps, k)
+                returns = returns_fn(stop - start, block_start, block_start + block_steps, out=out)
+                returns = returns[:, begin - block_start : block_stop - block_start]
+                for output, floor in ((wealth, True), (control, False)):
+                    if output is not None:
+                        kernel(
+                            output[start:stop, begin : block_stop + 1],
+                            returns,
+                            weights[steps],
+                            flows[steps],
+                            time_delta[steps],
+                            scratch,
+                            floor,
+                        )
+        return wealth
+
+    def simulate_statistics_shard(self, seed: np.random.SeedSequence, n: int, first_path: int = 0) -> WealthStatistics:
+        """
+        Simulate one shard of n paths, starting at path `first_path`, chunk by chunk and summarise each chunk as
+        soon as it is finished, so that neither the returns tensor nor the wealth matrix is ever held in memory.
+        The sketch compacts from its own child of the shard seed, so the paths do not depend on the sketch accuracy
+        or the chunk size.
+        """
+        time_steps = self.time_steps
+        time_delta = np.diff(time_steps)
+        returns_fn, weights = self.returns_source(np.random.default_rng(seed), first_path)
+        flows = nominal_cashflows(self.cashflows, self.transactions, self.inflation, time_delta)
+        chunk_size = self.chunk_size or DEFAULT_CHUNK_SIZE
+        kernel = self.kernel.advance_wealth
+
+        sketch_rng = np.random.default_rng(
+            np.random.SeedSequence(seed.entropy, spawn_key=(*seed.spawn_key, SKETCH_SEED_KEY))
+        )
+        statistics = WealthStatistics(len(time_steps), self.sketch_rank_error, sketch_rng, self.new_mean_estimator())
+        buffer = np.empty((min(chunk_size, n), len(time_steps)), dtype=self.dtype)
+        control_buffer = np.empty_like(buffer) if self.control_variate else None
+        step_chunk_size = min(self.step_chunk_size or len(time_delta), len(time_delta))
+        returns_buffer = np.empty(buffer.shape[0] * step_chunk_size * weights.shape[1], dtype=self.dtype)
+        for start in range(0, n, chunk_size):
+            wealth = buffer[: min(n, start + chunk_size) - start]
+            wealth[:, 0] = self.initial_wealth
+            control = None
+            if control_buffer is not None:
+                control = control_buffer[: wealth.shape[0]]
+                control[:, 0] = self.initial_wealth
+            simulate_wealth_chunk(
+                returns_fn, wealth, weights, flows, time_delta, self.step_chunk_size, returns_buffer, kernel, control
+            )
+            statistics.update(wealth, control)
+        return statistics
+
+    def simulate_statistics(self) -> WealthStatistics:
+        """
+        Simulate all shards in sketch statistics mode and merge their statistics in shard order.
+        """
+        shards = self.shards
+        seeds = spawn_seeds(self.seed_sequence, len(shards) + 1)
+        return self.merge_statistics(self.simulate_statistics_shards(shards, seeds), seeds[len(shards)])
+
+    def simulate_statistics_shards(
+        self, shards: list[tuple[int, int]], seeds: list[np.random.SeedSequence]
+    ) -> list[WealthStatistics]:
+        """
+        Simulate shards in sketch statistics mode, returning the statistics of every shard.
+        """
+        tasks = [(seed, stop - start, start) for (start, stop), seed in zip(shards, seeds)]
+        return map_shards(self.simulate_statistics_shard, tasks, self.workers, self.executor_type)
+
+    def merge_statistics(self, results: list[WealthStatistics], seed: np.random.SeedSequence) -> WealthStatistics:
+        """
+        Merge the statistics of all shards in shard order, compacting with a generator drawn from `seed`.
+        """
+        statistics = WealthStatistics(
+            len(self.time_steps), self.sketch_rank_error, np.random.default_rng(seed), self.new_mean_estimator()
+        )
+        self._shard_means = np.array([shard_statistics.get_mean() for shard_statistics in results])
+        for shard_statistics in results:
+            statistics.merge(shard_statistics)
+        return statistics
+
+    def new_mean_estimator(self) -> Optional[MeanEstimator]:
+        """
+        Returns an empty variance-reduced mean estimator, or None without variance reduction.
+        """
+        if not self.uses_mean_estimator:
+            return None
+        return MeanEstimator(len(self.time_steps), self.antithetic, self.control_variate)
+
+    @property
+    def mean_estimator(self) -> Optional[MeanEstimator]:
+        """
+        Returns the variance-reduced mean estimator, or None without variance reduction.
+        If the simulation has not been run yet, it will be executed.
+        """
+        if not self.uses_mean_estimator:
+            return None
+        self.run()
+        if self.statistics_mode == StatisticsMode.SKETCH:
+            return self.statistics.mean_estimator
+        return self._mean_estimator
+
+    @property
+    def path_weights(self) -> Optional[np.ndarray]:
+        """
+        Returns the importance weights of the paths (see `importance_weights`), or None without importance sampling.
+        If the simulation has not been run yet, it will be executed.
+        """
+        if not self.importance_sampling:
+            return None
+        self.run()
+        return importance_weights(self._log_weights)
+
+    def get_effective_sample_size(self) -> Optional[float]:
+        """
+        Returns the effective number of paths behind the importance-sampled statistics, or None without
+        importance sampling.
+        """
+        if not self.importance_sampling:
+            return None
+        return effective_sample_size(self.path_weights)
+
+    def run(self) -> None:
+        """
+        Run the simulation in the configured statistics mode, if it has not been run yet.
+        """
+        if self.statistics_mode == StatisticsMode.SKETCH:
+            self.statistics
+        else:
+            self.simulation_data
+
+    def run_adaptive(self, target: PrecisionTarget, target_standard_error: float) -> float:
+        """
+        Run the simulation in batches until the target metric is precise enough.
+
+        Every shard is one batch. Shards are simulated in rounds (ADAPTIVE_MIN_BATCHES at first, then as many as the
+        current error suggests, at most doubling) until the batch-means standard error of the target metric is at
+        most `target_standard_error` or all number_of_simulations paths (the budget) are used. Afterwards
+        number_of_simulations is the number of paths used, and the strategy holds exactly the paths a plain run
+        with that many paths would have simulated.
+
+        Parameters
+        ----------
+        target : PrecisionTarget
+            Metric whose standard error is controlled.
+        target_standard_error : float
+            Standard error to reach, in the metric's units (currency, or probability for success probability).
+
+        Returns
+        -------
+        float
+            The achieved standard error, NaN if the budget holds a single batch.
+        """
+        budget = self.shards
+        seeds = spawn_seeds(self.seed_sequence, len(budget) + 1)
+        results, batch_metrics = [], []
+        used = 0
+        count = min(ADAPTIVE_MIN_BATCHES, len(budget))
+        while True:
+            shards, shard_seeds = budget[used : used + count], seeds[used : used + count]
+            if self.statistics_mode == StatisticsMode.SKETCH:
+                round_results = self.simulate_statistics_shards(shards, shard_seeds)
+                batch_metrics.extend(self.statistics_metric(target, statistics) for statistics in round_results)
+            else:
+                round_results = self.simulate_shards(shards, shard_seeds)
+                batch_metrics.extend(self.batch_metric(target, round_results, shards))
+            results.append(round_results)
+            used += count
+
+            standard_error = np.std(batch_metrics, ddof=1) / np.sqrt(used) if used > 1 else np.nan
+            if used == len(budget) or standard_error <= target_standard_error:
+                break
+            needed = int(np.ceil(used * (standard_error / target_standard_error) ** 2))
+            count = min(max(needed - used, 1), used, len(budget) - used)
+
+        self.number_of_simulations = budget[used - 1][1]
+        if self.statistics_mode == StatisticsMode.SKETCH:
+            self._statistics = self.merge_statistics([s for round_results in results for s in round_results], seeds[used])
+        else:
+            outputs = {key: np.concatenate([round_results[key] for round_results in results]) for key in results[0]}
+            self._simulation_data = self.collect_outputs(outputs)
+        self._achieved_standard_error = float(standard_error)
+        return self._achieved_standard_error
+
+    def batch_metric(
+        self, target: PrecisionTarget, outputs: dict[str, np.ndarray], shards: list[tuple[int, int]]
+    ) -> list[float]:
+        """
+        Returns the target metric of every shard of a round simulated with `simulate_shards`.
+        """
+        offset = shards[0][0]
+        metrics = []
+        for start, stop in shards:
+            final_wealth = outputs["wealth"][start - offset : stop - offset, -1]
+            weights = None
+            if "log_weights" in outputs:
+                weights = importance_weights(outputs["log_weights"][start - offset : stop - offset])
+            metrics.append(final_metric(target, final_wealth, weights))
+        return metrics
+
+    @staticmethod
+    def statistics_metric(target: PrecisionTarget, statistics: WealthStatistics) -> float:
+        """
+        Returns the target metric of one shard's streamed statistics.
+        """
+        match target:
+            case PrecisionTarget.FINAL_MEDIAN:
+                return float(statistics.get_median()[-1])
+            case PrecisionTarget.FINAL_MEAN:
+                return float(statistics.get_mean()[-1])
+            case PrecisionTarget.SUCCESS_PROBABILITY:
+                return float(1 - statistics.get_destitution_risk()[-1])
+        raise ValueError(f"Unsupported precision target: {target}")
+
+    def get_achieved_standard_error(self) -> Optional[float]:
+        """
+        Returns the batch-means standard error of the target metric reached by `run_adaptive`,
+        or None if the simulation was not run adaptively (or the budget held a single batch).
+        """
+        if self._achieved_standard_error is None or np.isnan(self._achieved_standard_error):
+            return None
+        return self._achieved_standard_error
+
+    @property
+    def statistics(self) -> WealthStatistics:
+        """
+        Returns the streamed per time step statistics (sketch statistics mode only).
+        If the simulation has not been run yet, it will be executed.
+        """
+        if self.statistics_mode != StatisticsMode.SKETCH:
+            raise ValueError("Streamed statistics are only available in sketch statistics mode.")
+        if self._statistics is None:
+            self._statistics = self.simulate_statistics()
+        return self._statistics
+
     @property
     def simulation_data(self) -> np.ndarray:
         """
@@ -101,11 +935,48 @@ class AbstractSimulationStrategy(ABC):
         np.ndarray
             The simulation data. numer_of_simulations x num_timesteps array of wealth values.
         """
+        if self.statistics_mode == StatisticsMode.SKETCH:
+            raise ValueError("The wealth matrix is not retained in sketch statistics mode.")
         if self._simulation_data is None:
             print("Simulating...")
             self._simulation_data = self.simulate()
         return self._simulation_data
 
+    def summarize(self, percentiles: list[float] = [5, 25, 50, 75, 95]) -> WealthSummary:
+        """
+        Returns every per time step summary statistic of the simulation at once.
+        With the exact wealth matrix they are computed in a single pass over it (see `summarize_wealth`);
+        sketch and importance sampling statistics are gathered from their own estimators.
+
+        Parameters
+        ----------
+        percentiles : list[float], optional
+            List of percentiles to calculate, by default [5, 25, 50, 75, 95]
+
+        Returns
+        -------
+        WealthSummary
+            The summary statistics.
+        """
+        if self.statistics_mode == StatisticsMode.SKETCH or self.importance_sampling:
+            return WealthSummary(
+                percentiles,
+                self.get_percentiles(percentiles),
+                self.get_median(),
+                self.get_mean(),
+                self.get_std(),
+                self.get_min(),
+                self.get_max(),
+                self.get_destitution_risk(),
+            )
+        if self._checkpoint is not None:
+            summary = self._checkpoint.summarize(percentiles).take(slice(None))
+        else:
+            summary = summarize_wealth(self.simulation_data, percentiles)
+        if self.control_variate:
+            summary.mean = self.get_mean()
+        return summary
+
     def get_percentiles(self, percentiles: list[float] = [5, 25, 50, 75, 95]) -> np.ndarray:
         """
         Returns the percentiles of the simulation data.
@@ -117,9 +988,13 @@ class AbstractSimulationStrategy(ABC):
 
         Returns
         -------
-        pd.DataFrame
-            DataFrame containing the percentiles.
+        np.array
+            len(percentiles) x num_timesteps matrix of the percentiles.
         """
+        if self.statistics_mode == StatisticsMode.SKETCH:
+            return self.statistics.get_percentiles(percentiles)
+        if self.importance_sampling:
+            return weighted_percentiles(self.simulation_data, self.path_weights, percentiles)
         return np.percentile(self.simulation_data, percentiles, axis=0)
 
     def get_mean(self) -> np.ndarray:
@@ -128,101 +1003,567 @@ class AbstractSimulationStrategy(ABC):
 
         Returns
         -------
-        pd.DataFrame
-            DataFrame containing the mean.
+        np.array
+            Mean at every time step.
         """
-        return np.mean(self.simulation_data, axis=0)
+        if self.control_variate:
+            return self.mean_estimator.mean(self.expected_control_path())
+        if self.statistics_mode == StatisticsMode.SKETCH:
+            return self.statistics.get_mean()
+        if self.importance_sampling:
+            return self.path_weights @ self.simulation_data
+        return np.mean(self.simulation_data, axis=0, dtype=np.float64)
     
+    def get_variance_reduction(self) -> Optional[float]:
+        """
+        Returns the estimated variance reduction factor of the final mean wealth, or None without variance
+        reduction (or if the estimate has no residual variance, e.g. when the floor is never hit).
+        """
+        if not self.uses_mean_estimator:
+            return None
+        reduction = self.mean_estimator.variance_reduction()[-1]
+        return None if np.isnan(reduction) else float(reduction)
+
+    def get_shard_means(self) -> np.ndarray:
+        """
+        Returns the num_shards x num_timesteps matrix of the mean wealth of every shard.
+        """
+        if self.statistics_mode == StatisticsMode.SKETCH:
+            self.run()
+            return self._shard_means
+        return np.array([self.simulation_data[start:stop].mean(axis=0, dtype=np.float64) for start, stop in self.shards])
+
+    def get_standard_error(self) -> np.ndarray:
+        """
+        Returns the estimated standard error of the mean wealth at every time step.
+        """
+        if self.uses_mean_estimator:
+            return self.mean_estimator.standard_error()
+        if self.importance_sampling:
+            weighted = self.path_weights[:, None] * self.simulation_data * self.number_of_simulations
+            return np.std(weighted, axis=0) / np.sqrt(max(self.number_of_simulations - 1, 1))
+        return self.get_std() / np.sqrt(max(self.number_of_simulations - 1, 1))
+
     def get_median(self) -> np.ndarray:
         """
         Returns the median of the simulation data.
 
         Returns
         -------
-        pd.DataFrame
-            DataFrame containing the median.
+        np.array
+            Median at every time step.
         """
+        if self.statistics_mode == StatisticsMode.SKETCH:
+            return self.statistics.get_median()
+        if self.importance_sampling:
+            return weighted_percentiles(self.simulation_data, self.path_weights, [50])[0]
         return np.median(self.simulation_data, axis=0)
 
+    def get_std(self) -> np.ndarray:
+        """
+        Returns the standard deviation of wealth at every time step.
+        """
+        if self.statistics_mode == StatisticsMode.SKETCH:
+            return self.statistics.get_std()
+        if self.importance_sampling:
+            return np.sqrt(self.path_weights @ (self.simulation_data - self.get_mean()) ** 2)
+        return np.std(self.simulation_data, axis=0, dtype=np.float64)
+
+    def get_min(self) -> np.ndarray:
+        """
+        Returns the minimum wealth at every time step.
+        """
+        if self.statistics_mode == StatisticsMode.SKETCH:
+            return self.statistics.get_min()
+        return np.min(self.simulation_data, axis=0)
+
+    def get_max(self) -> np.ndarray:
+        """
+        Returns the maximum wealth at every time step.
+        """
+        if self.statistics_mode == StatisticsMode.SKETCH:
+            return self.statistics.get_max()
+        return np.max(self.simulation_data, axis=0)
+
+    def get_destitution_risk(self) -> np.ndarray:
+        """
+        Returns the fraction of paths with zero wealth at every time step.
+        """
+        if self.statistics_mode == StatisticsMode.SKETCH:
+            return self.statistics.get_destitution_risk()
+        if self.importance_sampling:
+            return self.path_weights @ (self.simulation_data == 0)
+        return (self.simulation_data == 0).sum(axis=0) / self.simulation_data.shape[0]
 
-class CholeskySimulationStrategy(AbstractSimulationStrategy):
+
+class HistoricalSimulationStrategy(AbstractSimulationStrategy):
+    """
+    Base class for strategies calibrated on the historical returns in the data directory.
+    """
 
     def __init__(
         self,
-        base_sim_data: pd.DataFrame,
+        timeline: PlanTimeline,
         number_of_simulations: int,
         inflation: float,
         initial_wealth: float,
-        expected_returns: pd.DataFrame = None,
+        expected_returns: Optional[np.ndarray] = None,
         step_type: SimulationStepType = SimulationStepType.MONTHLY,
+        market_data: Optional[HistoricalData] = None,
+        **options,
     ):
-        super().__init__(base_sim_data, number_of_simulations, inflation, initial_wealth, step_type)
-        self._expected_returns = expected_returns
-
-    @cached_property
-    def covariance_matrix(self) -> pd.DataFrame:
         """
-        Calculate the covariance matrix from the base simulation data.
+        Parameters
+        ----------
+        expected_returns : np.ndarray, optional
+            Expected return of every asset, in the order of `assets`. Defaults to the historical mean returns.
+        market_data : HistoricalData, optional
+            Version of the historical data to calibrate on, by default the current one. The strategy keeps it
+            for its whole life, even if a newer version is loaded in the meantime.
         """
-        cov = get_historical_cov(step_type=self.step_type)
-        return cov
+        super().__init__(timeline, number_of_simulations, inflation, initial_wealth, step_type, **options)
+        self._expected_returns = expected_returns
+        self.market_data = market_data if market_data is not None else get_historical_data()
+
+    @property
+    def data_version(self) -> str:
+        return self.market_data.version
 
     @cached_property
     def assets(self) -> list[str]:
-        return load_historical_returns_header().str.lower().to_list()
+        return [asset.lower() for asset in self.market_data.assets]
 
     @property
-    def expected_returns(self) -> pd.DataFrame:
+    def expected_returns(self) -> np.ndarray:
         """
-        Calculate the expected returns from the base simulation data. Use historical data if not provided.
+        Expected return of every asset, in the order of `assets`. Use historical data if not provided.
         """
         if self._expected_returns is not None:
             return self._expected_returns
-        exp_ret = get_historical_exp_ret(step_type=self.step_type)
-        return exp_ret
+        return self.market_data.mean(self.step_type)
 
     @expected_returns.setter
-    def expected_returns(self, value: pd.DataFrame):
+    def expected_returns(self, value: np.ndarray):
         """
-        Set the expected returns for the simulation.
+        Set the expected return of every asset, in the order of `assets`.
         """
-        self._expected_returns = value.T[self.assets].T
+        value = np.asarray(value, dtype=np.float64).reshape(-1)
+        if len(value) != len(self.assets):
+            raise ValueError(f"Expected {len(self.assets)} expected returns, got {len(value)}.")
+        self._expected_returns = value
+
+
+class CholeskySimulationStrategy(HistoricalSimulationStrategy):
+
+    def __init__(
+        self,
+        timeline: PlanTimeline,
+        number_of_simulations: int,
+        inflation: float,
+        initial_wealth: float,
+        expected_returns: Optional[np.ndarray] = None,
+        step_type: SimulationStepType = SimulationStepType.MONTHLY,
+        quasi_monte_carlo: bool = False,
+        qmc_replicates: int = 8,
+        brownian_bridge: bool = True,
+        scenario_bank: Optional[ScenarioBank] = None,
+        **options,
+    ):
+        """
+        Parameters
+        ----------
+        quasi_monte_carlo : bool, optional
+            Draw the normals of every path from a scrambled Sobol sequence instead of pseudo-random numbers,
+            by default False. Paths are generated over all time steps at once.
+        qmc_replicates : int, optional
+            Number of independently scrambled replicates the paths are split into, by default 8.
+            The spread of the replicate means gives the standard error.
+        brownian_bridge : bool, optional
+            Give the first Sobol coordinates to the large-scale shape of the path with a Brownian bridge
+            over the time steps, by default True.
+        scenario_bank : ScenarioBank, optional
+            Read the normals of every path from a window of the memory-mapped scenario bank instead of drawing
+            them, by default None.
+        """
+        super().__init__(
+            timeline, number_of_simulations, inflation, initial_wealth, expected_returns, step_type, **options
+        )
+        self.quasi_monte_carlo = quasi_monte_carlo
+        self.qmc_replicates = qmc_replicates
+        self.brownian_bridge = brownian_bridge
+        self.scenario_bank = scenario_bank
+        if scenario_bank is not None:
+            if quasi_monte_carlo:
+                raise ValueError("Quasi-Monte Carlo cannot read its normals from the scenario bank.")
+            if scenario_bank.steps < self.number_of_steps:
+                raise ValueError(
+                    f"The scenario bank covers {scenario_bank.steps} time steps, {self.number_of_steps} are simulated."
+                )
+            if scenario_bank.assets < len(self.assets):
+                raise ValueError(f"The scenario bank covers {scenario_bank.assets} assets, {len(self.assets)} are simulated.")
+            if scenario_bank.paths < self.number_of_simulations:
+                raise ValueError(
+                    f"The scenario bank holds {scenario_bank.paths} paths, {self.number_of_simulations} are simulated."
+                )
+        if quasi_monte_carlo:
+            if self.uses_mean_estimator or self.importance_sampling:
+                raise ValueError("Quasi-Monte Carlo cannot be combined with other variance reduction techniques.")
+            if qmc_replicates < 2:
+                raise ValueError("Quasi-Monte Carlo needs at least 2 replicates to estimate its error.")
+            if self.step_chunk_size is not None and self.step_chunk_size < self.number_of_steps:
+                raise ValueError("Quasi-Monte Carlo paths are generated over all time steps at once.")
 
     @property
-    def simulated_returns(self) -> np.ndarray:
+    def shards(self) -> list[tuple[int, int]]:
+        """
+        With quasi-Monte Carlo every shard is one randomized replicate, scrambled from the shard's seed.
+        """
+        if self.quasi_monte_carlo:
+            return split_shards(self.number_of_simulations, -(-self.number_of_simulations // self.qmc_replicates))
+        return super().shards
+
+    @cached_property
+    def bank_offset(self) -> int:
+        """
+        Returns the bank path read by the first simulated path, drawn once per simulation from its own child of the
+        root seed. Path i reads bank path `bank_offset + i` (see `BankSampler`), so the paths of a simulation never
+        share a bank path and do not depend on the chunk, shard or worker counts.
+        """
+        root = self.seed_sequence
+        rng = np.random.default_rng(
+            np.random.SeedSequence(root.entropy, spawn_key=(*root.spawn_key, BANK_OFFSET_SEED_KEY))
+        )
+        return int(rng.integers(0, self.scenario_bank.paths))
+
+    def returns_source(self, rng: np.random.Generator, first_path: int = 0) -> tuple[ReturnsFunction, np.ndarray]:
+        if self.scenario_bank is None and not self.quasi_monte_carlo:
+            return super().returns_source(rng, first_path)
+        weights = np.ones((self.number_of_steps, 1)) if self.uses_portfolio_returns else self.weights
+        if self.scenario_bank is not None:
+            moments = self.portfolio_return_moments() if self.uses_portfolio_returns else None
+            sampler = self.scenario_bank.sampler(self.bank_offset + first_path, self.antithetic)
+            return partial(self.generate_bank_returns, sampler, moments), weights
+        engine = sobol_engine(self.number_of_steps * weights.shape[1], rng)
+        return partial(self.generate_qmc_returns, engine), weights
+
+    def generate_qmc_returns(
+        self, engine, n: int, start: int, stop: int, out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Map the next n points of the replicate's Sobol sequence to returns, through the inverse normal CDF,
+        the Brownian bridge and the Cholesky factor (or the portfolio return moments on the fast path).
+        """
+        if start != 0 or stop != self.number_of_steps:
+            raise ValueError("Quasi-Monte Carlo paths are generated over all time steps at once.")
+        k = 1 if self.uses_portfolio_returns else len(self.assets)
+        if out is None:
+            out = np.empty((n, stop - start, k), dtype=self.dtype)
+        sobol_normals(engine, out, self.brownian_bridge)
+        if self.uses_portfolio_returns:
+            means, stds = self.portfolio_return_moments()
+            return scale_portfolio_normals(out, means, stds)
+        mean = np.asarray(self.expected_returns, dtype=np.float64).reshape(-1)
+        apply_cholesky_factor(out.reshape(-1, k), self.cholesky_factor, mean)
+        return out
+
+    def generate_bank_returns(
+        self,
+        sampler: BankSampler,
+        moments: Optional[tuple[np.ndarray, np.ndarray]],
+        n: int,
+        start: int,
+        stop: int,
+        out: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Map the scenario bank normals of the time steps [start, stop) to returns, through the Cholesky factor,
+        or through the portfolio return `moments` on the fast path (reading the bank's first asset).
+        """
+        k = 1 if moments is not None else len(self.assets)
+        if out is None:
+            out = np.empty((n, stop - start, k), dtype=self.dtype)
+        sampler(out, start, stop)
+        if moments is not None:
+            means, stds = moments
+            return scale_portfolio_normals(out, means[start:stop], stds[start:stop])
+        mean = np.asarray(self.expected_returns, dtype=np.float64).reshape(-1)
+        apply_cholesky_factor(out.reshape(-1, k), self.cholesky_factor, mean)
+        return out
+
+    def run_adaptive(self, target: PrecisionTarget, target_standard_error: float) -> float:
+        if self.quasi_monte_carlo:
+            raise ValueError("Quasi-Monte Carlo replicates cannot be run adaptively.")
+        return super().run_adaptive(target, target_standard_error)
+
+    def run_from_checkpoint(
+        self, checkpoint: Optional[SimulationCheckpoint], block_steps: int = DEFAULT_CHECKPOINT_BLOCK_STEPS
+    ) -> SimulationCheckpoint:
+        if self.quasi_monte_carlo:
+            raise ValueError("Quasi-Monte Carlo paths cannot be resumed from a checkpoint.")
+        drawn_steps = -(-self.number_of_steps // block_steps) * block_steps
+        if self.scenario_bank is not None and self.scenario_bank.steps < drawn_steps:
+            raise ValueError(f"Incremental runs draw {drawn_steps} time steps, the scenario bank covers {self.scenario_bank.steps}.")
+        return super().run_from_checkpoint(checkpoint, block_steps)
+
+    def get_standard_error(self) -> np.ndarray:
+        """
+        With quasi-Monte Carlo the paths are not independent, so the standard error comes from the spread
+        of the means of the independently scrambled replicates.
+        """
+        if not self.quasi_monte_carlo:
+            return super().get_standard_error()
+        shard_means = self.get_shard_means()
+        return shard_means.std(axis=0, ddof=1) / np.sqrt(len(shard_means))
+
+    @property
+    def is_gaussian(self) -> bool:
+        return True
+
+    def portfolio_return_moments(self) -> tuple[np.ndarray, np.ndarray]:
+        weights = self.weights
+        means = weights @ np.asarray(self.expected_returns, dtype=np.float64).reshape(-1)
+        variances = np.einsum("ij,jk,ik->i", weights, self.covariance_matrix, weights)
+        return means, np.sqrt(np.maximum(variances, 0))
+
+    def importance_return_shift(self, tilt: np.ndarray) -> np.ndarray:
+        """
+        Shifting the normals by -tilt along -L'w / |L'w| moves the asset returns by -tilt * Sigma w / sigma_p,
+        and the portfolio-level normal of the fast path by -tilt * sigma_p.
+        """
+        means, stds = self.portfolio_return_moments()
+        if self.uses_portfolio_returns:
+            return -(tilt * stds)[:, None]
+        covariance_weights = self.weights @ self.covariance_matrix
+        direction = np.divide(covariance_weights, stds[:, None], out=np.zeros_like(covariance_weights), where=stds[:, None] > 0)
+        return -tilt[:, None] * direction
+
+    @cached_property
+    def covariance_matrix(self) -> np.ndarray:
+        """
+        Historical covariance matrix of the asset returns, in the order of `assets`.
+        """
+        return self.market_data.cov(self.step_type)
+
+    @cached_property
+    def cholesky_factor(self) -> np.ndarray:
+        """
+        Lower triangular Cholesky factor of the covariance matrix, cached per step type and data version.
+        """
+        return self.market_data.cholesky(self.step_type)
+
+    def generate_returns(
+        self, rng: np.random.Generator, n: int, start: int, stop: int, out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
         """
         Simulate returns using the Cholesky decomposition of the covariance matrix.
         """
-        cov = self.covariance_matrix
-        exp_ret = self.expected_returns
-        n = self.number_of_simulations
-        s = self.base_sim_data.shape[0] - 1  # number of time steps
-        return cholesky_bootstrap_returns(n, s, cov, exp_ret)
+        return cholesky_bootstrap_returns(
+            n,
+            stop - start,
+            self.covariance_matrix,
+            self.expected_returns,
+            rng,
+            self.cholesky_factor,
+            out,
+            self.dtype,
+            self.antithetic,
+        )
+
+
+class BlockBootstrapSimulationStrategy(HistoricalSimulationStrategy):
+    """
+    Resample blocks of consecutive historical returns (circular block bootstrap).
+    Every path is built with a single gather from the contiguous history, so there is no covariance
+    factorisation and no normal draw, and the fat tails and serial dependence of history are preserved.
+    """
+
+    def __init__(
+        self,
+        timeline: PlanTimeline,
+        number_of_simulations: int,
+        inflation: float,
+        initial_wealth: float,
+        expected_returns: Optional[np.ndarray] = None,
+        step_type: SimulationStepType = SimulationStepType.MONTHLY,
+        block_size: Optional[int] = None,
+        stationary_blocks: bool = False,
+        **options,
+    ):
+        """
+        Parameters
+        ----------
+        block_size : int, optional
+            (Mean) number of consecutive historical steps per block. Defaults to DEFAULT_BLOCK_SIZES[step_type].
+        stationary_blocks : bool, optional
+            Draw geometric random block lengths with mean `block_size` (stationary bootstrap)
+            instead of fixed-length blocks, by default False.
+        """
+        super().__init__(
+            timeline, number_of_simulations, inflation, initial_wealth, expected_returns, step_type, **options
+        )
+        self.block_size = block_size or DEFAULT_BLOCK_SIZES[SimulationStepType(step_type)]
+        self.stationary_blocks = stationary_blocks
+        self._resampled_history = None
+
+    @cached_property
+    def historical_returns(self) -> np.ndarray:
+        """
+        Historical returns as a contiguous num_periods x num_assets array, in asset order.
+        """
+        returns = self.market_data.returns(self.step_type)
+        columns = [[asset.lower() for asset in self.market_data.assets].index(asset) for asset in self.assets]
+        return np.ascontiguousarray(returns[:, columns], dtype=np.float64)
+
+    @HistoricalSimulationStrategy.expected_returns.setter
+    def expected_returns(self, value: np.ndarray):
+        """
+        Set the expected returns for the simulation. History is shifted so that its mean matches them.
+        """
+        HistoricalSimulationStrategy.expected_returns.fset(self, value)
+        self._resampled_history = None
+
+    @property
+    def resampled_history(self) -> np.ndarray:
+        """
+        Historical returns shifted to the expected returns, in the simulation's floating point type.
+        """
+        if self._resampled_history is None:
+            history = self.historical_returns
+            shift = np.asarray(self.expected_returns, dtype=np.float64).reshape(-1) - history.mean(axis=0)
+            self._resampled_history = np.ascontiguousarray(history + shift, dtype=self.dtype)
+        return self._resampled_history
+
+    def sample_indices(self, rng: np.random.Generator, n: int, steps: int) -> np.ndarray:
+        """
+        Sample the historical period used for every path and step.
+
+        Returns
+        -------
+        np.ndarray
+            n x steps matrix of indices into the historical returns.
+        """
+        num_periods = len(self.historical_returns)
+        if self.stationary_blocks:
+            positions = np.arange(steps)
+            new_block = rng.random((n, steps)) < 1 / self.block_size
+            new_block[:, 0] = True
+            block_starts = rng.integers(0, num_periods, size=(n, steps))
+            block_origin = np.maximum.accumulate(np.where(new_block, positions, 0), axis=1)
+            indices = np.take_along_axis(block_starts, block_origin, axis=1) + (positions - block_origin)
+        else:
+            num_blocks = -(-steps // self.block_size)
+            block_starts = rng.integers(0, num_periods, size=(n, num_blocks))
+            indices = (block_starts[:, :, None] + np.arange(self.block_size)).reshape(n, -1)[:, :steps]
+        return indices % num_periods
+
+    def generate_returns(
+        self, rng: np.random.Generator, n: int, start: int, stop: int, out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Resample historical returns in blocks. Blocks restart at the start of every generated step block.
+        """
+        indices = self.sample_indices(rng, n, stop - start)
+        return np.take(self.resampled_history, indices, axis=0, out=out)
+
+
+def final_metric(target: PrecisionTarget, final_wealth: np.ndarray, weights: Optional[np.ndarray] = None) -> float:
+    """
+    Returns the target metric of a set of final wealth values, weighted with importance weights if given.
+    """
+    match target:
+        case PrecisionTarget.FINAL_MEDIAN:
+            if weights is None:
+                return float(np.median(final_wealth))
+            return float(weighted_percentiles(final_wealth[:, None], weights, [50])[0, 0])
+        case PrecisionTarget.FINAL_MEAN:
+            if weights is None:
+                return float(np.mean(final_wealth, dtype=np.float64))
+            return float(weights @ final_wealth)
+        case PrecisionTarget.SUCCESS_PROBABILITY:
+            if weights is None:
+                return float(np.mean(final_wealth > 0))
+            return float(1 - weights @ (final_wealth == 0))  # the destitute tail carries the small weights
+    raise ValueError(f"Unsupported precision target: {target}")
+
+
+def _simulate_shard_in_shared_memory(
+    strategy: AbstractSimulationStrategy,
+    handles: dict[str, tuple[str, tuple[int, ...], np.dtype]],
+    start: int,
+    stop: int,
+    seed: np.random.SeedSequence,
+    first_path: int,
+) -> None:
+    """
+    Worker process entry point: simulate one shard straight into the parent's shared outputs
+    (wealth matrix, and control matrix and log weights if requested), given as key -> (name, shape, dtype).
+    """
+    with ExitStack() as stack:
+        outputs = {
+            key: stack.enter_context(SharedWealthMatrix(shape, dtype, name=name)).array[start:stop]
+            for key, (name, shape, dtype) in handles.items()
+        }
+        strategy.simulate_paths(seed, *(outputs.get(key) for key in PATH_OUTPUTS), first_path)
+        outputs.clear()  # release the views before the shared blocks are closed
 
 
 class SimulationStrategyFactory:
 
     def __init__(
         self,
-        base_sim_data: pd.DataFrame,
+        timeline: PlanTimeline,
         number_of_simulations: int,
         inflation: float,
         initial_wealth: float,
         step_type: SimulationStepType = SimulationStepType.MONTHLY,
+        block_size: Optional[int] = None,
+        stationary_blocks: bool = False,
+        quasi_monte_carlo: bool = False,
+        qmc_replicates: int = 8,
+        brownian_bridge: bool = True,
+        scenario_bank: Optional[ScenarioBank] = None,
+        **strategy_options,
     ):
-        self.base_sim_data = base_sim_data
+        self.timeline = timeline
         self.number_of_simulations = number_of_simulations
         self.inflation = inflation
         self.initial_wealth = initial_wealth
         self.step_type = step_type
+        self.block_size = block_size
+        self.stationary_blocks = stationary_blocks
+        self.quasi_monte_carlo = quasi_monte_carlo
+        self.qmc_replicates = qmc_replicates
+        self.brownian_bridge = brownian_bridge
+        self.scenario_bank = scenario_bank
+        self.strategy_options = strategy_options
 
     def build_strategy(self, simulation_type: SimulationType) -> AbstractSimulationStrategy:
         if simulation_type == SimulationType.CHOLESKY:
             return CholeskySimulationStrategy(
-                self.base_sim_data,
+                self.timeline,
+                self.number_of_simulations,
+                self.inflation,
+                self.initial_wealth,
+                step_type=self.step_type,
+                quasi_monte_carlo=self.quasi_monte_carlo,
+                qmc_replicates=self.qmc_replicates,
+                brownian_bridge=self.brownian_bridge,
+                scenario_bank=self.scenario_bank,
+                **self.strategy_options,
+            )
+        if simulation_type == SimulationType.BLOCK_BOOTSTRAP:
+            if self.quasi_monte_carlo:
+                raise ValueError("Quasi-Monte Carlo is only available for the Cholesky simulation type.")
+            if self.scenario_bank is not None:
+                raise ValueError("The scenario bank is only available for the Cholesky simulation type.")
+            return BlockBootstrapSimulationStrategy(
+                self.timeline,
                 self.number_of_simulations,
                 self.inflation,
                 self.initial_wealth,
                 step_type=self.step_type,
+                block_size=self.block_size,
+                stationary_blocks=self.stationary_blocks,
+                **self.strategy_options,
             )
         raise ValueError(f"Unsupported simulation type: {simulation_type}")
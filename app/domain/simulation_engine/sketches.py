@@ -0,0 +1,354 @@
+from typing import Optional
+import numpy as np
+
+
+class QuantileSketch:
+    """
+    Mergeable KLL-style quantile sketch, kept for many columns (time steps) at once.
+
+    Every column receives the same number of values, so all columns share one compaction schedule and each
+    level is stored as a single m x num_columns array whose items carry a weight of 2 ** level.
+    """
+
+    def __init__(self, num_columns: int, rank_error: float = 0.001, rng: Optional[np.random.Generator] = None):
+        """
+        Parameters
+        ----------
+        num_columns : int
+            Number of independent columns summarised by the sketch.
+        rank_error : float, optional
+            Target normalised rank error of the quantiles, by default 0.001.
+            The per-level capacity is 2 / rank_error items.
+        rng : np.random.Generator, optional
+            Generator used to pick the compaction offsets. If None, a fresh unseeded generator is used.
+        """
+        assert 0 < rank_error < 1, "Rank error must be between 0 and 1"
+        self.num_columns = num_columns
+        self.rank_error = rank_error
+        self.capacity = max(8, 2 * int(np.ceil(1 / rank_error)))
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.levels: list[np.ndarray] = []
+        self.count = 0
+
+    def update(self, values: np.ndarray) -> None:
+        """
+        Add a block of values to the sketch.
+
+        Parameters
+        ----------
+        values : np.ndarray
+            m x num_columns array of values.
+        """
+        assert values.ndim == 2 and values.shape[1] == self.num_columns, "Values must be m x num_columns"
+        self._add_to_level(0, np.asarray(values, dtype=np.float64))
+        self.count += values.shape[0]
+        self._compress()
+
+    def merge(self, other: "QuantileSketch") -> None:
+        """
+        Merge another sketch over the same columns into this one.
+        """
+        assert other.num_columns == self.num_columns, "Sketches must have the same number of columns"
+        for level, items in enumerate(other.levels):
+            self._add_to_level(level, items)
+        self.count += other.count
+        self._compress()
+
+    def quantiles(self, q: np.ndarray) -> np.ndarray:
+        """
+        Approximate quantiles of every column.
+
+        Parameters
+        ----------
+        q : np.ndarray
+            Quantiles to compute, in [0, 1].
+
+        Returns
+        -------
+        np.ndarray
+            len(q) x num_columns array of quantiles.
+        """
+        q = np.atleast_1d(np.asarray(q, dtype=np.float64))
+        items = np.concatenate(self.levels, axis=0)
+        item_weights = np.concatenate([np.full(len(level_items), 2.0**level) for level, level_items in enumerate(self.levels)])
+
+        order = np.argsort(items, axis=0)
+        sorted_items = np.take_along_axis(items, order, axis=0)
+        cumulative_weights = np.cumsum(item_weights[order], axis=0)
+
+        total = cumulative_weights[-1]
+        positions = (cumulative_weights[None, :, :] < q[:, None, None] * total).sum(axis=1)
+        positions = np.minimum(positions, len(items) - 1)
+        return np.take_along_axis(sorted_items, positions, axis=0)
+
+    def _add_to_level(self, level: int, items: np.ndarray) -> None:
+        while len(self.levels) <= level:
+            self.levels.append(np.empty((0, self.num_columns)))
+        self.levels[level] = np.concatenate([self.levels[level], items], axis=0)
+
+    def _compress(self) -> None:
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self.capacity:
+                items = np.sort(items, axis=0)
+                paired = len(items) - len(items) % 2
+                offset = self.rng.integers(2)
+                self._add_to_level(level + 1, items[offset:paired:2])
+                self.levels[level] = items[paired:]
+            level += 1
+
+
+class RunningMoments:
+    """
+    Mergeable running count, mean, variance, min, max and zero count for many columns at once.
+    Means and squared deviations are always accumulated in float64.
+    """
+
+    def __init__(self, num_columns: int):
+        self.num_columns = num_columns
+        self.count = 0
+        self.mean = np.zeros(num_columns)
+        self.m2 = np.zeros(num_columns)
+        self.min = np.full(num_columns, np.inf)
+        self.max = np.full(num_columns, -np.inf)
+        self.zero_count = np.zeros(num_columns, dtype=np.int64)
+
+    def update(self, values: np.ndarray) -> None:
+        """
+        Add a block of values.
+
+        Parameters
+        ----------
+        values : np.ndarray
+            m x num_columns array of values.
+        """
+        other = RunningMoments(self.num_columns)
+        other.count = values.shape[0]
+        if other.count == 0:
+            return
+        other.mean = values.mean(axis=0, dtype=np.float64)
+        other.m2 = ((values - other.mean) ** 2).sum(axis=0, dtype=np.float64)
+        other.min = values.min(axis=0)
+        other.max = values.max(axis=0)
+        other.zero_count = (values == 0).sum(axis=0)
+        self.merge(other)
+
+    def merge(self, other: "RunningMoments") -> None:
+        """
+        Merge another set of moments over the same columns (Chan et al. parallel update).
+        """
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * (other.count / count)
+        self.m2 = self.m2 + other.m2 + delta**2 * (self.count * other.count / count)
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        self.zero_count = self.zero_count + other.zero_count
+        self.count = count
+
+    @property
+    def std(self) -> np.ndarray:
+        """
+        Population standard deviation of each column.
+        """
+        return np.sqrt(self.m2 / self.count)
+
+
+class MeanEstimator:
+    """
+    Mergeable per time step estimate of mean wealth and of its standard error, for many columns at once.
+
+    With antithetic draws the independent sampling units are the means of antithetic pairs rather than single
+    paths. With a control variate (the same paths without the zero floor, whose expectation is known in closed
+    form) the mean is corrected by beta * (control mean - expected control), with beta estimated per column.
+    """
+
+    def __init__(self, num_columns: int, antithetic: bool = False, control: bool = False):
+        """
+        Parameters
+        ----------
+        num_columns : int
+            Number of columns (time steps).
+        antithetic : bool, optional
+            Whether chunks hold antithetic pairs laid out as by `calcs.draw_standard_normals`, by default False.
+        control : bool, optional
+            Whether a control variate is passed along with the wealth, by default False.
+        """
+        self.num_columns = num_columns
+        self.antithetic = antithetic
+        self.control = control
+        self.paths = RunningMoments(num_columns)
+        self.units = RunningMoments(num_columns)
+        self.control_units = RunningMoments(num_columns)
+        self.comoment = np.zeros(num_columns)
+
+    def sampling_units(self, values: np.ndarray) -> np.ndarray:
+        """
+        Independent sampling units of a chunk: antithetic pair means, or the paths themselves.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if not self.antithetic:
+            return values
+        m = values.shape[0]
+        half = -(-m // 2)
+        pairs = (values[: m - half] + values[half:]) / 2
+        return np.concatenate([pairs, values[m - half : half]], axis=0)
+
+    def update(self, wealth: np.ndarray, control: Optional[np.ndarray] = None) -> None:
+        """
+        Add a chunk of paths.
+
+        Parameters
+        ----------
+        wealth : np.ndarray
+            m x num_columns matrix of wealth, one chunk as generated.
+        control : np.ndarray, optional
+            m x num_columns matrix of the control paths. Required if the estimator uses a control variate.
+        """
+        assert (control is not None) == self.control, "A control is required exactly when the estimator uses one"
+        other = MeanEstimator(self.num_columns, self.antithetic, self.control)
+        other.paths.update(wealth)
+        units = self.sampling_units(wealth)
+        other.units.update(units)
+        if self.control:
+            control_units = self.sampling_units(control)
+            other.control_units.update(control_units)
+            other.comoment = ((units - other.units.mean) * (control_units - other.control_units.mean)).sum(axis=0)
+        self.merge(other)
+
+    def merge(self, other: "MeanEstimator") -> None:
+        """
+        Merge the estimator of another shard into this one.
+        """
+        if other.units.count == 0:
+            return
+        weight = self.units.count * other.units.count / (self.units.count + other.units.count)
+        delta = other.units.mean - self.units.mean
+        control_delta = other.control_units.mean - self.control_units.mean
+        self.comoment = self.comoment + other.comoment + delta * control_delta * weight
+        self.paths.merge(other.paths)
+        self.units.merge(other.units)
+        self.control_units.merge(other.control_units)
+
+    @property
+    def beta(self) -> np.ndarray:
+        """
+        Control variate coefficient of every column, 0 where the control does not vary.
+        """
+        variance = self.control_units.m2
+        return np.divide(self.comoment, variance, out=np.zeros(self.num_columns), where=variance > 0)
+
+    def mean(self, expected_control: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Estimated mean of every column.
+
+        Parameters
+        ----------
+        expected_control : np.ndarray, optional
+            Known expectation of the control in every column. Required if the estimator uses a control variate.
+        """
+        if not self.control:
+            return self.paths.mean
+        return self.units.mean - self.beta * (self.control_units.mean - expected_control)
+
+    def standard_error(self) -> np.ndarray:
+        """
+        Estimated standard error of `mean` in every column.
+        """
+        count = self.units.count
+        residual = self.units.m2 - self.beta * self.comoment
+        degrees_of_freedom = max(count - 1 - int(self.control), 1)
+        return np.sqrt(np.maximum(residual, 0) / degrees_of_freedom / count)
+
+    def plain_standard_error(self) -> np.ndarray:
+        """
+        Standard error the plain Monte Carlo mean would have with the same number of independent paths.
+        """
+        count = self.paths.count
+        return np.sqrt(self.paths.m2 / max(count - 1, 1) / count)
+
+    def variance_reduction(self) -> np.ndarray:
+        """
+        Estimated variance reduction factor of every column: how many times more independent paths the plain
+        Monte Carlo mean would need for the same standard error. NaN where wealth does not vary.
+        """
+        variance = self.standard_error() ** 2
+        plain_variance = self.plain_standard_error() ** 2
+        return np.divide(plain_variance, variance, out=np.full(self.num_columns, np.nan), where=variance > 0)
+
+
+class WealthStatistics:
+    """
+    Per time step summary of simulated wealth paths, updated chunk by chunk and mergeable across shards.
+    """
+
+    def __init__(
+        self,
+        num_columns: int,
+        rank_error: float = 0.001,
+        rng: Optional[np.random.Generator] = None,
+        mean_estimator: Optional[MeanEstimator] = None,
+    ):
+        self.sketch = QuantileSketch(num_columns, rank_error, rng)
+        self.moments = RunningMoments(num_columns)
+        self.mean_estimator = mean_estimator
+
+    @property
+    def count(self) -> int:
+        return self.moments.count
+
+    def update(self, wealth: np.ndarray, control: Optional[np.ndarray] = None) -> None:
+        """
+        Add a chunk of wealth paths.
+
+        Parameters
+        ----------
+        wealth : np.ndarray
+            m x num_columns matrix of wealth.
+        control : np.ndarray, optional
+            m x num_columns matrix of control paths, passed on to the mean estimator.
+        """
+        self.sketch.update(wealth)
+        self.moments.update(wealth)
+        if self.mean_estimator is not None:
+            self.mean_estimator.update(wealth, control)
+
+    def merge(self, other: "WealthStatistics") -> None:
+        """
+        Merge statistics of another shard into this one.
+        """
+        self.sketch.merge(other.sketch)
+        self.moments.merge(other.moments)
+        if self.mean_estimator is not None:
+            self.mean_estimator.merge(other.mean_estimator)
+
+    def get_percentiles(self, percentiles: list[float]) -> np.ndarray:
+        """
+        Approximate percentiles (0-100) of every time step, exact at 0 and 100.
+        """
+        q = np.asarray(percentiles, dtype=np.float64) / 100
+        values = self.sketch.quantiles(q)
+        values[q <= 0] = self.moments.min
+        values[q >= 1] = self.moments.max
+        return np.clip(values, self.moments.min, self.moments.max)
+
+    def get_mean(self) -> np.ndarray:
+        return self.moments.mean
+
+    def get_median(self) -> np.ndarray:
+        return self.get_percentiles([50])[0]
+
+    def get_std(self) -> np.ndarray:
+        return self.moments.std
+
+    def get_min(self) -> np.ndarray:
+        return self.moments.min
+
+    def get_max(self) -> np.ndarray:
+        return self.moments.max
+
+    def get_destitution_risk(self) -> np.ndarray:
+        return self.moments.zero_count / self.moments.count
@@ -0,0 +1,139 @@
+import numpy as np
+from .calcs import convert_to_real_wealth
+
+# bytes of wealth summarised at once: a block of columns is copied, reduced and partitioned while it is in cache
+SUMMARY_BLOCK_BYTES = 2**23
+
+
+class WealthSummary:
+    """
+    Per time step summary statistics of simulated wealth: the requested percentiles, median, mean,
+    standard deviation, min, max and the fraction of destitute paths.
+    """
+
+    def __init__(
+        self,
+        percentiles: list[float],
+        percentile_values: np.ndarray,
+        median: np.ndarray,
+        mean: np.ndarray,
+        std: np.ndarray,
+        min: np.ndarray,
+        max: np.ndarray,
+        destitution_risk: np.ndarray,
+    ):
+        self.percentiles = percentiles
+        self.percentile_values = percentile_values
+        self.median = median
+        self.mean = mean
+        self.std = std
+        self.min = min
+        self.max = max
+        self.destitution_risk = destitution_risk
+
+    def to_real(self, time_steps: np.ndarray, inflation: float) -> "WealthSummary":
+        """
+        Returns the summary in real terms. Every statistic except the destitution risk scales with the
+        deflator of its time step, so the nominal statistics are rescaled in one pass instead of recomputed.
+        """
+        nominal = np.vstack([self.percentile_values, self.median, self.mean, self.std, self.min, self.max])
+        real = convert_to_real_wealth(nominal, time_steps, inflation)
+        m = len(self.percentiles)
+        median, mean, std, min_, max_ = real[m:]
+        return WealthSummary(self.percentiles, real[:m], median, mean, std, min_, max_, self.destitution_risk)
+
+    def take(self, columns: slice) -> "WealthSummary":
+        """
+        Returns the summary of a range of time step columns.
+        """
+        return WealthSummary(
+            self.percentiles,
+            self.percentile_values[:, columns],
+            self.median[columns],
+            self.mean[columns],
+            self.std[columns],
+            self.min[columns],
+            self.max[columns],
+            self.destitution_risk[columns],
+        )
+
+    @staticmethod
+    def concatenate(summaries: list["WealthSummary"]) -> "WealthSummary":
+        """
+        Join the summaries of consecutive ranges of time step columns, computed for the same percentiles.
+        """
+        return WealthSummary(
+            summaries[0].percentiles,
+            np.hstack([summary.percentile_values for summary in summaries]),
+            *(
+                np.concatenate([getattr(summary, name) for summary in summaries])
+                for name in ("median", "mean", "std", "min", "max", "destitution_risk")
+            ),
+        )
+
+
+def summarize_wealth(
+    wealth: np.ndarray, percentiles: list[float], block_bytes: int = SUMMARY_BLOCK_BYTES
+) -> WealthSummary:
+    """
+    Summarise a wealth matrix in a single pass over blocks of time step columns.
+    Each block is copied once into a contiguous buffer, reduced for the mean, standard deviation and zero count,
+    and then partitioned once around every order statistic needed for the percentiles, the median, the min and
+    the max. Percentiles use linear interpolation and the median the mean of the middle values, as np.percentile
+    and np.median do.
+    Parameters
+    ----------
+    wealth : np.array
+        n x s+1 matrix of wealth.
+    percentiles : list[float]
+        Percentiles to compute, in [0, 100].
+    block_bytes : int, optional
+        Approximate size of the column blocks, by default SUMMARY_BLOCK_BYTES.
+    Returns
+    -------
+    WealthSummary
+        The summary statistics.
+    """
+    n, num_columns = wealth.shape
+    q = np.asarray(percentiles, dtype=np.float64) / 100
+    virtual_index = (n - 1) * q
+    lower = np.clip(np.floor(virtual_index).astype(np.intp), 0, n - 1)
+    upper = np.minimum(lower + 1, n - 1)
+    fraction = virtual_index - lower
+    middle = [(n - 1) // 2, n // 2]
+    kth = np.unique(np.concatenate([lower, upper, middle, [0, n - 1]]))
+
+    percentile_values = np.empty((len(q), num_columns))
+    median = np.empty(num_columns, dtype=wealth.dtype)
+    mean = np.empty(num_columns)
+    std = np.empty(num_columns)
+    min_ = np.empty(num_columns, dtype=wealth.dtype)
+    max_ = np.empty(num_columns, dtype=wealth.dtype)
+    zero_count = np.empty(num_columns, dtype=np.int64)
+
+    columns_per_block = max(1, block_bytes // max(1, n * wealth.dtype.itemsize))
+    for start in range(0, num_columns, columns_per_block):
+        stop = min(num_columns, start + columns_per_block)
+        block = np.ascontiguousarray(wealth[:, start:stop].T)  # columns x n, each column contiguous
+
+        mean[start:stop] = block.mean(axis=1, dtype=np.float64)
+        std[start:stop] = np.sqrt(np.mean((block - mean[start:stop, None]) ** 2, axis=1, dtype=np.float64))
+        zero_count[start:stop] = np.count_nonzero(block == 0, axis=1)
+
+        block.partition(kth, axis=1)
+        min_[start:stop] = block[:, 0]
+        max_[start:stop] = block[:, n - 1]
+        median[start:stop] = (block[:, middle[0]] + block[:, middle[1]]) / 2
+        below, above = block[:, lower].T, block[:, upper].T
+        percentile_values[:, start:stop] = _lerp(below, above, fraction[:, None])
+
+    return WealthSummary(percentiles, percentile_values, median, mean, std, min_, max_, zero_count / n)
+
+
+def _lerp(a: np.ndarray, b: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """
+    Linear interpolation between a and b, computed as np.percentile does (from the nearer end point).
+    """
+    difference = b - a
+    result = a + difference * t
+    return np.where(t >= 0.5, b - difference * (1 - t), result)
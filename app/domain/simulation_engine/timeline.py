@@ -0,0 +1,178 @@
+from typing import TYPE_CHECKING
+import numpy as np
+from .common.enums import InterpolationMethod
+
+if TYPE_CHECKING:  # the command models need pydantic, which a NumPy-only run does not import
+    from .common.types import CashFlow, SimulationPortfolioWeights
+
+# assets of the plan's weights, in the column order of `PlanTimeline.weights`
+TIMELINE_ASSETS = ("stocks", "bonds", "cash")
+
+
+def interpolate_points(
+    time_steps: np.ndarray, steps: np.ndarray, values: np.ndarray, method: InterpolationMethod
+) -> np.ndarray:
+    """
+    Interpolate points onto time steps.
+    Linear interpolation is linear in the time step and constant before the first and after the last point;
+    forward filling holds every point's value until the next one and is 0 before the first point.
+    Parameters
+    ----------
+    time_steps : np.array
+        Sorted time steps to interpolate onto.
+    steps : np.array
+        Sorted, unique steps of the points.
+    values : np.array
+        Values of the points.
+    method : InterpolationMethod
+        The interpolation method to use.
+    Returns
+    -------
+    np.array
+        The value at every time step, 0 everywhere if there are no points.
+    """
+    if len(steps) == 0:
+        return np.zeros(len(time_steps))
+    if method == InterpolationMethod.LINEAR:
+        return np.interp(time_steps, steps, values)
+    elif method == InterpolationMethod.FFILL:
+        previous = np.searchsorted(steps, time_steps, side="right") - 1
+        return np.where(previous >= 0, values[np.maximum(previous, 0)], 0.0)
+    else:
+        raise ValueError(f"Unknown interpolation method: {method}")
+
+
+def unique_points(steps: list[float], values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Sort points by step, keeping the last value given for a step.
+    """
+    steps = np.asarray(steps, dtype=np.float64)
+    order = np.argsort(steps, kind="stable")
+    steps, values = steps[order], values[order]
+    last = np.append(steps[1:] != steps[:-1], True)
+    return steps[last], values[last]
+
+
+def _frozen(array: np.ndarray) -> np.ndarray:
+    array = np.ascontiguousarray(array)
+    array.flags.writeable = False
+    return array
+
+
+class PlanTimeline:
+    """
+    Compiled, immutable time line of a plan: the time steps simulated and the weights, cash flow rates and
+    one-off transactions of every step, as contiguous read-only arrays. It is built and validated once per
+    command and shared by the strategy, the kernels and the statistics.
+
+    The time steps are the union of 0..end_step and the steps of every weight, savings rate and transaction
+    point. Step i of the simulation runs from time_steps[i] to time_steps[i + 1] and uses the weights, cash flow
+    rate and transactions of its end point; transactions at time 0 fall before the first step and are ignored.
+    """
+
+    def __init__(
+        self, time_steps: np.ndarray, weights: np.ndarray, cashflows: np.ndarray, transactions: np.ndarray
+    ):
+        """
+        Parameters
+        ----------
+        time_steps : np.ndarray
+            s+1 x 1 vector of sorted, unique time steps.
+        weights : np.ndarray
+            s x len(TIMELINE_ASSETS) matrix of the weights of every step.
+        cashflows : np.ndarray
+            s x 1 vector of the cash flow rate of every step.
+        transactions : np.ndarray
+            s x 1 vector of the one-off transactions of every step.
+        """
+        if len(time_steps) < 2 or np.any(np.diff(time_steps) <= 0):
+            raise ValueError("A plan needs at least one time step and sorted, unique time steps.")
+        s = len(time_steps) - 1
+        if weights.shape != (s, len(TIMELINE_ASSETS)) or cashflows.shape != (s,) or transactions.shape != (s,):
+            raise ValueError("Weights, cash flows and transactions need one entry per time step.")
+        self.time_steps = _frozen(np.asarray(time_steps, dtype=np.float64))
+        self.time_delta = _frozen(np.diff(self.time_steps))
+        self.weights = _frozen(np.asarray(weights, dtype=np.float64))
+        self.cashflows = _frozen(np.asarray(cashflows, dtype=np.float64))
+        self.transactions = _frozen(np.asarray(transactions, dtype=np.float64))
+
+    @classmethod
+    def compile(
+        cls,
+        end_step: int,
+        weights: list["SimulationPortfolioWeights"],
+        savings_rates: list["CashFlow"],
+        oneoff_transactions: list["CashFlow"],
+        weights_interpolation: InterpolationMethod = InterpolationMethod.LINEAR,
+        savings_rate_interpolation: InterpolationMethod = InterpolationMethod.LINEAR,
+    ) -> "PlanTimeline":
+        """
+        Compile the points of a plan into its time line.
+        Weights and savings rates given twice for the same step keep the last point; transactions at the same
+        step add up.
+        Parameters
+        ----------
+        end_step : int
+            Last regular time step.
+        weights : list[SimulationPortfolioWeights]
+            Weight points, in any order.
+        savings_rates : list[CashFlow]
+            Savings rate points, in any order.
+        oneoff_transactions : list[CashFlow]
+            One-off transactions, in any order.
+        weights_interpolation : InterpolationMethod, optional
+            Interpolation of the weights between points, by default linear.
+        savings_rate_interpolation : InterpolationMethod, optional
+            Interpolation of the savings rates between points, by default linear.
+        Returns
+        -------
+        PlanTimeline
+            The compiled time line.
+        """
+        if not weights:
+            raise ValueError("A plan needs at least one weights point.")
+        weight_steps, weight_values = unique_points(
+            [point.step for point in weights], np.array([[point.stocks, point.bonds] for point in weights])
+        )
+        rate_steps, rate_values = unique_points(
+            [point.step for point in savings_rates], np.array([point.value for point in savings_rates], dtype=np.float64)
+        )
+        transaction_steps = np.array([point.step for point in oneoff_transactions], dtype=np.float64)
+        time_steps = np.unique(
+            np.concatenate([np.arange(0, end_step + 1, dtype=np.float64), weight_steps, rate_steps, transaction_steps])
+        )
+        step_ends = time_steps[1:]
+
+        stocks = interpolate_points(step_ends, weight_steps, weight_values[:, 0], weights_interpolation)
+        bonds = interpolate_points(step_ends, weight_steps, weight_values[:, 1], weights_interpolation)
+        cashflows = interpolate_points(step_ends, rate_steps, rate_values, savings_rate_interpolation)
+        transactions = np.zeros(len(time_steps))
+        np.add.at(
+            transactions,
+            np.searchsorted(time_steps, transaction_steps),
+            np.array([point.value for point in oneoff_transactions], dtype=np.float64),
+        )
+        weights_matrix = np.column_stack([stocks, bonds, 1 - stocks - bonds])
+        return cls(time_steps, weights_matrix, cashflows, transactions[1:])
+
+    @property
+    def number_of_steps(self) -> int:
+        return len(self.time_delta)
+
+    def asset_weights(self, assets: list[str]) -> np.ndarray:
+        """
+        Returns the s x len(assets) matrix of weights, with columns in the order of `assets`.
+        """
+        return _frozen(self.weights[:, [TIMELINE_ASSETS.index(asset) for asset in assets]])
+
+    def interpolate_cashflows(
+        self, savings_rates: list["CashFlow"], method: InterpolationMethod = InterpolationMethod.LINEAR
+    ) -> np.ndarray:
+        """
+        Returns the s x 1 cash flow rates of other savings rate points on this time line. Points outside the
+        time line still shape the interpolation, but do not add time steps.
+        """
+        steps, values = unique_points(
+            [point.step for point in savings_rates], np.array([point.value for point in savings_rates], dtype=np.float64)
+        )
+        return interpolate_points(self.time_steps[1:], steps, values, method)
@@ -0,0 +1,120 @@
+import numpy as np
+from .calcs import nominal_cashflows
+from .common.enums import SweepParameter
+from .common.types import CashFlow
+
+
+class PlanVariants:
+    """
+    Builds the per step arrays of variants of a plan, for scoring many of them at once on shared draws
+    (see `AbstractSimulationStrategy.evaluate_plans`).
+
+    A variant sets some of the plan parameters:
+    - initial wealth replaces the plan's initial wealth;
+    - a retirement step moves the first negative savings rate point, and all points after it, onto that step;
+    - savings and spending levels replace the positive and negative cash flow rates of every step with a
+      constant rate (spending given as a positive amount);
+    - savings and spending scales multiply the positive and negative cash flow rates of every step;
+    - a stocks weight (or an s x 1 vector of per step stocks weights, i.e. a glide path) replaces the stocks
+      weight of every step, the rest being split between the other assets in the plan's proportions
+      (or held in bonds).
+    """
+
+    def __init__(self, plan: "RunSimulationCommand"):
+        """
+        Parameters
+        ----------
+        plan : RunSimulationCommand
+            The base plan.
+        """
+        simulation = plan.simulation_strategy
+        self.plan = plan
+        self.time_delta = np.diff(simulation.time_steps)
+        self.assets = simulation.assets
+        self.weights = simulation.weights
+        self.cashflows = simulation.cashflows
+        self.transactions = simulation.transactions
+        self._retirement_cashflows: dict[float, np.ndarray] = {}
+
+    def build(self, variants: list[dict[SweepParameter, float]]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Build the arrays of every variant.
+        Parameters
+        ----------
+        variants : list[dict[SweepParameter, float]]
+            Parameter values of every variant. Parameters not given keep the plan's value.
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray, np.ndarray]
+            P x s x num_assets weights, P x 1 initial wealth and P x s nominal cash flows of the variants.
+        """
+        weights, initial_wealth, flows = [], [], []
+        for parameters in variants:
+            variant_weights = self.weights
+            if SweepParameter.STOCKS_WEIGHT in parameters:
+                variant_weights = self.stocks_weights(self.weights, self.assets, parameters[SweepParameter.STOCKS_WEIGHT])
+            cashflows = self.cashflows
+            if SweepParameter.RETIREMENT_STEP in parameters:
+                cashflows = self.retirement_cashflows(parameters[SweepParameter.RETIREMENT_STEP])
+            if SweepParameter.SAVINGS_LEVEL in parameters:
+                cashflows = np.where(cashflows > 0, parameters[SweepParameter.SAVINGS_LEVEL], cashflows)
+            if SweepParameter.SPENDING_LEVEL in parameters:
+                cashflows = np.where(cashflows < 0, -parameters[SweepParameter.SPENDING_LEVEL], cashflows)
+            cashflows = np.where(
+                cashflows > 0,
+                cashflows * parameters.get(SweepParameter.SAVINGS_SCALE, 1.0),
+                cashflows * parameters.get(SweepParameter.SPENDING_SCALE, 1.0),
+            )
+            weights.append(variant_weights)
+            initial_wealth.append(parameters.get(SweepParameter.INITIAL_WEALTH, self.plan.initial_wealth))
+            flows.append(nominal_cashflows(cashflows, self.transactions, self.plan.inflation, self.time_delta))
+        return np.stack(weights), np.array(initial_wealth, dtype=np.float64), np.stack(flows)
+
+    def retirement_cashflows(self, retirement_step: float) -> np.ndarray:
+        """
+        Returns the s x 1 cash flow rates of the plan retiring at `retirement_step`, cached per step.
+        """
+        if retirement_step not in self._retirement_cashflows:
+            savings_rates = self.retirement_savings_rates(self.plan.savings_rates, retirement_step)
+            self._retirement_cashflows[retirement_step] = self.plan.interpolate_cashflows(savings_rates)
+        return self._retirement_cashflows[retirement_step]
+
+    @staticmethod
+    def retirement_savings_rates(savings_rates: list[CashFlow], retirement_step: float) -> list[CashFlow]:
+        """
+        Returns the savings rate points with retirement (the first negative savings rate) moved to
+        `retirement_step`. Working points at or after the new retirement step are dropped.
+        """
+        savings_rates = sorted(savings_rates, key=lambda cashflow: cashflow.step)
+        retirement = next((i for i, cashflow in enumerate(savings_rates) if cashflow.value < 0), None)
+        if retirement is None:
+            raise ValueError("Varying the retirement step needs a plan with a negative savings rate.")
+        offset = retirement_step - savings_rates[retirement].step
+        working = [cashflow for cashflow in savings_rates[:retirement] if cashflow.step < retirement_step]
+        retired = [CashFlow(step=cashflow.step + offset, value=cashflow.value) for cashflow in savings_rates[retirement:]]
+        return working + retired
+
+    @staticmethod
+    def stocks_weights(weights: np.ndarray, assets: list[str], stocks_weight: float | np.ndarray) -> np.ndarray:
+        """
+        Returns s x num_assets weights with the stocks weight of every step replaced by `stocks_weight`
+        (a scalar or an s x 1 vector) and the other assets scaled to fill the rest.
+        """
+        stocks_weight = np.broadcast_to(np.asarray(stocks_weight, dtype=np.float64), (weights.shape[0],))
+        stocks = assets.index("stocks")
+        others = np.delete(weights, stocks, axis=1)
+        others_total = others.sum(axis=1, keepdims=True)
+        fallback = np.zeros_like(others)
+        fallback[:, [asset for asset in assets if asset != "stocks"].index("bonds")] = 1
+        shares = np.divide(others, others_total, out=fallback, where=others_total > 0)
+        return np.insert(shares * (1 - stocks_weight[:, None]), stocks, stocks_weight, axis=1)
+
+    @staticmethod
+    def validate(parameter: SweepParameter, values: list[float]) -> None:
+        """
+        Check that `values` are valid values of `parameter`.
+        """
+        if parameter == SweepParameter.STOCKS_WEIGHT and not all(0 <= value <= 1 for value in values):
+            raise ValueError("Stocks weights must be between 0 and 1.")
+        if parameter != SweepParameter.STOCKS_WEIGHT and not all(value >= 0 for value in values):
+            raise ValueError(f"Values of {parameter.value} must be non-negative.")
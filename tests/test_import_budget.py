@@ -0,0 +1,9 @@
+import os
+from app.domain.simulation_engine.import_budget import check_import_budgets
+
+
+def test_imports_stay_within_budget():
+    # slower machines, e.g. shared CI runners, scale every budget as the import_budget script does
+    scale = float(os.environ.get("SIMULATION_IMPORT_BUDGET_SCALE", 1.0))
+    violations = check_import_budgets(repeats=3, scale=scale)
+    assert not violations, "\n".join(violations)
@@ -0,0 +1,51 @@
+import numpy as np
+from app.domain.simulation_engine.calcs import advance_wealth, allocate_wealth_scratch
+
+
+def reference_advance_wealth(wealth, simulated_returns, weights, flows, time_delta):
+    """
+    The wealth step kernel before it ran in scratch buffers, one temporary per operation.
+    """
+    for i in range(simulated_returns.shape[1]):
+        wealth[:, i + 1] = (
+            wealth[:, i] * (weights[i] * (1 + simulated_returns[:, i, :]) ** time_delta[i]).sum(axis=1) + flows[i]
+        )
+        wealth[wealth[:, i + 1] < 0, i + 1] = 0
+    return wealth
+
+
+def plan_inputs(n=2000, s=24, k=3, seed=11):
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.005, 0.05, size=(n, s, k))
+    weights = rng.dirichlet(np.ones(k), size=s)
+    # savings, then withdrawals that send some of the paths to the zero floor
+    flows = np.where(np.arange(s) < s // 2, 5.0, -13.0)
+    time_delta = np.where(np.arange(s) % 3 == 0, 1.0, 0.5)
+    wealth = np.empty((n, s + 1))
+    wealth[:, 0] = 100.0
+    return wealth, returns, weights, flows, time_delta
+
+
+def test_advance_wealth_matches_the_reference_kernel():
+    wealth, returns, weights, flows, time_delta = plan_inputs()
+    expected = reference_advance_wealth(wealth.copy(), returns, weights, flows, time_delta)
+    advance_wealth(wealth, returns, weights, flows, time_delta)
+    assert (expected[:, -1] == 0).any() and (expected[:, -1] > 0).any()
+    np.testing.assert_allclose(wealth, expected, rtol=1e-12, atol=1e-9)
+
+
+def test_advance_wealth_reuses_scratch_across_blocks():
+    wealth, returns, weights, flows, time_delta = plan_inputs()
+    expected = reference_advance_wealth(wealth.copy(), returns, weights, flows, time_delta)
+    scratch = allocate_wealth_scratch(len(wealth), returns.shape[2])
+    for start, stop in ((0, 10), (10, 24)):
+        advance_wealth(
+            wealth[:, start : stop + 1],
+            returns[:, start:stop],
+            weights[start:stop],
+            flows[start:stop],
+            time_delta[start:stop],
+            scratch,
+        )
+    np.testing.assert_allclose(wealth, expected, rtol=1e-12, atol=1e-9)
+
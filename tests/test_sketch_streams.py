@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from app.domain.simulation_engine.commands import RunSimulationCommand
+from app.domain.simulation_engine.sketches import WealthStatistics
+
+PLAN = dict(
+    number_of_simulations=20000,
+    end_step=30,
+    weights=[{"step": 0, "stocks": 0.6, "bonds": 0.3}],
+    initial_wealth=100,
+    savings_rates=[{"step": 0, "value": 5}],
+    seed=7,
+    statistics_mode="sketch",
+)
+
+
+def simulate_sketch(monkeypatch, **options) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the wealth of every path, as fed to the sketches, and the final mean of a sketch run.
+    """
+    paths = []
+    update = WealthStatistics.update
+
+    def record(self, wealth, control=None):
+        paths.append(wealth.copy())
+        update(self, wealth, control)
+
+    monkeypatch.setattr(WealthStatistics, "update", record)
+    strategy = RunSimulationCommand(**{**PLAN, **options}).simulation_strategy
+    mean = strategy.get_mean()
+    return np.concatenate(paths), mean
+
+
+@pytest.mark.parametrize(
+    "options", [{"sketch_rank_error": 0.01}, {"chunk_size": 2000}, {"chunk_size": 1000, "sketch_rank_error": 0.05}]
+)
+def test_sketch_does_not_change_the_paths(monkeypatch, options):
+    wealth, mean = simulate_sketch(monkeypatch)
+    other_wealth, other_mean = simulate_sketch(monkeypatch, **options)
+    np.testing.assert_array_equal(other_wealth, wealth)
+    np.testing.assert_allclose(other_mean, mean, rtol=1e-12)
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from app.domain.simulation_engine.calcs import convert_to_real_wealth
+from app.domain.simulation_engine.summary import summarize_wealth
+
+PERCENTILES = [0, 5, 12.5, 25, 50, 75, 95, 99.9, 100]
+
+
+def wealth_matrix(n: int, seed: int = 5) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    wealth = rng.lognormal(4.0, 1.0, size=(n, 13))
+    wealth[rng.random(wealth.shape) < 0.2] = 0.0  # destitute paths, with many ties at zero
+    wealth[:, 0] = 100.0
+    return wealth
+
+
+@pytest.mark.parametrize("n", [1, 2, 7, 1000, 1001])
+@pytest.mark.parametrize("block_bytes", [1, 2**23])
+def test_summary_matches_numpy(n, block_bytes):
+    wealth = wealth_matrix(n)
+    summary = summarize_wealth(wealth, PERCENTILES, block_bytes)
+    np.testing.assert_array_equal(summary.percentile_values, np.percentile(wealth, PERCENTILES, axis=0))
+    np.testing.assert_array_equal(summary.median, np.median(wealth, axis=0))
+    np.testing.assert_array_equal(summary.min, wealth.min(axis=0))
+    np.testing.assert_array_equal(summary.max, wealth.max(axis=0))
+    np.testing.assert_allclose(summary.mean, wealth.mean(axis=0), rtol=1e-12)
+    np.testing.assert_allclose(summary.std, wealth.std(axis=0), rtol=1e-10, atol=1e-12)
+    np.testing.assert_array_equal(summary.destitution_risk, np.mean(wealth == 0, axis=0))
+
+
+def test_real_summary_matches_the_real_wealth():
+    wealth = wealth_matrix(1000)
+    time_steps = np.arange(wealth.shape[1], dtype=np.float64)
+    real = summarize_wealth(wealth, PERCENTILES).to_real(time_steps, 0.03)
+    real_wealth = convert_to_real_wealth(wealth, time_steps, 0.03)
+    np.testing.assert_allclose(real.percentile_values, np.percentile(real_wealth, PERCENTILES, axis=0), rtol=1e-12)
+    np.testing.assert_allclose(real.median, np.median(real_wealth, axis=0), rtol=1e-12)
+    np.testing.assert_allclose(real.mean, real_wealth.mean(axis=0), rtol=1e-12)
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+from app.domain.simulation_engine.common.enums import InterpolationMethod
+from app.domain.simulation_engine.common.types import CashFlow, SimulationPortfolioWeights
+from app.domain.simulation_engine.timeline import PlanTimeline
+
+
+def interpolate_series(series: pd.Series, method: InterpolationMethod) -> pd.Series:
+    if method == InterpolationMethod.LINEAR:
+        return series.interpolate(method="index", limit_direction="both")
+    return series.ffill()
+
+
+def pandas_timeline(end_step, weights, savings_rates, oneoff_transactions, weights_interpolation, rate_interpolation):
+    """
+    The time line of the pandas pipeline that `PlanTimeline.compile` replaced: outer merges of the points onto
+    0..end_step, interpolated with pandas, without the first row (dropped with dropna by the strategies).
+    The merges duplicated the rows of a repeated step, so repeated points are first collapsed the way
+    `PlanTimeline.compile` documents: the last weights and savings rate win and transactions add up.
+    """
+    weights_df = pd.DataFrame([point.model_dump() for point in weights]).groupby("step").last()
+    cashflows_df = pd.DataFrame([point.model_dump() for point in savings_rates]).groupby("step").last()
+    cashflows_df = cashflows_df.rename(columns={"value": "cashflow"})
+    if oneoff_transactions:
+        oneoff_df = pd.DataFrame([point.model_dump() for point in oneoff_transactions]).groupby("step").sum()
+        oneoff_df = oneoff_df.rename(columns={"value": "transactions"})
+    else:
+        oneoff_df = pd.DataFrame(columns=["transactions"])
+
+    data = pd.DataFrame(index=pd.Series(np.arange(0, end_step + 1, 1), name="timesteps"))
+    data = data.merge(weights_df, how="outer", left_index=True, right_index=True)
+    data = data.merge(cashflows_df, how="outer", left_index=True, right_index=True)
+    data = data.merge(oneoff_df, how="outer", left_index=True, right_index=True)
+    data["stocks"] = interpolate_series(data["stocks"], weights_interpolation).fillna(0)
+    data["bonds"] = interpolate_series(data["bonds"], weights_interpolation).fillna(0)
+    data["cash"] = 1 - data["stocks"] - data["bonds"]
+    data["cashflow"] = interpolate_series(data["cashflow"], rate_interpolation).fillna(0)
+    data["transactions"] = data["transactions"].fillna(0)
+    data["time_delta"] = data.index.to_series().diff().astype(float)
+    steps = data.dropna(how="any")
+    weights = steps[["stocks", "bonds", "cash"]].values
+    return data.index.values.astype(float), weights, steps["cashflow"].values, steps["transactions"].values.astype(float)
+
+
+PLANS = {
+    "sorted": (
+        40,
+        [dict(step=0, stocks=0.75, bonds=0.25), dict(step=40, stocks=0.25, bonds=0.5)],
+        [dict(step=0, value=5), dict(step=25, value=-10)],
+        [dict(step=10, value=30), dict(step=0, value=99)],
+    ),
+    "out_of_order_and_fractional": (
+        20,
+        [dict(step=12, stocks=1.0, bonds=0.0), dict(step=2.5, stocks=0.5, bonds=0.5)],
+        [dict(step=7.25, value=-3), dict(step=1.5, value=4)],
+        [dict(step=5.5, value=-20), dict(step=3, value=10)],
+    ),
+    "duplicate_steps": (
+        10,
+        [dict(step=4, stocks=0.2, bonds=0.8), dict(step=0, stocks=0.6, bonds=0.4), dict(step=4, stocks=0.7, bonds=0.3)],
+        [dict(step=6, value=1), dict(step=2, value=3), dict(step=6, value=-4)],
+        [dict(step=7, value=5), dict(step=7, value=-2), dict(step=7.5, value=1)],
+    ),
+    "points_beyond_the_end": (
+        10,
+        [dict(step=0, stocks=0.6, bonds=0.4), dict(step=15, stocks=0.2, bonds=0.8)],
+        [dict(step=12, value=-2)],
+        [],
+    ),
+}
+
+
+@pytest.mark.parametrize("plan", PLANS, ids=list(PLANS))
+@pytest.mark.parametrize("weights_interpolation", list(InterpolationMethod))
+@pytest.mark.parametrize("rate_interpolation", list(InterpolationMethod))
+def test_compiled_timeline_matches_the_pandas_merge(plan, weights_interpolation, rate_interpolation):
+    end_step, weights, savings_rates, oneoff_transactions = PLANS[plan]
+    weights = [SimulationPortfolioWeights(**point) for point in weights]
+    savings_rates = [CashFlow(**point) for point in savings_rates]
+    oneoff_transactions = [CashFlow(**point) for point in oneoff_transactions]
+
+    timeline = PlanTimeline.compile(
+        end_step, weights, savings_rates, oneoff_transactions, weights_interpolation, rate_interpolation
+    )
+    time_steps, expected_weights, cashflows, transactions = pandas_timeline(
+        end_step, weights, savings_rates, oneoff_transactions, weights_interpolation, rate_interpolation
+    )
+    np.testing.assert_array_equal(timeline.time_steps, time_steps)
+    np.testing.assert_array_equal(timeline.time_delta, np.diff(time_steps))
+    np.testing.assert_array_equal(timeline.weights, expected_weights)
+    np.testing.assert_array_equal(timeline.cashflows, cashflows)
+    np.testing.assert_array_equal(timeline.transactions, transactions)